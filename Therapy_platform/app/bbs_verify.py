@@ -1,8 +1,15 @@
 from ursa_bbs_signatures import BbsKey, VerifyProofRequest, verify_proof
 import os
 import sys
+import asyncio
 import ctypes
+import logging
 from ctypes import cdll
+from concurrent.futures import ThreadPoolExecutor
+from . import metrics
+from .config import settings
+
+logger = logging.getLogger(__name__)
 
 def get_library_path():
     """
@@ -50,28 +57,36 @@ def load_bbs_library():
         if not os.path.exists(library_path):
             raise FileNotFoundError(f"BBS library not found at: {library_path}")
         
-        print(f"Loading BBS library from: {library_path}")
+        logger.info(f"Loading BBS library from: {library_path}")
         return cdll.LoadLibrary(library_path)
         
     except Exception as e:
-        print(f"Failed to load BBS library: {e}")
+        logger.error(f"Failed to load BBS library: {e}")
         raise
 
 # Load the library when this module is imported
 try:
     bbs_lib = load_bbs_library()
-    print("BBS library loaded successfully")
+    logger.info("BBS library loaded successfully")
 except Exception as e:
-    print(f"Warning: Could not load BBS library: {e}")
+    logger.warning(f"Could not load BBS library: {e}")
     bbs_lib = None
 
+# Dedicated pool for pairing checks so they never run on the event loop thread.
+# The ursa wrapper calls into libbbs through ctypes, which releases the GIL,
+# so verifications on different threads genuinely run in parallel.
+_bbs_executor = ThreadPoolExecutor(
+    max_workers=settings.bbs_verify_workers,
+    thread_name_prefix="bbs-verify"
+)
+
 def verify_bbs_proof(bbs_proof, revealed, bbs_pub, nonce, message_count):
     """
     Verify a BBS+ proof.
     
     Args:
         bbs_proof: The BBS+ proof bytes
-        revealed: Dictionary of revealed attributes
+        revealed: Dictionary of revealed attributes, in the order they were signed
         bbs_pub: BBS+ public key bytes
         nonce: Nonce bytes
         message_count: Number of messages
@@ -83,18 +98,35 @@ def verify_bbs_proof(bbs_proof, revealed, bbs_pub, nonce, message_count):
         raise RuntimeError("BBS library not loaded. Cannot verify proof.")
     
     try:
-        # Your actual verification logic here using bbs_lib
-        # This is a placeholder - replace with your actual BBS verification calls
-        print(f"Verifying proof with {message_count} messages")
-        print(f"Revealed attributes: {list(revealed.keys())}")
-        
-        # Example of how you might call the library function:
-        # result = bbs_lib.verify_proof(bbs_proof, revealed, bbs_pub, nonce, message_count)
-        # return bool(result)
-        
-        # For now, return True as a placeholder
-        return True
+        bbs_key = BbsKey(bbs_pub, message_count)
+        request = VerifyProofRequest(
+            proof=bbs_proof,
+            public_key=bbs_key,
+            messages=list(revealed.values()),
+            nonce=nonce
+        )
+        return bool(verify_proof(request))
         
     except Exception as e:
-        print(f"BBS proof verification failed: {e}")
-        return False
\ No newline at end of file
+        logger.warning(f"BBS proof verification failed: {e}")
+        return False
+
+_bbs_in_flight = 0  # submitted to the pool and not finished (running or queued)
+
+async def verify_bbs_proof_async(bbs_proof, revealed, bbs_pub, nonce, message_count) -> bool:
+    """Run verify_bbs_proof on the dedicated BBS worker pool."""
+    global _bbs_in_flight
+    loop = asyncio.get_running_loop()
+    _bbs_in_flight += 1
+    try:
+        return await loop.run_in_executor(
+            _bbs_executor, verify_bbs_proof, bbs_proof, revealed, bbs_pub, nonce, message_count
+        )
+    finally:
+        _bbs_in_flight -= 1
+
+metrics.gauge("bbs_verify_in_flight", "BBS+ verifications running or queued on the pool", lambda: _bbs_in_flight)
+
+def shutdown_bbs_executor():
+    """Stop the BBS worker pool (called from the app lifespan)."""
+    _bbs_executor.shutdown(wait=True)
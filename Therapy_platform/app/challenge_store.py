@@ -0,0 +1,414 @@
+import asyncio
+import base64
+import logging
+import os
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import delete, exists, false, func, inspect, or_, select, true, update
+
+from . import metrics
+from .config import settings
+from .database import AsyncSessionLocal
+from .models import AuthChallenge, BoundNonce
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Challenge:
+    challenge_id: str
+    challenge_bytes: bytes
+    pk_bind_key: bytes
+    expires_at: datetime
+
+    def to_response(self) -> dict:
+        return {
+            "challenge_id": self.challenge_id,
+            "challenge": base64.b64encode(self.challenge_bytes).decode(),
+            "expires_at": self.expires_at.isoformat()
+        }
+
+
+# Same length as the random nonce holders used before nonces were server-issued
+NONCE_BYTES = 16
+
+# Window for the per-client nonce limit
+NONCE_CLIENT_WINDOW = timedelta(minutes=1)
+
+
+@dataclass(frozen=True)
+class NonceBatch:
+    """BBS+ proof nonces issued to one binding key; each can back exactly one login."""
+    nonces: List[bytes]
+    pk_bind_key: bytes
+    expires_at: datetime
+    ttl: float
+
+    def to_response(self) -> dict:
+        return {
+            "nonces": [base64.b64encode(n).decode() for n in self.nonces],
+            "nonces_expire_at": self.expires_at.isoformat(),
+            "nonce_ttl": self.ttl
+        }
+
+
+def new_nonce_batch(pk_bind_key: bytes, count: int, ttl: float) -> NonceBatch:
+    return NonceBatch(
+        nonces=[os.urandom(NONCE_BYTES) for _ in range(count)],
+        pk_bind_key=pk_bind_key,
+        expires_at=datetime.now() + timedelta(seconds=ttl),
+        ttl=ttl
+    )
+
+
+def new_challenge(pk_bind_key: bytes, ttl: float) -> Challenge:
+    return Challenge(
+        challenge_id=str(uuid.uuid4()),
+        challenge_bytes=os.urandom(32),  # Random 32-byte challenge
+        pk_bind_key=pk_bind_key,
+        expires_at=datetime.now() + timedelta(seconds=ttl)
+    )
+
+
+class ChallengeStore(ABC):
+    """
+    Where issued login challenges live until they are consumed or expire.
+
+    `consume` must be atomic and succeed at most once per challenge: it hands
+    the challenge back and removes it in the same step, so two concurrent
+    logins can never both spend it.
+
+    Bound nonces follow the same rules. They are handed out in batches, to a
+    holder who signed a challenge, so it can precompute BBS+ proofs over them,
+    and `consume_nonce` spends one per login, so a proof cannot be presented
+    twice. Spent nonces are kept until they expire, so a replay is recognised
+    as one. Issued nonces are never evicted: a batch is cut short instead once
+    the key has been issued `nonce_max_per_key` within the nonce TTL, the client
+    `nonce_max_per_client` within NONCE_CLIENT_WINDOW, or `nonce_capacity` are
+    outstanding in total.
+    """
+
+    def __init__(self, ttl: float, nonce_ttl: float, nonce_max_per_key: int,
+                 nonce_max_per_client: int, nonce_capacity: int):
+        self.ttl = ttl
+        self.nonce_ttl = nonce_ttl
+        self.nonce_max_per_key = nonce_max_per_key
+        self.nonce_max_per_client = nonce_max_per_client
+        self.nonce_capacity = nonce_capacity
+        self._sweeper: Optional[asyncio.Task] = None
+
+    @abstractmethod
+    async def issue(self, pk_bind_key: bytes) -> Challenge:
+        ...
+
+    @abstractmethod
+    async def consume(self, challenge_id: str, pk_bind_key: bytes) -> Optional[Challenge]:
+        """Remove and return the challenge if it exists, belongs to pk_bind_key and has not expired."""
+        ...
+
+    @abstractmethod
+    async def issue_nonces(self, pk_bind_key: bytes, count: int, client: str) -> NonceBatch:
+        """Up to `count` new nonces for a holder proven to own pk_bind_key (fewer, or none, past a limit)."""
+        ...
+
+    def _nonce_allowance(self, count: int, own: int, client_recent: int, live: int) -> int:
+        return max(0, min(
+            count,
+            self.nonce_max_per_key - own,
+            self.nonce_max_per_client - client_recent,
+            self.nonce_capacity - live
+        ))
+
+    @abstractmethod
+    async def consume_nonce(self, nonce: bytes, pk_bind_key: bytes) -> Optional[bool]:
+        """
+        True if the nonce was issued to pk_bind_key, unspent and unexpired, and is now spent.
+        False if it must be refused: issued here but spent, expired or for another key, or
+        unknown while pk_bind_key holds nonces issued here (that holder uses bound nonces).
+        None if it is unknown and pk_bind_key holds none (a nonce the holder picked itself).
+        """
+        ...
+
+    @abstractmethod
+    async def sweep(self) -> int:
+        """Drop expired challenges and nonces (and spent challenges), returning how many were removed."""
+        ...
+
+    async def _sweep_forever(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                removed = await self.sweep()
+                if removed:
+                    logger.debug(f"Challenge sweeper removed {removed} challenges")
+            except Exception as e:
+                logger.warning(f"Challenge sweep failed: {e}")
+
+    def start(self, sweep_interval: float):
+        self._sweeper = asyncio.create_task(self._sweep_forever(sweep_interval))
+
+    async def close(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+
+
+class MemoryChallengeStore(ChallengeStore):
+    """
+    In-process store for single-worker deployments: no disk writes at all.
+
+    Challenges share one TTL, so insertion order is also expiry order and the
+    sweeper only ever looks at the front of the dict. When full, the oldest
+    challenge (the one closest to expiring) is evicted. Nonces are kept the
+    same way in a dict of their own (they have a different TTL), and indexed
+    per binding key for the per-key limit.
+    """
+
+    def __init__(self, ttl: float, nonce_ttl: float, capacity: int, nonce_max_per_key: int,
+                 nonce_max_per_client: int, nonce_capacity: int):
+        super().__init__(ttl, nonce_ttl, nonce_max_per_key, nonce_max_per_client, nonce_capacity)
+        self.capacity = capacity
+        self._challenges: "OrderedDict[str, Challenge]" = OrderedDict()
+        self._nonces: "OrderedDict[bytes, list]" = OrderedDict()  # nonce -> [pk_bind_key, expires_at, spent]
+        self._nonces_by_key: "Dict[bytes, Set[bytes]]" = {}
+        # client -> deque of (issued_at, count), least recently served client first
+        self._client_issues: "OrderedDict[str, deque]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._challenges)
+
+    @property
+    def outstanding_nonces(self) -> int:
+        return len(self._nonces)
+
+    async def issue(self, pk_bind_key: bytes) -> Challenge:
+        challenge = new_challenge(pk_bind_key, self.ttl)
+        self._challenges[challenge.challenge_id] = challenge
+        while len(self._challenges) > self.capacity:
+            self._challenges.popitem(last=False)
+        return challenge
+
+    async def consume(self, challenge_id: str, pk_bind_key: bytes) -> Optional[Challenge]:
+        # No await between lookup and delete, so this is atomic on the event loop
+        challenge = self._challenges.get(challenge_id)
+        if challenge is None or challenge.pk_bind_key != pk_bind_key:
+            return None
+        del self._challenges[challenge_id]
+        if datetime.now() > challenge.expires_at:
+            return None
+        return challenge
+
+    def _drop_nonce(self, nonce: bytes):
+        pk_bind_key = self._nonces.pop(nonce)[0]
+        own = self._nonces_by_key[pk_bind_key]
+        own.discard(nonce)
+        if not own:
+            del self._nonces_by_key[pk_bind_key]
+
+    def _recent_client_issues(self, client: str, now: datetime) -> deque:
+        recent = self._client_issues.pop(client, deque())
+        while recent and recent[0][0] <= now - NONCE_CLIENT_WINDOW:
+            recent.popleft()
+        self._client_issues[client] = recent
+        return recent
+
+    async def issue_nonces(self, pk_bind_key: bytes, count: int, client: str) -> NonceBatch:
+        now = datetime.now()
+        recent = self._recent_client_issues(client, now)
+        count = self._nonce_allowance(
+            count, len(self._nonces_by_key.get(pk_bind_key, ())), sum(n for _, n in recent), len(self._nonces)
+        )
+        batch = new_nonce_batch(pk_bind_key, count, self.nonce_ttl)
+        if batch.nonces:
+            own = self._nonces_by_key.setdefault(pk_bind_key, set())
+            for nonce in batch.nonces:
+                self._nonces[nonce] = [pk_bind_key, batch.expires_at, False]
+                own.add(nonce)
+            recent.append((now, len(batch.nonces)))
+        return batch
+
+    async def consume_nonce(self, nonce: bytes, pk_bind_key: bytes) -> Optional[bool]:
+        entry = self._nonces.get(nonce)
+        if entry is None:
+            return False if pk_bind_key in self._nonces_by_key else None
+        if entry[0] != pk_bind_key or entry[2] or datetime.now() > entry[1]:
+            return False
+        entry[2] = True  # kept until it expires, so a replay is refused
+        return True
+
+    async def sweep(self) -> int:
+        now = datetime.now()
+        removed = 0
+        while self._challenges:
+            challenge_id, challenge = next(iter(self._challenges.items()))
+            if challenge.expires_at > now:
+                break
+            del self._challenges[challenge_id]
+            removed += 1
+        while self._nonces:
+            nonce, (_, expires_at, _) = next(iter(self._nonces.items()))
+            if expires_at > now:
+                break
+            self._drop_nonce(nonce)
+            removed += 1
+        while self._client_issues:
+            client, recent = next(iter(self._client_issues.items()))
+            if recent and recent[-1][0] > now - NONCE_CLIENT_WINDOW:
+                break
+            del self._client_issues[client]
+        return removed
+
+
+class SQLiteChallengeStore(ChallengeStore):
+    """Shared store on the auth_challenges and bound_nonces tables, for deployments with several workers."""
+
+    async def issue(self, pk_bind_key: bytes) -> Challenge:
+        challenge = new_challenge(pk_bind_key, self.ttl)
+        async with AsyncSessionLocal() as db:
+            db.add(AuthChallenge(
+                challenge_id=challenge.challenge_id,
+                challenge_bytes=challenge.challenge_bytes,
+                pk_bind_key=challenge.pk_bind_key,
+                expires_at=challenge.expires_at
+            ))
+            await db.commit()
+        return challenge
+
+    async def consume(self, challenge_id: str, pk_bind_key: bytes) -> Optional[Challenge]:
+        # One conditional UPDATE ... RETURNING: of two concurrent consumers only one
+        # can flip used from false to true, so only one ever gets the challenge back
+        stmt = (
+            update(AuthChallenge)
+            .where(
+                AuthChallenge.challenge_id == challenge_id,
+                AuthChallenge.pk_bind_key == pk_bind_key,
+                AuthChallenge.used == false(),
+                AuthChallenge.expires_at > datetime.now()
+            )
+            .values(used=True)
+            .returning(AuthChallenge.challenge_bytes, AuthChallenge.expires_at)
+            .execution_options(synchronize_session=False)
+        )
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(stmt)).first()
+            await db.commit()
+        if row is None:
+            return None
+        return Challenge(challenge_id, row.challenge_bytes, pk_bind_key, row.expires_at)
+
+    async def issue_nonces(self, pk_bind_key: bytes, count: int, client: str) -> NonceBatch:
+        now = datetime.now()
+        live = BoundNonce.expires_at > now
+        async with AsyncSessionLocal() as db:
+            # Workers may race past these counts by a batch each; they only need to bound issuance
+            own, client_recent, total = (await db.execute(select(
+                select(func.count()).where(BoundNonce.pk_bind_key == pk_bind_key, live).scalar_subquery(),
+                select(func.count()).where(
+                    BoundNonce.client == client, BoundNonce.created_at > now - NONCE_CLIENT_WINDOW
+                ).scalar_subquery(),
+                select(func.count()).where(live).scalar_subquery()
+            ))).one()
+            count = self._nonce_allowance(count, own, client_recent, total)
+            batch = new_nonce_batch(pk_bind_key, count, self.nonce_ttl)
+            db.add_all([
+                BoundNonce(nonce=nonce, pk_bind_key=pk_bind_key, client=client, created_at=now,
+                           expires_at=batch.expires_at)
+                for nonce in batch.nonces
+            ])
+            await db.commit()
+        return batch
+
+    async def consume_nonce(self, nonce: bytes, pk_bind_key: bytes) -> Optional[bool]:
+        # Same conditional UPDATE as consume(): only one login can flip used
+        stmt = (
+            update(BoundNonce)
+            .where(
+                BoundNonce.nonce == nonce,
+                BoundNonce.pk_bind_key == pk_bind_key,
+                BoundNonce.used == false(),
+                BoundNonce.expires_at > datetime.now()
+            )
+            .values(used=True)
+            .execution_options(synchronize_session=False)
+        )
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(stmt)
+            if result.rowcount == 1:
+                await db.commit()
+                return True
+            known = (await db.execute(select(or_(
+                exists().where(BoundNonce.nonce == nonce),
+                exists().where(BoundNonce.pk_bind_key == pk_bind_key, BoundNonce.expires_at > datetime.now())
+            )))).scalar()
+            await db.commit()
+        return False if known else None
+
+    async def sweep(self) -> int:
+        """
+        Purge job: delete spent and expired challenges, and expired nonces, so the
+        consume indexes stay small. Spent nonces stay until they expire, so replays are recognised.
+        """
+        now = datetime.now()
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(delete(AuthChallenge).where(or_(
+                AuthChallenge.used == true(),
+                AuthChallenge.expires_at <= now
+            )))
+            nonces = await db.execute(delete(BoundNonce).where(BoundNonce.expires_at <= now))
+            await db.commit()
+            return result.rowcount + nonces.rowcount
+
+
+def drop_legacy_challenge_table(sync_conn):
+    """
+    Before `used` became a boolean it was a "true"/"false" string column.
+    create_all() won't alter an existing table, so drop an old-style one and let it
+    be recreated; challenges only live for minutes, so nothing of value is lost.
+    """
+    inspector = inspect(sync_conn)
+    if not inspector.has_table(AuthChallenge.__tablename__):
+        return
+    columns = {c["name"]: c for c in inspector.get_columns(AuthChallenge.__tablename__)}
+    if "VARCHAR" in str(columns["used"]["type"]).upper():
+        logger.info("Dropping legacy auth_challenges table (string 'used' column)")
+        AuthChallenge.__table__.drop(sync_conn)
+
+
+def drop_legacy_nonce_table(sync_conn):
+    """Same for a bound_nonces table from before the per-client limit (no `client` column)."""
+    inspector = inspect(sync_conn)
+    if not inspector.has_table(BoundNonce.__tablename__):
+        return
+    if "client" not in {c["name"] for c in inspector.get_columns(BoundNonce.__tablename__)}:
+        logger.info("Dropping legacy bound_nonces table (no 'client' column)")
+        BoundNonce.__table__.drop(sync_conn)
+
+
+def create_challenge_store() -> ChallengeStore:
+    backend = settings.challenge_store_backend
+    if backend == "memory":
+        return MemoryChallengeStore(
+            settings.challenge_ttl, settings.bound_nonce_ttl, settings.challenge_store_capacity,
+            settings.bound_nonce_max_per_key, settings.bound_nonce_max_per_client, settings.bound_nonce_capacity
+        )
+    if backend == "sqlite":
+        return SQLiteChallengeStore(
+            settings.challenge_ttl, settings.bound_nonce_ttl,
+            settings.bound_nonce_max_per_key, settings.bound_nonce_max_per_client, settings.bound_nonce_capacity
+        )
+    raise ValueError(f"Unknown challenge_store_backend: {backend}")
+
+
+# Global instance, swept in the background by the app lifespan
+challenge_store = create_challenge_store()
+
+# Only the in-memory store keeps a count; the database store omits the gauge at scrape time
+metrics.gauge("challenges_outstanding", "Issued login challenges not yet used or expired", lambda: len(challenge_store))
+metrics.gauge(
+    "bound_nonces_outstanding", "Issued BBS+ proof nonces not yet expired (spent ones included)",
+    lambda: challenge_store.outstanding_nonces
+)
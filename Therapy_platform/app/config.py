@@ -2,17 +2,69 @@ from pydantic_settings import BaseSettings
 from typing import Optional
 import os
 
+# Published in this repo, so it only protects session tokens in local development
+DEFAULT_SECRET_KEY = "dev-secret-key"
+
 class Settings(BaseSettings):
     # App settings
-    secret_key: str = "dev-secret-key"
+    secret_key: str = DEFAULT_SECRET_KEY  # signs session tokens: set SECRET_KEY in production
     debug: bool = False
     log_level: str = "INFO"
     app_port: int = 5000
+
+    # Production server (gunicorn.conf.py, scripts/run_prod.sh)
+    web_workers: int = 2  # pre-forked worker processes sharing the master's loaded state
+    web_worker_timeout: int = 60  # seconds before a silent worker is killed
+    web_graceful_timeout: int = 30  # seconds a retiring worker gets to finish its requests
+    reload_workers_on_epoch: bool = True  # rotate workers when a new verification key is published
+    epoch_reload_min_interval: float = 60.0  # at most one rotation per this many seconds
+
+    # Verification settings
+    bbs_verify_workers: int = 2  # threads dedicated to BBS+ pairing checks
+    node_binary: str = "node"
+    plonk_verify_workers: int = 2  # warm snarkjs verifier processes
+    plonk_verify_timeout: float = 10.0  # seconds before a worker is considered hung
+    plonk_worker_start_timeout: float = 30.0
+    plonk_health_interval: float = 15.0  # seconds between worker pings
+    key_reload_interval: float = 2.0  # seconds between keys/ mtime checks
+    proof_cache_size: int = 4096  # verified proofs remembered for repeat logins
+    proof_cache_ttl: float = 3600.0  # upper bound in seconds; proofs also expire with their day
+    plonk_max_date_skew_days: int = 1  # how far a proof's date may be from today (timezones)
+
+    # Login challenges
+    challenge_store_backend: str = "memory"  # "memory" (single worker) or "sqlite" (shared)
+    challenge_ttl: float = 600.0  # seconds a challenge stays valid
+    challenge_store_capacity: int = 100000  # memory backend: oldest evicted beyond this
+    challenge_sweep_interval: float = 30.0  # seconds between expiry sweeps
+    bound_nonce_ttl: float = 3600.0  # seconds a BBS+ proof nonce issued with a challenge stays valid
+    bound_nonce_batch_max: int = 32  # nonces handed out per request at most
+    bound_nonce_max_per_key: int = 64  # issued per binding key within bound_nonce_ttl (spent ones count)
+    bound_nonce_max_per_client: int = 960  # issued per client address per minute (onion traffic shares 127.0.0.1)
+    bound_nonce_capacity: int = 100000  # outstanding in total; none are evicted, issuance waits for expiry
+    require_bound_nonce: bool = False  # also refuse self-picked BBS+ nonces from keys that hold none issued here
+
+    # Sessions
+    session_ttl: int = 8 * 3600  # seconds a signed session token stays valid
+    user_cache_size: int = 10000  # users whose DB-only fields are kept in memory
+    user_cache_ttl: float = 5.0  # seconds a cached entry is trusted; other workers' logins show up after this plus a flush
+    user_write_flush_interval: float = 5.0  # seconds between write-behind flushes of login updates
+
+    # Commitment registry (Merkle tree the eligibility circuit proves against)
+    registry_depth: int = 8  # must match MerkleInclusion(depth) in eligibility.circom
+    registry_path_cache_size: int = 4096  # encoded path responses kept per epoch
+    revocation_batch_interval: float = 300.0  # seconds between batched revocation epochs
+    root_history_size: int = 4096  # safety bound only: every root retired within the grace period is kept
+    root_grace_period: float = 3600.0  # seconds a retired root is still accepted
+
+    # Admin endpoints (disabled unless a token is set; onion traffic also arrives via 127.0.0.1)
+    admin_token: Optional[str] = None
     
     # Tor settings
     tor_control_password: Optional[str] = None
     tor_socks_port: int = 9050
     tor_control_port: int = 9051
+    tor_http_pool_size: int = 10  # kept-alive connections per host on the opt-in Tor session
+    tor_request_timeout: float = 30.0
     
     # Hidden service settings
     hidden_service_dir: str = "/var/lib/tor/myapp/"
@@ -22,4 +74,12 @@ class Settings(BaseSettings):
         env_file = ".env"
         case_sensitive = False
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
+
+def check_secret_key():
+    """Refuse to start outside debug mode with the default secret_key (anyone could forge session tokens)."""
+    if not settings.debug and settings.secret_key == DEFAULT_SECRET_KEY:
+        raise RuntimeError(
+            "SECRET_KEY is the public default; set a long random SECRET_KEY "
+            "(or DEBUG=true for local development)"
+        )
\ No newline at end of file
@@ -0,0 +1,206 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+# Public signals of eligibility.circom, in the order snarkjs writes them to public.json
+SIG_COMMITMENT = 0
+SIG_MERKLE_ROOT = 1
+SIG_ISSUER_ID = 2
+SIG_VALID_SIGNATURE = 3
+SIG_CURRENT_YEAR = 4
+SIG_CURRENT_MONTH = 5
+SIG_CURRENT_DAY = 6
+SIG_EXPIRY_YEAR = 7
+SIG_EXPIRY_MONTH = 8
+SIG_ELIGIBLE = 9
+PUBLIC_SIGNAL_COUNT = 10
+
+# Revealed BBS+ messages every login credential must carry
+REQUIRED_REVEALED = ("expiry_year", "expiry_month", "pk_bind", "commitment")
+
+# Upper bounds on decoded sizes; anything larger is rejected before any crypto runs
+MAX_BBS_PUBLIC_KEY_BYTES = 4096
+MAX_BBS_PROOF_BYTES = 4096
+MAX_NONCE_BYTES = 64
+MAX_REVEALED_VALUE_BYTES = 256
+MAX_PLONK_PROOF_BYTES = 8192
+MAX_PLONK_PUBLIC_BYTES = 2048
+MAX_MESSAGE_COUNT = 64
+MAX_LOGIN_BODY_BYTES = 64 * 1024
+PK_BIND_BYTES = 32
+SIGNATURE_BYTES = 64
+
+
+class LoginRejected(Exception):
+    """A login credential failed one of the verification tiers."""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+@dataclass
+class LoginCredential:
+    """Decoded login payload, independent of the wire format it arrived in."""
+    bbs_public_key: bytes
+    bbs_proof: bytes
+    bbs_nonce: bytes
+    message_count: int
+    revealed: Dict[str, bytes]          # name -> bytes, in signing order
+    plonk_proof_bytes: bytes
+    plonk_public_bytes: bytes
+    plonk_proof: dict
+    plonk_public: list
+    merkle_root_hex: str                # lower-case
+    epoch: int
+    challenge_id: str
+    challenge_signature: bytes
+
+    @property
+    def pk_bind_key(self) -> bytes:
+        return self.revealed["pk_bind"]
+
+    @property
+    def checked_root(self) -> Tuple[str, int]:
+        return self.merkle_root_hex, self.epoch
+
+
+def _b64(value: str, field: str, max_bytes: int) -> bytes:
+    # base64 grows 4/3, so reject on the encoded length before decoding anything
+    if len(value) > (max_bytes * 4 // 3) + 4:
+        raise LoginRejected(f"{field} too large")
+    try:
+        decoded = base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        raise LoginRejected(f"{field} is not valid base64")
+    if len(decoded) > max_bytes:
+        raise LoginRejected(f"{field} too large")
+    return decoded
+
+
+def decode_json_payload(payload) -> LoginCredential:
+    """
+    Tier 1: size and shape limits.
+    Decodes a ProofPayload into a LoginCredential, rejecting anything oversized
+    or structurally wrong before any lookups or cryptography run.
+    """
+    if not 1 <= payload.message_count <= MAX_MESSAGE_COUNT:
+        raise LoginRejected("message_count out of range")
+    if len(payload.revealed) > payload.message_count:
+        raise LoginRejected("More revealed messages than signed messages")
+
+    revealed: Dict[str, bytes] = {}
+    for item in payload.revealed:
+        if not isinstance(item, dict):
+            raise LoginRejected("Malformed revealed attribute")
+        name, value, encoding = item.get("name"), item.get("value"), item.get("encoding", "utf8")
+        if not isinstance(name, str) or not isinstance(value, str) or name in revealed:
+            raise LoginRejected("Malformed revealed attribute")
+        if encoding == "base64":
+            revealed[name] = _b64(value, name, MAX_REVEALED_VALUE_BYTES)
+        elif encoding == "utf8":
+            if len(value) > MAX_REVEALED_VALUE_BYTES:
+                raise LoginRejected(f"{name} too large")
+            revealed[name] = value.encode()
+        else:
+            raise LoginRejected(f"Unknown encoding for {name}")
+
+    missing = [name for name in REQUIRED_REVEALED if name not in revealed]
+    if missing:
+        raise LoginRejected(f"Revealed set is missing: {', '.join(missing)}")
+
+    plonk_proof_bytes = _b64(payload.plonk_proof, "plonk_proof", MAX_PLONK_PROOF_BYTES)
+    plonk_public_bytes = _b64(payload.plonk_public, "plonk_public", MAX_PLONK_PUBLIC_BYTES)
+    try:
+        plonk_proof = json.loads(plonk_proof_bytes)
+        plonk_public = json.loads(plonk_public_bytes)
+    except ValueError:
+        raise LoginRejected("Malformed PLONK proof or public signals")
+
+    credential = LoginCredential(
+        bbs_public_key=_b64(payload.bbs_public_key_b64, "bbs_public_key_b64", MAX_BBS_PUBLIC_KEY_BYTES),
+        bbs_proof=_b64(payload.bbs_proof, "bbs_proof", MAX_BBS_PROOF_BYTES),
+        bbs_nonce=_b64(payload.bbs_nonce, "bbs_nonce", MAX_NONCE_BYTES),
+        message_count=payload.message_count,
+        revealed=revealed,
+        plonk_proof_bytes=plonk_proof_bytes,
+        plonk_public_bytes=plonk_public_bytes,
+        plonk_proof=plonk_proof,
+        plonk_public=plonk_public,
+        merkle_root_hex=payload.merkle_root_hex.lower(),
+        epoch=payload.epoch,
+        challenge_id=payload.challenge_id,
+        challenge_signature=_b64(payload.challenge_signature, "challenge_signature", SIGNATURE_BYTES),
+    )
+    check_shape(credential)
+    return credential
+
+
+def check_shape(credential: LoginCredential):
+    """Fixed-size fields and the public signal vector must have exactly the expected shape."""
+    if len(credential.pk_bind_key) != PK_BIND_BYTES:
+        raise LoginRejected("pk_bind must be a 32-byte Ed25519 public key")
+    if len(credential.challenge_signature) != SIGNATURE_BYTES:
+        raise LoginRejected("challenge_signature must be 64 bytes")
+    if not isinstance(credential.plonk_proof, dict):
+        raise LoginRejected("Malformed PLONK proof")
+    public = credential.plonk_public
+    if not isinstance(public, list) or len(public) != PUBLIC_SIGNAL_COUNT:
+        raise LoginRejected("PLONK public signals have the wrong shape")
+    if not all(isinstance(s, str) and s.isdigit() for s in public):
+        raise LoginRejected("PLONK public signals must be decimal field elements")
+
+
+def check_root(credential: LoginCredential, root_history):
+    """
+    Tier 2: the credential must be proven against the published root/epoch,
+    or one retired recently enough to still be within its grace window.
+    """
+    if root_history.current is None:
+        return
+    if not root_history.accepts(credential.checked_root):
+        raise LoginRejected("Outdated root/epoch. Regenerate proof against the current root.", 409)
+
+
+def proof_date(public_signals: list) -> Optional[date]:
+    """The date the PLONK proof asserts eligibility for, if the signals carry a valid one."""
+    try:
+        return date(
+            int(public_signals[SIG_CURRENT_YEAR]),
+            int(public_signals[SIG_CURRENT_MONTH]),
+            int(public_signals[SIG_CURRENT_DAY])
+        )
+    except (IndexError, TypeError, ValueError):
+        return None
+
+
+def check_public_signals(credential: LoginCredential, max_date_skew_days: int):
+    """
+    Tier 3: the PLONK public signals must describe this credential.
+    The circuit outputs `eligible` rather than constraining it, so it is checked here,
+    together with the revealed commitment, root, expiry and proof date.
+    """
+    public = credential.plonk_public
+    revealed = credential.revealed
+
+    if public[SIG_ELIGIBLE] != "1" or public[SIG_VALID_SIGNATURE] != "1":
+        raise LoginRejected("ZK proof does not attest eligibility", 401)
+    if int(public[SIG_COMMITMENT]) != int.from_bytes(revealed["commitment"], "big"):
+        raise LoginRejected("ZK proof commitment does not match the revealed commitment", 401)
+    try:
+        root_int = int(credential.merkle_root_hex, 16)
+    except ValueError:
+        raise LoginRejected("merkle_root_hex is not hex")
+    if int(public[SIG_MERKLE_ROOT]) != root_int:
+        raise LoginRejected("ZK proof root does not match merkle_root_hex", 401)
+    if (public[SIG_EXPIRY_YEAR].encode() != revealed["expiry_year"]
+            or public[SIG_EXPIRY_MONTH].encode() != revealed["expiry_month"]):
+        raise LoginRejected("ZK proof expiry does not match the revealed expiry", 401)
+
+    proven_on = proof_date(public)
+    if proven_on is None or abs((date.today() - proven_on).days) > max_date_skew_days:
+        raise LoginRejected("ZK proof is not dated today. Regenerate the proof.", 401)
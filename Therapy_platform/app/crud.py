@@ -1,6 +1,49 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from .models import PseudoUser
+from .config import settings
+from .write_behind import user_write_buffer
+from collections import OrderedDict
+from typing import Optional, Tuple
 import hashlib
+import time
+
+class UserInfoCache:
+    """
+    Small LRU of the user fields pages still need from the database
+    (everything else comes from the signed session token).
+    Entries are dropped whenever update_user_credentials changes the user in
+    this process, and expire after `ttl` seconds so changes made by other
+    workers are picked up from the shared database.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()  # pseudo_id -> (expires, info)
+
+    def get(self, pseudo_id: str) -> Optional[dict]:
+        entry = self._entries.get(pseudo_id)
+        if entry is None:
+            return None
+        expires, info = entry
+        if time.monotonic() >= expires:
+            del self._entries[pseudo_id]
+            return None
+        self._entries.move_to_end(pseudo_id)
+        return info
+
+    def put(self, pseudo_id: str, info: dict):
+        self._entries[pseudo_id] = (time.monotonic() + self.ttl, info)
+        self._entries.move_to_end(pseudo_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, pseudo_id: str):
+        self._entries.pop(pseudo_id, None)
+
+user_info_cache = UserInfoCache(settings.user_cache_size, settings.user_cache_ttl)
 
 def generate_pseudo_id(pk_bind_key: bytes) -> str:
     """Generate a deterministic pseudo ID from the public binding key"""
@@ -41,4 +84,61 @@ def update_user_credentials(db: Session, user: PseudoUser,
     
     db.commit()
     db.refresh(user)
+    user_info_cache.invalidate(user.pseudo_id)
+    return user
+
+# Async versions used by the routers (AsyncSession on the aiosqlite engine)
+
+async def get_user_by_pk_bind_async(db: AsyncSession, pk_bind_key: bytes) -> PseudoUser:
+    """Get user by their public binding key"""
+    result = await db.execute(select(PseudoUser).where(PseudoUser.pk_bind_key == pk_bind_key))
+    return result.scalars().first()
+
+async def get_user_by_pseudo_id_async(db: AsyncSession, pseudo_id: str) -> PseudoUser:
+    """Get user by pseudo ID"""
+    result = await db.execute(select(PseudoUser).where(PseudoUser.pseudo_id == pseudo_id))
+    return result.scalars().first()
+
+async def create_user_async(db: AsyncSession, pk_bind_key: bytes, bbs_public_key: bytes = None,
+                            merkle_root: str = None) -> PseudoUser:
+    """Create a new pseudo user"""
+    user = PseudoUser(
+        pseudo_id=generate_pseudo_id(pk_bind_key),
+        pk_bind_key=pk_bind_key,
+        bbs_public_key=bbs_public_key,
+        merkle_root=merkle_root
+    )
+    
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+async def update_user_credentials_async(db: AsyncSession, user: PseudoUser,
+                                        bbs_public_key: bytes, merkle_root: str) -> PseudoUser:
+    """
+    Update user's credential information.
+    Write-behind: the change is applied to `user` in memory and persisted by the
+    next user_write_buffer flush, so there is no commit or refresh per login.
+    """
+    user_write_buffer.record_login(user, bbs_public_key, merkle_root)
+    user_info_cache.invalidate(user.pseudo_id)
     return user
+
+async def get_user_info_async(db: AsyncSession, pseudo_id: str) -> Optional[dict]:
+    """created_at/last_seen for a user, from the LRU when possible"""
+    info = user_info_cache.get(pseudo_id)
+    if info is not None:
+        return info
+    
+    user = await get_user_by_pseudo_id_async(db, pseudo_id)
+    if user is None:
+        return None
+    
+    info = {"created_at": user.created_at, "last_seen": user.last_seen}
+    # A login may still be waiting in the write-behind buffer
+    pending_last_seen = user_write_buffer.pending_fields(pseudo_id).get("last_seen")
+    if pending_last_seen is not None:
+        info["last_seen"] = pending_last_seen
+    user_info_cache.put(pseudo_id, info)
+    return info
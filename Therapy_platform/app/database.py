@@ -1,11 +1,37 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 SQLALCHEMY_DATABASE_URL = "sqlite:///./pseudo_id.db"
+ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./pseudo_id.db"
+
+# WAL lets readers run alongside the single writer; NORMAL sync is durable across
+# application crashes (only an OS crash can lose the last transactions)
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,      # ms to wait on a locked database instead of failing
+    "cache_size": -16000,      # 16 MB page cache
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+}
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
 
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+event.listen(engine, "connect", _apply_sqlite_pragmas)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine used by the routers so queries never block the event loop
+async_engine = create_async_engine(ASYNC_DATABASE_URL)
+event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False, autoflush=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -14,3 +40,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
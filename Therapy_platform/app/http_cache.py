@@ -0,0 +1,176 @@
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # optional: without it only gzip variants are produced
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Over Tor every byte costs, so only bother compressing bodies that actually shrink
+MIN_COMPRESS_BYTES = 256
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"  # may be cached, but must be revalidated (a cheap 304) before use
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "public")
+
+# etag -> {"gzip": bytes, "br": bytes}, for every cacheable body known at startup
+_variants: Dict[str, Dict[str, bytes]] = {}
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def _variant_etag(etag: str, encoding: str) -> str:
+    # Each representation needs its own strong validator
+    return etag[:-1] + "-" + encoding + '"'
+
+
+def register_variants(etag: str, body: bytes):
+    """Precompress `body` once and remember the variants under its ETag."""
+    if etag in _variants or len(body) < MIN_COMPRESS_BYTES:
+        return
+    variants = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(body, quality=11)
+    _variants[etag] = {enc: data for enc, data in variants.items() if len(data) < len(body)}
+
+
+def _accepted_encodings(request: Request) -> List[str]:
+    accepted = []
+    for part in request.headers.get("accept-encoding", "").split(","):
+        token, _, params = part.partition(";")
+        params = params.strip().lower()
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.append(token.strip().lower())
+    return accepted
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    sent = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in sent
+
+
+def cached_response(request: Request, body: bytes, etag: str, media_type: str,
+                    cache_control: str, headers: Optional[dict] = None) -> Response:
+    """
+    Serve `body` (or its best precompressed variant) with validators, answering
+    If-None-Match with a bodiless 304 when it names the negotiated representation.
+    """
+    variants = _variants.get(etag, {})
+    response_headers = dict(headers or {})
+    response_headers["Cache-Control"] = cache_control
+    if variants:
+        response_headers["Vary"] = "Accept-Encoding"
+
+    accepted = _accepted_encodings(request)
+    encoding = next((e for e in ("br", "gzip") if e in variants and e in accepted), None)
+    response_headers["ETag"] = _variant_etag(etag, encoding) if encoding else etag
+
+    if _etag_matches(request, response_headers["ETag"]):
+        return Response(status_code=304, headers=response_headers)
+    if encoding:
+        response_headers["Content-Encoding"] = encoding
+        return Response(content=variants[encoding], media_type=media_type, headers=response_headers)
+    return Response(content=body, media_type=media_type, headers=response_headers)
+
+
+class StaticAsset(NamedTuple):
+    body: bytes
+    etag: str
+    media_type: str
+    version: str
+
+
+class StaticAssets:
+    """
+    Everything under public/ read, hashed and precompressed once at startup.
+    URLs carrying ?v=<version> of the current content are served as immutable.
+    """
+
+    def __init__(self, directory: str, url_prefix: str = "/static"):
+        self.directory = directory
+        self.url_prefix = url_prefix
+        self._assets: Dict[str, StaticAsset] = {}
+
+    def load(self):
+        assets = {}
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                rel = os.path.relpath(path, self.directory).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    body = f.read()
+                etag = make_etag(body)
+                media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                register_variants(etag, body)
+                assets[f"{self.url_prefix}/{rel}"] = StaticAsset(body, etag, media_type, etag[1:13])
+        self._assets = assets
+        logger.info(f"Precompressed {len(assets)} static assets (brotli {'on' if brotli else 'off'})")
+
+    def versioned_url(self, url: str) -> str:
+        asset = self._assets.get(url)
+        return f"{url}?v={asset.version}" if asset else url
+
+    def version_urls(self, html_source: str) -> str:
+        """Append ?v=<content hash> to every src/href pointing at a known static asset."""
+        pattern = r'((?:src|href)=")(' + re.escape(self.url_prefix) + r'/[^"?#]+)(")'
+        return re.sub(pattern, lambda m: m.group(1) + self.versioned_url(m.group(2)) + m.group(3), html_source)
+
+    def respond(self, request: Request) -> Optional[Response]:
+        """A cached response for a static asset request, or None to fall through to the app."""
+        if request.method not in ("GET", "HEAD"):
+            return None
+        asset = self._assets.get(request.url.path)
+        if asset is None:
+            return None
+        versioned = request.query_params.get("v") == asset.version
+        return cached_response(
+            request, asset.body, asset.etag, asset.media_type,
+            IMMUTABLE if versioned else REVALIDATE
+        )
+
+
+async def apply_conditional(request: Request, response: Response) -> Response:
+    """
+    For app responses that carry an ETag (the cached template pages), answer
+    If-None-Match with 304 and swap in a precompressed variant when accepted.
+    """
+    etag = response.headers.get("etag")
+    if (etag is None or response.status_code != 200 or request.method not in ("GET", "HEAD")
+            or "content-encoding" in response.headers):
+        return response
+    if etag not in _variants and not request.headers.get("if-none-match"):
+        return response
+
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    passthrough = {k: v for k, v in response.headers.items()
+                   if k.lower() not in ("content-length", "content-type", "etag", "cache-control")}
+    return cached_response(
+        request, body, etag, response.media_type or response.headers.get("content-type"),
+        response.headers.get("cache-control", REVALIDATE), passthrough
+    )
+
+
+# Global instance, loaded by the app lifespan
+static_assets = StaticAssets(STATIC_DIR)
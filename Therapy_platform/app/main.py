@@ -1,5 +1,5 @@
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
@@ -8,10 +8,13 @@ PROJECT_ROOT = Path(__file__).parent.parent
 STATIC_DIR = PROJECT_ROOT / "public"
 
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 from .utils import render_template
-from .config import settings
-from .routers import api, auth, dashboard  # your separate routers
+from .config import check_secret_key, settings
+from .http_cache import static_assets, apply_conditional
+from .metrics import request_timings, server_timing_header
+from .routers import api, auth, dashboard, admin, registry, verify  # your separate routers
 
 
 # Configure logging
@@ -21,17 +24,80 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+_preloaded = False
+
+def init_database():
+    """Create database tables (sync engine, so it can also run in the pre-fork master)"""
+    from .database import engine
+    from .models import Base
+    from .challenge_store import drop_legacy_challenge_table, drop_legacy_nonce_table
+    with engine.begin() as conn:
+        drop_legacy_challenge_table(conn)
+        drop_legacy_nonce_table(conn)
+        Base.metadata.create_all(conn)
+    engine.dispose()
+    logger.info("Database tables created")
+
+def load_shared_state():
+    """Read-mostly state every worker needs: assets, compiled templates, keys and the registry"""
+    # Static assets first, so templates can link them with content versions
+    static_assets.load()
+    from .utils import templates
+    templates.preload()
+    # Load keys/ into memory once; the watcher picks up new roots/epochs afterwards
+    from .zkp import key_cache
+    key_cache.reload(force=True)
+    from .merkle_registry import commitment_registry
+    commitment_registry.load()
+
+def preload():
+    """
+    Called by gunicorn.conf.py in the master before it forks the workers.
+    Native libraries are already loaded by importing the app; loading the
+    rest here means every worker starts with these pages shared copy-on-write
+    instead of each re-reading and re-compiling its own copy.
+    """
+    global _preloaded
+    init_database()
+    load_shared_state()
+    _preloaded = True
+
 # Lifespan
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Starting Tor Hidden Service API")
-    # Create database tables on startup
-    from .database import engine
-    from .models import Base
-    Base.metadata.create_all(bind=engine)
-    logger.info("Database tables created")
+    check_secret_key()
+    from .zkp import key_cache
+    if _preloaded:
+        # Forked from a preloaded master: only re-read key files published since the fork
+        key_cache.reload()
+    else:
+        init_database()
+        load_shared_state()
+    from .merkle_registry import revocation_queue
+    revocation_queue.start()
+    key_watcher = asyncio.create_task(key_cache.watch(settings.key_reload_interval))
+    from .plonk_pool import plonk_pool
+    await plonk_pool.start()
+    from .challenge_store import challenge_store
+    challenge_store.start(settings.challenge_sweep_interval)
+    from .write_behind import user_write_buffer
+    user_write_buffer.start()
+    app.state.started = True
     yield
+    app.state.started = False
     logger.info("Shutting down Tor Hidden Service API")
+    key_watcher.cancel()
+    await revocation_queue.close()
+    await plonk_pool.close()
+    await challenge_store.close()
+    await user_write_buffer.close()
+    from .database import async_engine
+    await async_engine.dispose()
+    from .bbs_verify import shutdown_bbs_executor
+    shutdown_bbs_executor()
+    from .tor_client import tor_client
+    tor_client.close()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -51,7 +117,18 @@ app.add_middleware(TrustedHostMiddleware, allowed_hosts=["*"])
 
 @app.middleware("http")
 async def add_security_headers(request: Request, call_next):
-    response = await call_next(request)
+    # Precompressed static assets are answered here without touching the app;
+    # ETag-carrying pages get 304 handling and a precompressed body when accepted
+    response = static_assets.respond(request)
+    if response is None:
+        # In debug, verification stages also report their timings back in Server-Timing
+        timings = request_timings.set([]) if settings.debug else None
+        response = await call_next(request)
+        response = await apply_conditional(request, response)
+        if timings is not None:
+            if request_timings.get():
+                response.headers["Server-Timing"] = server_timing_header(request_timings.get())
+            request_timings.reset(timings)
     response.headers["X-Content-Type-Options"] = "nosniff"
     response.headers["X-Frame-Options"] = "DENY"
     response.headers["X-XSS-Protection"] = "1; mode=block"
@@ -64,8 +141,26 @@ async def add_security_headers(request: Request, call_next):
 # Include routers
 app.include_router(auth.router, prefix="/auth")
 app.include_router(dashboard.router, prefix="/dashboard")
+app.include_router(admin.router, prefix="/admin")
+app.include_router(registry.router, prefix="/registry")
+app.include_router(verify.router)
 
 # Home page
 @app.get("/", response_class=HTMLResponse)
 async def root():
-    return render_template("home.html")
\ No newline at end of file
+    return render_template("home.html")
+
+# Readiness (unlike /api/health, only green once this worker can verify without a cold start)
+@app.get("/ready")
+async def ready():
+    from .zkp import key_cache
+    from .bbs_verify import bbs_lib
+    from .plonk_pool import plonk_pool
+    checks = {
+        "started": getattr(app.state, "started", False),
+        "keys": key_cache.vk_bytes is not None and key_cache.merkle_root is not None,
+        "bbs": bbs_lib is not None,
+        "plonk_workers": plonk_pool.healthy_workers > 0,
+    }
+    ok = all(checks.values())
+    return JSONResponse({"ready": ok, "checks": checks}, status_code=200 if ok else 503)
\ No newline at end of file
@@ -0,0 +1,374 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional, Set, Tuple
+
+from circomlibpy.poseidon import PoseidonHash
+
+from . import metrics
+from .config import settings
+from .zkp import KEYS_DIR, MERKLE_ROOT_PATH, KeySnapshot, key_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines run a single process anyway
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_PATH = os.path.join(KEYS_DIR, "commitment_registry.json")
+REVOCATIONS_PATH = os.path.join(KEYS_DIR, "revocations_pending.json")
+
+# BN254 scalar field, as in ZKP_Software/merkle.py (circomlibpy has no curve order built in)
+FIELD_ORDER = 21888242871839275222246405745257275088548364400416034343698204186575808495617
+EMPTY = 0  # field element 0 for empty leaves
+
+_poseidon = PoseidonHash()
+
+
+def poseidon_pair(left: int, right: int) -> int:
+    return _poseidon.hash(2, [left, right])
+
+
+def write_json_atomic(path: str, data: dict):
+    """Write to a temp file and rename over `path`, so the key watcher never reads a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+@asynccontextmanager
+async def file_lock(path: str):
+    """Exclusive advisory lock shared by every worker process on this host (polled, never blocks the loop)."""
+    if fcntl is None:
+        yield
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as f:
+        while True:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                await asyncio.sleep(0.01)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class CommitmentRegistry:
+    """
+    Server-side copy of the commitment tree the eligibility circuit proves
+    against (the same Poseidon tree as ZKP_Software/merkle.py).
+
+    Nodes are stored sparsely, with absent nodes equal to the precomputed
+    empty-subtree hash for their level, and an update rehashes only the changed
+    leaves' paths. Every node records the epoch it last changed in, so a holder
+    who knows their path as of epoch E only needs the siblings changed since E.
+    Each update is published as a new epoch to keys/merkle_root.json.
+    """
+
+    def __init__(self, path: str, depth: int, path_cache_size: int):
+        self.path = path
+        self.depth = depth
+        self.capacity = 1 << depth
+        self.epoch = 0
+        self.next_index = 0
+        self.zero = [EMPTY]
+        for _ in range(depth):
+            self.zero.append(poseidon_pair(self.zero[-1], self.zero[-1]))
+        self._nodes: List[Dict[int, int]] = [{} for _ in range(depth + 1)]
+        self._changed: List[Dict[int, int]] = [{} for _ in range(depth + 1)]  # level -> index -> epoch
+        self._lock = asyncio.Lock()
+        self._path_cache: "OrderedDict[Tuple[int, int, int], bytes]" = OrderedDict()
+        self._path_cache_size = path_cache_size
+
+    @property
+    def root(self) -> int:
+        return self.node(self.depth, 0)
+
+    @property
+    def root_hex(self) -> str:
+        return format(self.root, "x")
+
+    def node(self, level: int, index: int) -> int:
+        return self._nodes[level].get(index, self.zero[level])
+
+    def leaf(self, index: int) -> int:
+        return self.node(0, index)
+
+    def _compute(self, changes: Dict[int, int]) -> List[Dict[int, int]]:
+        """New values for every node above the changed leaves, without touching the live tree."""
+        updated: List[Dict[int, int]] = [dict(changes)]
+        for level in range(self.depth):
+            below = updated[level]
+            parents = {}
+            for parent in {index >> 1 for index in below}:
+                left = below.get(2 * parent, self.node(level, 2 * parent))
+                right = below.get(2 * parent + 1, self.node(level, 2 * parent + 1))
+                parents[parent] = poseidon_pair(left, right)
+            updated.append(parents)
+        return updated
+
+    def _apply(self, updated: List[Dict[int, int]], epoch: int):
+        for level, nodes in enumerate(updated):
+            for index, value in nodes.items():
+                if value == self.zero[level]:
+                    self._nodes[level].pop(index, None)
+                else:
+                    self._nodes[level][index] = value
+                self._changed[level][index] = epoch
+
+    async def update(self, changes: Dict[int, int]) -> int:
+        """
+        Set the given leaves and publish the result as one new epoch.
+        Hashing runs off the event loop; readers keep seeing the previous epoch until the swap.
+        """
+        async with self._exclusive():
+            return await self._update_locked(changes)
+
+    @asynccontextmanager
+    async def _exclusive(self):
+        """Hold the registry against this process and every other worker, synced to the latest saved epoch."""
+        async with self._lock, file_lock(f"{self.path}.lock"):
+            # Another worker process may have published since our last look
+            key_cache.reload()
+            yield
+
+    async def _update_locked(self, changes: Dict[int, int]) -> int:
+        for index in changes:
+            if not 0 <= index < self.capacity:
+                raise ValueError(f"Leaf index {index} outside the tree")
+        changes = {i: v % FIELD_ORDER for i, v in changes.items() if v % FIELD_ORDER != self.leaf(i)}
+        if not changes:
+            return self.epoch
+        updated = await asyncio.get_running_loop().run_in_executor(None, self._compute, changes)
+        epoch = self.epoch + 1
+        self._apply(updated, epoch)
+        self.epoch = epoch
+        self.next_index = max(self.next_index, max(changes) + 1)
+        self._path_cache.clear()
+        self._save()
+        key_cache.reload(force=True)
+        logger.info(f"Published commitment root {self.root_hex} at epoch {epoch} ({len(changes)} leaves changed)")
+        return epoch
+
+    async def add(self, commitment: int) -> int:
+        """Append a commitment at the next free index (indices are never reused) and publish."""
+        async with self._exclusive():
+            if self.next_index >= self.capacity:
+                raise ValueError("Commitment registry is full")
+            index = self.next_index
+            await self._update_locked({index: commitment})
+            return index
+
+    def path_delta(self, index: int, since: Optional[int]) -> dict:
+        """
+        The inclusion path for `index` at the current epoch, siblings keyed by level.
+        With `since`, only the siblings (and leaf) that changed after that epoch are included.
+        """
+        if not 0 <= index < self.capacity:
+            raise ValueError(f"Leaf index {index} outside the tree")
+        since = since or 0
+        if since > self.epoch:
+            since = 0  # client is ahead of us (e.g. registry restored from backup): send everything
+        siblings = {}
+        path_indices = []
+        node_index = index
+        for level in range(self.depth):
+            sibling = node_index ^ 1
+            if since == 0 or self._changed[level].get(sibling, 0) > since:
+                siblings[str(level)] = str(self.node(level, sibling))
+            path_indices.append(node_index & 1)
+            node_index >>= 1
+        response = {
+            "epoch": self.epoch,
+            "root_hex": self.root_hex,
+            "leaf_index": index,
+            "since": since,
+            "path_indices": path_indices,
+            "siblings": siblings,
+        }
+        if since == 0 or self._changed[0].get(index, 0) > since:
+            response["leaf"] = str(self.leaf(index))
+        return response
+
+    def path_delta_bytes(self, index: int, since: Optional[int]) -> bytes:
+        """Encoded path_delta, memoized for the current epoch (cleared on every publish)."""
+        key = (self.epoch, index, since or 0)
+        body = self._path_cache.get(key)
+        if body is None:
+            body = json.dumps(self.path_delta(index, since), separators=(",", ":")).encode()
+            self._path_cache[key] = body
+            while len(self._path_cache) > self._path_cache_size:
+                self._path_cache.popitem(last=False)
+        else:
+            self._path_cache.move_to_end(key)
+        return body
+
+    def _save(self):
+        write_json_atomic(self.path, {
+            "depth": self.depth,
+            "epoch": self.epoch,
+            "next_index": self.next_index,
+            # index -> [leaf value, epoch it last changed]; inner nodes are rebuilt on load
+            "leaves": {str(i): [str(self.leaf(i)), e] for i, e in self._changed[0].items()},
+        })
+        write_json_atomic(MERKLE_ROOT_PATH, {
+            "root_hex": self.root_hex,
+            "epoch": self.epoch,
+            # [root_hex, epoch, retired_at] still inside the grace window, so every process
+            # rebuilds the same root history from this file however many publishes it missed
+            "retired": self._retired_roots(),
+        })
+
+    def _retired_roots(self) -> List[list]:
+        """The published history plus the root this save replaces (the key cache is synced under the lock)."""
+        now = time.time()
+        snapshot = key_cache.snapshot
+        current = (self.root_hex, self.epoch)
+        retired = [[r, e, t] for r, e, t in snapshot.retired_roots
+                   if (r, e) != current and now - t <= settings.root_grace_period]
+        if snapshot.merkle_root is not None and snapshot.merkle_root != current:
+            retired.append([*snapshot.merkle_root, now])
+        return retired[-settings.root_history_size:] if settings.root_history_size > 0 else []
+
+    def on_keys_changed(self, old: KeySnapshot, new: KeySnapshot):
+        """KeyCache listener: another worker published a newer epoch, so re-read its saved tree."""
+        if new.merkle_root is not None and new.merkle_root[1] > self.epoch and os.path.exists(self.path):
+            self.load()
+
+    def load(self):
+        """
+        Rebuild the tree from the saved leaves. A node's last-change epoch is the
+        latest of its children's, since any child change changes its hash.
+        """
+        published = key_cache.merkle_root
+        if not os.path.exists(self.path):
+            # Continue numbering after whatever epoch is already published
+            self.epoch = published[1] if published else 0
+            return
+        with open(self.path, "r") as f:
+            data = json.load(f)
+        if data["depth"] != self.depth:
+            raise ValueError(f"Registry depth {data['depth']} does not match configured depth {self.depth}")
+
+        self._nodes = [{} for _ in range(self.depth + 1)]
+        self._changed = [{} for _ in range(self.depth + 1)]
+        for i, (value, epoch) in data["leaves"].items():
+            if int(value) != EMPTY:
+                self._nodes[0][int(i)] = int(value)
+            self._changed[0][int(i)] = epoch
+        for level in range(self.depth):
+            for parent in {index >> 1 for index in self._changed[level]}:
+                value = poseidon_pair(self.node(level, 2 * parent), self.node(level, 2 * parent + 1))
+                if value != self.zero[level + 1]:
+                    self._nodes[level + 1][parent] = value
+                self._changed[level + 1][parent] = max(
+                    self._changed[level].get(2 * parent, 0), self._changed[level].get(2 * parent + 1, 0)
+                )
+        self.epoch = max(data["epoch"], published[1] if published else 0)
+        self.next_index = data["next_index"]
+        self._path_cache.clear()
+        logger.info(f"Loaded commitment registry: {self.next_index} leaves, root {self.root_hex}, epoch {self.epoch}")
+
+
+class RevocationQueue:
+    """
+    Revocations requested since the last epoch. They are applied together as
+    one batched tree update, so one new root/epoch is published per interval
+    instead of one per removal.
+
+    The queue lives in a file next to the registry, read and written under the
+    registry's lock, so every worker sees the same pending set. Each worker
+    runs the interval loop, but a batch is only applied once `interval` has
+    passed since the last one (by any process), so there is still one epoch
+    per interval.
+    """
+
+    def __init__(self, registry: CommitmentRegistry, path: str, interval: float):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    def _read(self) -> Tuple[Set[int], float]:
+        if not os.path.exists(self.path):
+            return set(), 0.0
+        with open(self.path, "r") as f:
+            data = json.load(f)
+        return set(data["pending"]), data["last_applied"]
+
+    def _write(self, pending: Set[int], last_applied: float):
+        write_json_atomic(self.path, {"pending": sorted(pending), "last_applied": last_applied})
+
+    def pending(self) -> Set[int]:
+        return self._read()[0]
+
+    async def revoke(self, index: int) -> int:
+        """Queue a leaf for removal at the next batch. Returns the number pending."""
+        async with self.registry._exclusive():
+            if not 0 <= index < self.registry.next_index:
+                raise ValueError(f"No commitment at leaf index {index}")
+            pending, last_applied = self._read()
+            pending.add(index)
+            self._write(pending, last_applied)
+            return len(pending)
+
+    async def apply(self, due_only: bool = False) -> int:
+        """
+        Empty every pending leaf in one update. Returns how many were applied.
+        With `due_only`, nothing happens unless `interval` has passed since the last batch.
+        """
+        async with self.registry._exclusive():
+            pending, last_applied = self._read()
+            if not pending or (due_only and time.time() - last_applied < self.interval):
+                return 0
+            # The queue is cleared only after the update is saved; if interrupted, the
+            # next apply repeats it and leaves already emptied leaves as they are
+            await self.registry._update_locked({index: EMPTY for index in pending})
+            self._write(set(), time.time())
+            return len(pending)
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            if self._stopping.is_set():
+                break
+            try:
+                await self.apply(due_only=True)
+            except Exception as e:
+                logger.error(f"Revocation batch failed, will retry: {e}")
+
+    def start(self):
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stop the batch loop without interrupting a batch mid-apply; what is pending stays queued on disk."""
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+
+# Global instances, loaded and started by the app lifespan
+commitment_registry = CommitmentRegistry(REGISTRY_PATH, settings.registry_depth, settings.registry_path_cache_size)
+revocation_queue = RevocationQueue(commitment_registry, REVOCATIONS_PATH, settings.revocation_batch_interval)
+key_cache.add_listener(commitment_registry.on_keys_changed)
+
+metrics.gauge("registry_epoch", "Current commitment registry epoch", lambda: commitment_registry.epoch)
+metrics.gauge("revocations_pending", "Revocations waiting for the next batch", lambda: len(revocation_queue.pending()))
@@ -0,0 +1,155 @@
+"""
+Minimal in-process metrics rendered in the Prometheus text format.
+
+Histograms and counters are plain dicts, updated mostly on the event loop
+(and from verifier threads, where the GIL is good enough for monitoring);
+gauges are callbacks sampled at scrape time, so instrumented modules only
+register a function that reads their current size/depth.
+"""
+import bisect
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Seconds; verification stages range from microseconds (decode) to seconds (PLONK fallback)
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: LabelValues) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(labels[n] for n in self.labelnames)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=STAGE_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts..., +Inf count], sum
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels[n] for n in self.labelnames)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            self._sums[key] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[key] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key in sorted(self._counts):
+            counts = self._counts[key]
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames + ('le',), key + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {self._sums[key]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help: str, read: Callable[[], float]):
+        self.name = name
+        self.help = help
+        self.read = read
+
+    def render(self) -> List[str]:
+        try:
+            value = float(self.read())
+        except Exception:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {value}"]
+
+
+_registry: Dict[str, object] = {}
+
+
+def counter(name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+    return _registry.setdefault(name, Counter(name, help, labelnames))
+
+
+def histogram(name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=STAGE_BUCKETS) -> Histogram:
+    return _registry.setdefault(name, Histogram(name, help, labelnames, buckets))
+
+
+def gauge(name: str, help: str, read: Callable[[], float]) -> Gauge:
+    _registry[name] = Gauge(name, help, read)
+    return _registry[name]
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in _registry.values():
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Verification path metrics shared by the login and /verify routes
+VERIFICATION_STAGE_SECONDS = histogram(
+    "verification_stage_seconds", "Time spent in each verification stage", ("endpoint", "stage")
+)
+VERIFICATION_REJECTIONS = counter(
+    "verification_rejections_total", "Credentials rejected, by the stage that rejected them", ("endpoint", "reason")
+)
+VERIFICATION_RESULTS = counter(
+    "verification_results_total", "Completed verification requests by outcome", ("endpoint", "outcome")
+)
+PROOF_CACHE_LOOKUPS = counter(
+    "proof_cache_lookups_total", "Verified-proof cache lookups", ("kind", "result")
+)
+ZKP_BACKEND_SECONDS = histogram(
+    "zkp_backend_seconds", "Time spent in the underlying proof libraries and tools", ("call",)
+)
+
+# Per-request (stage, seconds) list, set by the debug Server-Timing middleware
+request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def stage(endpoint: str, name: str):
+    """Time a verification stage into the histogram (and the request's Server-Timing, in debug)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        VERIFICATION_STAGE_SECONDS.observe(elapsed, endpoint=endpoint, stage=name)
+        timings = request_timings.get()
+        if timings is not None:
+            timings.append((name, elapsed))
+
+
+def server_timing_header(timings: List[Tuple[str, float]]) -> str:
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings)
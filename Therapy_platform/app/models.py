@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, Boolean, Index
 from datetime import datetime
 from .database import Base
 
@@ -21,11 +21,33 @@ class PseudoUser(Base):
 
 class AuthChallenge(Base):
     __tablename__ = "auth_challenges"
+    __table_args__ = (
+        # Matches the consume predicate exactly, so the conditional UPDATE is a single index probe
+        Index("ix_auth_challenges_consume", "challenge_id", "pk_bind_key", "used"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     challenge_id = Column(String, unique=True, index=True, nullable=False)
     challenge_bytes = Column(LargeBinary, nullable=False)
     pk_bind_key = Column(LargeBinary, nullable=False)  # Public key this challenge is for
     created_at = Column(DateTime, default=datetime.now)
-    expires_at = Column(DateTime, nullable=False)
-    used = Column(String, default="false")  # "false", "true"
+    expires_at = Column(DateTime, nullable=False, index=True)  # Used by the purge job
+    used = Column(Boolean, default=False, nullable=False)
+
+class BoundNonce(Base):
+    __tablename__ = "bound_nonces"
+    __table_args__ = (
+        # Same shape as the challenge consume index: one probe for the conditional UPDATE
+        Index("ix_bound_nonces_consume", "nonce", "pk_bind_key", "used"),
+        # Per-key and per-client issuance limits
+        Index("ix_bound_nonces_key", "pk_bind_key", "expires_at"),
+        Index("ix_bound_nonces_client", "client", "created_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    nonce = Column(LargeBinary, unique=True, nullable=False)  # BBS+ proof nonce issued to the holder
+    pk_bind_key = Column(LargeBinary, nullable=False)  # Public key this nonce is for
+    client = Column(String, nullable=False)  # Address it was issued to
+    created_at = Column(DateTime, default=datetime.now)
+    expires_at = Column(DateTime, nullable=False, index=True)  # Used by the purge job
+    used = Column(Boolean, default=False, nullable=False)
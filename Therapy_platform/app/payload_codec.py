@@ -0,0 +1,169 @@
+"""
+Compact binary login payload (version 1), sent as Content-Type MEDIA_TYPE.
+
+All integers are big-endian. Field elements are fixed 32-byte integers and
+BN254 G1 points are affine (x, y) pairs, 64 bytes, so a PLONK proof is always
+PLONK_PROOF_BYTES long instead of kilobytes of pretty-printed decimal JSON.
+
+    magic "TPC" | version u8 | epoch u32 | message_count u8 | merkle_root 32
+    bbs_public_key  u16 len | bytes
+    bbs_proof       u16 len | bytes
+    bbs_nonce       u8 len  | bytes
+    revealed        u8 count | (u8 name len | name | u16 value len | value) * count
+    plonk_proof     A B C Z T1 T2 T3 Wxi Wxiw (G1) | eval_a eval_b eval_c eval_s1 eval_s2 eval_zw (Fr)
+    plonk_public    u8 count | Fr * count
+    challenge_id    16 (UUID bytes)
+    challenge_sig   64
+
+Everything before the challenge trailer is the credential record the issuer
+tool writes once; a client appends the trailer for each login.
+
+The BBS+ proof and its nonce are part of that record, so a record is only
+reusable while the server accepts self-picked nonces. Once the key holds
+nonces from /auth/nonces, or require_bound_nonce is set, every login needs a
+record built over a freshly issued nonce (ZKP_Software/service.py does this
+per login; the offline issuer tools do not).
+"""
+import struct
+import uuid
+from typing import Dict, List
+
+from .credential import (
+    LoginCredential, LoginRejected, check_shape, REQUIRED_REVEALED, PUBLIC_SIGNAL_COUNT,
+    MAX_BBS_PUBLIC_KEY_BYTES, MAX_BBS_PROOF_BYTES, MAX_NONCE_BYTES, MAX_REVEALED_VALUE_BYTES,
+    MAX_MESSAGE_COUNT, SIGNATURE_BYTES
+)
+
+MAGIC = b"TPC"
+VERSION = 1
+MEDIA_TYPE = "application/vnd.pseudo-id.credential"
+
+FIELD_BYTES = 32
+G1_BYTES = 2 * FIELD_BYTES
+PLONK_POINTS = ("A", "B", "C", "Z", "T1", "T2", "T3", "Wxi", "Wxiw")
+PLONK_EVALUATIONS = ("eval_a", "eval_b", "eval_c", "eval_s1", "eval_s2", "eval_zw")
+PLONK_PROOF_BYTES = len(PLONK_POINTS) * G1_BYTES + len(PLONK_EVALUATIONS) * FIELD_BYTES
+CHALLENGE_TRAILER_BYTES = 16 + SIGNATURE_BYTES
+
+# BN254 base field (point coordinates) and scalar field (evaluations, public signals)
+BN254_Q = 0x30644E72E131A029B85045B68181585D97816A916871CA8D3C208C16D87CFD47
+BN254_R = 0x30644E72E131A029B85045B68181585D2833E84879B9709143E1F593F0000001
+
+_HEADER = struct.Struct(">3sBIB")
+
+
+class _Reader:
+    """Sequential reads over a memoryview; slices share the request body's buffer."""
+
+    def __init__(self, data: memoryview):
+        self.data = data
+        self.pos = 0
+
+    def take(self, n: int, field: str) -> memoryview:
+        end = self.pos + n
+        if end > len(self.data):
+            raise LoginRejected(f"Truncated payload at {field}")
+        view = self.data[self.pos:end]
+        self.pos = end
+        return view
+
+    def u8(self, field: str) -> int:
+        return self.take(1, field)[0]
+
+    def u16(self, field: str) -> int:
+        return int.from_bytes(self.take(2, field), "big")
+
+    def sized(self, length: int, field: str, max_bytes: int) -> memoryview:
+        if length > max_bytes:
+            raise LoginRejected(f"{field} too large")
+        return self.take(length, field)
+
+
+def _elements(view: memoryview, modulus: int, field: str) -> List[str]:
+    """Consecutive 32-byte big-endian field elements as the decimal strings snarkjs expects."""
+    values = [int.from_bytes(view[i:i + FIELD_BYTES], "big") for i in range(0, len(view), FIELD_BYTES)]
+    if values and max(values) >= modulus:
+        raise LoginRejected(f"{field} is not a canonical field element")
+    return [str(v) for v in values]
+
+
+def _decode_plonk_proof(view: memoryview) -> dict:
+    points_end = len(PLONK_POINTS) * G1_BYTES
+    coords = _elements(view[:points_end], BN254_Q, "plonk_proof")
+    proof = {name: [coords[2 * i], coords[2 * i + 1], "1"] for i, name in enumerate(PLONK_POINTS)}
+    proof.update(zip(PLONK_EVALUATIONS, _elements(view[points_end:], BN254_R, "plonk_proof")))
+    proof["protocol"] = "plonk"
+    proof["curve"] = "bn128"
+    return proof
+
+
+def decode_binary_payload(body: bytes) -> LoginCredential:
+    """
+    Tier 1 for the binary format: decode straight out of the request body.
+    Fields are located with memoryview slices and the fixed-width elements are
+    parsed from them directly, but every field the credential keeps is copied
+    once into bytes (it outlives the body and is hashed for cache keys).
+    """
+    data = memoryview(body)
+    if len(data) < _HEADER.size:
+        raise LoginRejected("Truncated payload")
+    magic, version, epoch, message_count = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise LoginRejected("Not a binary credential payload")
+    if version != VERSION:
+        raise LoginRejected(f"Unsupported payload version {version}")
+    if not 1 <= message_count <= MAX_MESSAGE_COUNT:
+        raise LoginRejected("message_count out of range")
+
+    reader = _Reader(data)
+    reader.pos = _HEADER.size
+    merkle_root = reader.take(FIELD_BYTES, "merkle_root")
+    bbs_public_key = reader.sized(reader.u16("bbs_public_key"), "bbs_public_key", MAX_BBS_PUBLIC_KEY_BYTES)
+    bbs_proof = reader.sized(reader.u16("bbs_proof"), "bbs_proof", MAX_BBS_PROOF_BYTES)
+    bbs_nonce = reader.sized(reader.u8("bbs_nonce"), "bbs_nonce", MAX_NONCE_BYTES)
+
+    revealed_count = reader.u8("revealed")
+    if revealed_count > message_count:
+        raise LoginRejected("More revealed messages than signed messages")
+    revealed: Dict[str, bytes] = {}
+    for _ in range(revealed_count):
+        try:
+            name = bytes(reader.take(reader.u8("revealed"), "revealed")).decode("ascii")
+        except UnicodeDecodeError:
+            raise LoginRejected("Malformed revealed attribute")
+        if name in revealed:
+            raise LoginRejected("Malformed revealed attribute")
+        revealed[name] = bytes(reader.sized(reader.u16(name), name, MAX_REVEALED_VALUE_BYTES))
+    missing = [name for name in REQUIRED_REVEALED if name not in revealed]
+    if missing:
+        raise LoginRejected(f"Revealed set is missing: {', '.join(missing)}")
+
+    plonk_proof = reader.take(PLONK_PROOF_BYTES, "plonk_proof")
+    signal_count = reader.u8("plonk_public")
+    if signal_count != PUBLIC_SIGNAL_COUNT:
+        raise LoginRejected("PLONK public signals have the wrong shape")
+    plonk_public = reader.take(signal_count * FIELD_BYTES, "plonk_public")
+    challenge_id = reader.take(16, "challenge_id")
+    challenge_signature = reader.take(SIGNATURE_BYTES, "challenge_signature")
+    if reader.pos != len(data):
+        raise LoginRejected("Trailing bytes after payload")
+
+    credential = LoginCredential(
+        bbs_public_key=bytes(bbs_public_key),
+        bbs_proof=bytes(bbs_proof),
+        bbs_nonce=bytes(bbs_nonce),
+        message_count=message_count,
+        revealed=revealed,
+        # The fixed-width encodings double as the proof cache key material
+        plonk_proof_bytes=bytes(plonk_proof),
+        plonk_public_bytes=bytes(plonk_public),
+        plonk_proof=_decode_plonk_proof(plonk_proof),
+        plonk_public=_elements(plonk_public, BN254_R, "plonk_public"),
+        # Same unpadded lower-case hex the issuer publishes (hex(root)[2:])
+        merkle_root_hex=format(int.from_bytes(merkle_root, "big"), "x"),
+        epoch=epoch,
+        challenge_id=str(uuid.UUID(bytes=bytes(challenge_id))),
+        challenge_signature=bytes(challenge_signature),
+    )
+    check_shape(credential)
+    return credential
@@ -0,0 +1,287 @@
+import asyncio
+import base64
+import itertools
+import json
+import logging
+import os
+import time
+from typing import List, Optional
+
+from . import metrics
+from .config import settings
+from .zkp import VK_PATH, KeySnapshot, key_cache, verify_plonk_with_snarkjs
+
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plonk_worker.js")
+
+# Longest wait between restart attempts for a worker that keeps failing to start
+MAX_RESTART_BACKOFF = 300.0
+
+
+class PlonkWorkerError(Exception):
+    """Raised when a verifier worker dies, times out or answers garbage."""
+
+
+class _PlonkWorker:
+    """One long-lived `node plonk_worker.js` process with the verification key loaded."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.proc: Optional[asyncio.subprocess.Process] = None
+        self._ids = itertools.count(1)
+        self.key_generation = 0  # pool key generation this process loaded
+        self.failures = 0  # consecutive failed starts, for the restart backoff
+        self.retry_at = 0.0  # monotonic time of the next restart attempt while out of rotation
+
+    @property
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.returncode is None
+
+    async def start(self):
+        self.proc = await asyncio.create_subprocess_exec(
+            settings.node_binary, WORKER_SCRIPT, VK_PATH,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        # The worker prints a ready line once snarkjs and the key are loaded
+        ready = await self._read(settings.plonk_worker_start_timeout)
+        if not ready.get("ready"):
+            raise PlonkWorkerError(f"worker {self.index} did not report ready")
+
+    async def _read(self, timeout: float) -> dict:
+        try:
+            line = await asyncio.wait_for(self.proc.stdout.readline(), timeout)
+        except asyncio.TimeoutError:
+            raise PlonkWorkerError(f"worker {self.index} timed out")
+        if not line:
+            raise PlonkWorkerError(f"worker {self.index} exited")
+        try:
+            return json.loads(line)
+        except ValueError:
+            raise PlonkWorkerError(f"worker {self.index} sent malformed output")
+
+    async def request(self, message: dict, timeout: float) -> dict:
+        """Send one request and wait for its reply (one request in flight per worker)."""
+        if not self.alive:
+            raise PlonkWorkerError(f"worker {self.index} is not running")
+        message["id"] = next(self._ids)
+        try:
+            self.proc.stdin.write(json.dumps(message).encode() + b"\n")
+            await self.proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            raise PlonkWorkerError(f"worker {self.index} pipe closed")
+        reply = await self._read(timeout)
+        if reply.get("id") != message["id"]:
+            raise PlonkWorkerError(f"worker {self.index} answered out of order")
+        return reply
+
+    async def stop(self):
+        if not self.alive:
+            return
+        self.proc.stdin.close()
+        try:
+            await asyncio.wait_for(self.proc.wait(), 2)
+        except asyncio.TimeoutError:
+            self.proc.kill()
+            await self.proc.wait()
+
+
+class PlonkVerifierPool:
+    """
+    Pool of warm snarkjs verifier processes.
+
+    Each worker parses the verification key once at start, so a verification
+    costs a pipe round-trip instead of a Node boot. A worker that fails is
+    taken out of rotation, and the background health loop restarts it with
+    exponential backoff, so requests never wait on a worker's start timeout
+    again and again. While no worker is in rotation the pool falls back to the
+    one-shot `snarkjs plonk verify` subprocess.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._workers: List[_PlonkWorker] = []
+        self._idle: Optional[asyncio.Queue] = None  # workers in rotation and free; None wakes a waiter to fall back
+        self._failed: List[_PlonkWorker] = []  # out of rotation until the health loop restarts them
+        self._health_task: Optional[asyncio.Task] = None
+        self.waiting = 0  # verifications queued for a free worker
+        self.key_generation = 0  # bumped on every verification key change
+
+    @property
+    def healthy_workers(self) -> int:
+        return sum(1 for w in self._workers if w.alive)
+
+    @property
+    def workers_in_rotation(self) -> int:
+        return len(self._workers) - len(self._failed)
+
+    @property
+    def idle_workers(self) -> int:
+        return self._idle.qsize() if self._idle is not None else 0
+
+    async def start(self):
+        self._idle = asyncio.Queue()
+        if key_cache.vk_bytes is None:
+            logger.warning(f"No verification key at {VK_PATH}; PLONK pool idle until one is published")
+            return
+        await self._spawn()
+
+    async def _spawn(self):
+        for i in range(self.size):
+            worker = _PlonkWorker(i)
+            self._workers.append(worker)
+            if await self._start_worker(worker):
+                self._idle.put_nowait(worker)
+            else:
+                self._retire(worker)
+        self._health_task = asyncio.create_task(self._health_loop())
+        logger.info(f"PLONK verifier pool started ({self.healthy_workers}/{self.size} workers)")
+
+    async def _start_worker(self, worker: _PlonkWorker) -> bool:
+        try:
+            await worker.start()
+            worker.key_generation = self.key_generation
+            worker.failures = 0
+            return True
+        except (OSError, PlonkWorkerError) as e:
+            logger.warning(f"PLONK worker {worker.index} failed to start: {e}")
+            await worker.stop()
+            return False
+
+    async def _restart(self, worker: _PlonkWorker) -> bool:
+        await worker.stop()
+        if await self._start_worker(worker):
+            logger.info(f"PLONK worker {worker.index} restarted")
+            return True
+        return False
+
+    def _retire(self, worker: _PlonkWorker):
+        """Take a worker out of rotation; the health loop restarts it after a backoff."""
+        worker.retry_at = time.monotonic() + min(
+            settings.plonk_health_interval * 2 ** worker.failures, MAX_RESTART_BACKOFF
+        )
+        worker.failures += 1
+        self._failed.append(worker)
+        if self.workers_in_rotation == 0:
+            # Nothing will come back to the queue before the next restart: let waiters fall back
+            for _ in range(self.waiting):
+                self._idle.put_nowait(None)
+
+    async def _retry_failed(self):
+        now = time.monotonic()
+        for worker in [w for w in self._failed if w.retry_at <= now]:
+            self._failed.remove(worker)
+            if await self._restart(worker):
+                self._idle.put_nowait(worker)
+            else:
+                self._retire(worker)
+
+    async def reload(self):
+        """
+        Restart every worker on the old verification key. Idle workers are restarted
+        one at a time here; a worker that is busy now is restarted by verify() the
+        next time it is taken, before it verifies anything.
+        """
+        self.key_generation += 1
+        generation = self.key_generation
+        for _ in range(self._idle.qsize()):
+            worker = self._idle.get_nowait()
+            if worker is None:
+                continue
+            if worker.key_generation == generation or await self._restart(worker):
+                self._idle.put_nowait(worker)
+            else:
+                self._retire(worker)
+        logger.info("PLONK verifier pool reloaded with new verification key")
+
+    def on_keys_changed(self, old: KeySnapshot, new: KeySnapshot):
+        """KeyCache listener: rolling restart when the verification key changes."""
+        if self._idle is None or new.vk_bytes is None or new.vk_bytes == old.vk_bytes:
+            return
+        if self._workers:
+            asyncio.get_running_loop().create_task(self.reload())
+        else:
+            asyncio.get_running_loop().create_task(self._spawn())
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(settings.plonk_health_interval)
+            await self._retry_failed()
+            # Only ping workers that are idle right now; busy ones prove themselves
+            for _ in range(self._idle.qsize()):
+                worker = self._idle.get_nowait()
+                if worker is None:
+                    continue
+                try:
+                    reply = await worker.request({"op": "ping"}, settings.plonk_verify_timeout)
+                    if not reply.get("ok"):
+                        raise PlonkWorkerError(f"worker {worker.index} failed ping")
+                except PlonkWorkerError as e:
+                    logger.warning(f"PLONK health check: {e}")
+                    if not await self._restart(worker):
+                        self._retire(worker)
+                        continue
+                self._idle.put_nowait(worker)
+
+    async def verify(self, proof: dict, public: list) -> bool:
+        """Verify a parsed snarkjs proof/public pair on a warm worker."""
+        if self.workers_in_rotation == 0:
+            return await self._fallback(proof, public)
+
+        self.waiting += 1
+        try:
+            worker = await self._idle.get()
+        finally:
+            self.waiting -= 1
+        if worker is None:
+            return await self._fallback(proof, public)
+        try:
+            if worker.key_generation != self.key_generation and not await self._restart(worker):
+                raise PlonkWorkerError(f"worker {worker.index} could not restart on the new key")
+            start = time.perf_counter()
+            reply = await worker.request(
+                {"op": "verify", "proof": proof, "public": public},
+                settings.plonk_verify_timeout
+            )
+            metrics.ZKP_BACKEND_SECONDS.observe(time.perf_counter() - start, call="plonk_worker")
+        except PlonkWorkerError as e:
+            logger.warning(f"PLONK worker failed, falling back to snarkjs subprocess: {e}")
+            await worker.stop()
+            self._retire(worker)
+            return await self._fallback(proof, public)
+        except BaseException:
+            # Cancelled mid-request: its reply would reach the next caller, so start afresh
+            if worker.alive:
+                worker.proc.kill()
+            self._retire(worker)
+            raise
+        self._idle.put_nowait(worker)
+        return reply.get("ok") is True
+
+    async def _fallback(self, proof: dict, public: list) -> bool:
+        def _run():
+            return verify_plonk_with_snarkjs(
+                vk_json_bytes=key_cache.vk_bytes,
+                proof_json_b64=base64.b64encode(json.dumps(proof).encode()).decode(),
+                public_json_b64=base64.b64encode(json.dumps(public).encode()).decode()
+            )
+        return await asyncio.get_running_loop().run_in_executor(None, _run)
+
+    async def close(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+        for worker in self._workers:
+            await worker.stop()
+        self._workers = []
+        self._failed = []
+
+
+# Global instance, started and stopped by the app lifespan
+plonk_pool = PlonkVerifierPool(size=settings.plonk_verify_workers)
+
+metrics.gauge("plonk_workers_healthy", "Live snarkjs verifier workers", lambda: plonk_pool.healthy_workers)
+metrics.gauge("plonk_workers_idle", "Verifier workers waiting for work", lambda: plonk_pool.idle_workers)
+metrics.gauge("plonk_verify_queue_depth", "PLONK verifications waiting for a free worker", lambda: plonk_pool.waiting)
+key_cache.add_listener(plonk_pool.on_keys_changed)
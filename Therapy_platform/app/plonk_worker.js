@@ -0,0 +1,60 @@
+// Long-lived PLONK verifier used by app/plonk_pool.py.
+// Loads the verification key once, then answers newline-delimited JSON
+// requests on stdin with one JSON line per request on stdout:
+//   {"id": 1, "op": "ping"}                               -> {"id": 1, "ok": true}
+//   {"id": 2, "op": "verify", "proof": {...}, "public": [...]} -> {"id": 2, "ok": true|false}
+const { execSync } = require("child_process");
+const fs = require("fs");
+const path = require("path");
+const readline = require("readline");
+
+// A local node_modules (or NODE_PATH) first, else the global install from the README
+function requireSnarkjs() {
+    try {
+        return require("snarkjs");
+    } catch (err) {
+        return require(path.join(execSync("npm root -g").toString().trim(), "snarkjs"));
+    }
+}
+
+const snarkjs = requireSnarkjs();
+
+const vkPath = process.argv[2];
+const vk = JSON.parse(fs.readFileSync(vkPath, "utf8"));
+
+// snarkjs logs verification results through the logger it is given; keep stdout clean
+const quietLogger = { debug() {}, info() {}, warn() {}, error() {} };
+
+function reply(msg) {
+    process.stdout.write(JSON.stringify(msg) + "\n");
+}
+
+const rl = readline.createInterface({ input: process.stdin });
+
+rl.on("line", async (line) => {
+    let req;
+    try {
+        req = JSON.parse(line);
+    } catch (err) {
+        reply({ id: null, ok: false, error: "malformed request" });
+        return;
+    }
+
+    try {
+        if (req.op === "ping") {
+            reply({ id: req.id, ok: true });
+        } else if (req.op === "verify") {
+            const ok = await snarkjs.plonk.verify(vk, req.public, req.proof, quietLogger);
+            reply({ id: req.id, ok: ok === true });
+        } else {
+            reply({ id: req.id, ok: false, error: `unknown op: ${req.op}` });
+        }
+    } catch (err) {
+        reply({ id: req.id, ok: false, error: String(err) });
+    }
+});
+
+// Parent closed the pipe: exit instead of lingering with curve worker threads
+rl.on("close", () => process.exit(0));
+
+reply({ id: 0, ok: true, ready: true });
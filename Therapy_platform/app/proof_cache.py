@@ -0,0 +1,116 @@
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import NamedTuple, Optional, Set, Tuple
+
+from . import metrics
+from .config import settings
+from .credential import proof_date
+from .root_history import root_history
+from .zkp import KeySnapshot, key_cache
+
+
+class _Entry(NamedTuple):
+    expires_at: float                  # unix time
+    merkle_root: Tuple[str, int]       # (root_hex_lower, epoch) the proof was checked against
+
+
+class VerifiedProofCache:
+    """
+    LRU of proofs that already passed cryptographic verification.
+
+    A holder presents the same PLONK/BBS+ proof on every login for the same day
+    and root, so a hit lets us skip the pairing checks. Only successes are
+    cached. Entries expire at the earlier of the configured TTL and the end of
+    the day the proof was generated for, and are purged when the published root
+    moves on. PLONK keys include the verification key digest, and the cache is
+    cleared when that key changes. Freshness of each login still comes from the Ed25519 challenge.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[bytes, _Entry]" = OrderedDict()
+
+    @staticmethod
+    def key(kind: str, *parts) -> bytes:
+        """Digest of the verification inputs; each part is length-prefixed so fields can't run together."""
+        h = hashlib.sha256(kind.encode())
+        for part in parts:
+            if not isinstance(part, bytes):
+                part = str(part).encode()
+            h.update(len(part).to_bytes(4, "big"))
+            h.update(part)
+        return h.digest()
+
+    def get(self, key: bytes) -> bool:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        if entry.expires_at <= time.time():
+            del self._entries[key]
+            return False
+        self._entries.move_to_end(key)
+        return True
+
+    def put(self, key: bytes, merkle_root: Tuple[str, int], valid_until: Optional[float] = None):
+        expires_at = time.time() + self.ttl
+        if valid_until is not None:
+            expires_at = min(expires_at, valid_until)
+        self._entries[key] = _Entry(expires_at, merkle_root)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def purge_roots_except(self, accepted: Set[Tuple[str, int]]):
+        """Drop every entry verified against a root that is no longer accepted."""
+        stale = [k for k, e in self._entries.items() if e.merkle_root not in accepted]
+        for k in stale:
+            del self._entries[k]
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def proof_day_end(public_signals: list) -> Optional[float]:
+    """End of the day a PLONK proof was generated for, as a unix time."""
+    day = proof_date(public_signals)
+    if day is None:
+        return None
+    return (datetime(day.year, day.month, day.day) + timedelta(days=1)).timestamp()
+
+
+# Global instance
+proof_cache = VerifiedProofCache(
+    max_entries=settings.proof_cache_size,
+    ttl=settings.proof_cache_ttl
+)
+
+
+_vk_digest: Tuple[Optional[bytes], bytes] = (None, b"")
+
+
+def verification_key_digest() -> bytes:
+    """sha256 of the loaded verification key, for PLONK cache keys (recomputed only when the key changes)."""
+    global _vk_digest
+    vk_bytes = key_cache.vk_bytes
+    if _vk_digest[0] is not vk_bytes:
+        _vk_digest = (vk_bytes, hashlib.sha256(vk_bytes or b"").digest())
+    return _vk_digest[1]
+
+
+def _on_keys_changed(old: KeySnapshot, new: KeySnapshot):
+    if new.vk_bytes != old.vk_bytes:
+        # Proofs verified under the old key prove nothing under the new one
+        proof_cache.clear()
+    elif new.merkle_root != old.merkle_root:
+        # root_history has already seen the new root (its listener is registered first)
+        proof_cache.purge_roots_except(root_history.accepted())
+
+key_cache.add_listener(_on_keys_changed)
+
+metrics.gauge("proof_cache_entries", "Verified proofs currently cached", lambda: len(proof_cache))
@@ -0,0 +1,90 @@
+import time
+from collections import deque
+from typing import Dict, Optional, Set, Tuple
+
+from .config import settings
+from .zkp import KeySnapshot, key_cache
+
+Root = Tuple[str, int]  # (root_hex_lower, epoch)
+
+
+class RootHistory:
+    """
+    The published root plus recently retired ones the verifier still accepts.
+
+    When a new root is published (e.g. after a revocation batch or an issuance)
+    the previous one stays acceptable for `grace` seconds, so holders aren't all
+    forced to re-prove the moment it changes. The window is by time alone:
+    however many roots are published within it, each one stays acceptable for
+    the full grace period. `size` is only a safety bound on memory. A dict keyed
+    by (root, epoch) gives O(1) lookups.
+    """
+
+    def __init__(self, size: int, grace: float):
+        self.grace = grace
+        self.current: Optional[Root] = None
+        self._ring: deque = deque()
+        self._size = size
+        self._retired_at: Dict[Root, float] = {}
+
+    def _expire(self, now: float):
+        # Retired in publish order, so the ones past their grace period are at the front
+        while self._ring and now - self._retired_at[self._ring[0]] > self.grace:
+            del self._retired_at[self._ring.popleft()]
+
+    def publish(self, root: Optional[Root]):
+        if root == self.current:
+            return
+        self._expire(time.time())
+        if self.current is not None and self._size > 0:
+            if len(self._ring) >= self._size:
+                self._retired_at.pop(self._ring.popleft(), None)
+            self._ring.append(self.current)
+            self._retired_at[self.current] = time.time()
+        if root in self._retired_at:
+            # Republished (e.g. a rollback): it is current again, not retired
+            del self._retired_at[root]
+            self._ring.remove(root)
+        self.current = root
+
+    def restore(self, retired):
+        """
+        Merge (root_hex, epoch, retired_at) entries persisted by the publisher, so a
+        process that missed some publishes (e.g. workers forked from a master that
+        last reloaded a few epochs ago) still accepts the roots retired in between.
+        """
+        for root_hex, epoch, retired_at in sorted(retired, key=lambda r: r[2]):
+            root = (root_hex, epoch)
+            if root == self.current or self._size == 0:
+                continue
+            if root not in self._retired_at:
+                if len(self._ring) >= self._size:
+                    self._retired_at.pop(self._ring.popleft(), None)
+                self._ring.append(root)
+            self._retired_at[root] = retired_at
+
+    def accepts(self, root: Root) -> bool:
+        if root == self.current:
+            return True
+        retired_at = self._retired_at.get(root)
+        return retired_at is not None and time.time() - retired_at <= self.grace
+
+    def accepted(self) -> Set[Root]:
+        """Every root currently accepted (the published one plus those still in their grace window)."""
+        now = time.time()
+        roots = {root for root, retired_at in self._retired_at.items() if now - retired_at <= self.grace}
+        if self.current is not None:
+            roots.add(self.current)
+        return roots
+
+
+# Global instance, fed by the key cache. Modules that react to root changes import this
+# first, so its listener is registered (and runs) before theirs.
+root_history = RootHistory(settings.root_history_size, settings.root_grace_period)
+
+
+def _on_keys_changed(old: KeySnapshot, new: KeySnapshot):
+    root_history.publish(new.merkle_root)
+    root_history.restore(new.retired_roots)
+
+key_cache.add_listener(_on_keys_changed)
@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+import hmac
+
+from .. import metrics
+from ..config import settings
+from ..zkp import key_cache
+from ..merkle_registry import commitment_registry, revocation_queue
+
+router = APIRouter(tags=["admin"])
+
+LOOPBACK_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+class CommitmentRequest(BaseModel):
+    # Decimal field element, or hex with a 0x prefix
+    commitment: str = Field(pattern="^([0-9]+|0x[0-9a-fA-F]+)$", max_length=80)
+
+    def value(self) -> int:
+        # Not int(x, 0): that rejects decimals with leading zeros
+        if self.commitment.startswith("0x"):
+            return int(self.commitment[2:], 16)
+        return int(self.commitment, 10)
+
+def require_admin(request: Request):
+    """
+    Admin endpoints are for the operator on this machine only.
+    Tor delivers onion traffic from 127.0.0.1 too, so a loopback address alone is not enough:
+    the request must also carry the configured admin token
+    (as X-Admin-Token, or as a bearer token for scrapers that only support that).
+    """
+    if not settings.admin_token:
+        raise HTTPException(status_code=404)
+    client_host = request.client.host if request.client else None
+    token = request.headers.get("x-admin-token", "")
+    authorization = request.headers.get("authorization", "")
+    if not token and authorization.lower().startswith("bearer "):
+        token = authorization[7:].strip()
+    if client_host not in LOOPBACK_HOSTS or not hmac.compare_digest(token.encode(), settings.admin_token.encode()):
+        raise HTTPException(status_code=404)
+
+@router.get("/metrics", dependencies=[Depends(require_admin)])
+async def get_metrics():
+    """Verification stage latencies, rejection counts and queue depths in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@router.post("/keys/reload", dependencies=[Depends(require_admin)])
+async def reload_keys():
+    """Re-read keys/ immediately instead of waiting for the mtime watcher"""
+    changed = key_cache.reload(force=True)
+    root = key_cache.merkle_root
+    return {
+        "reloaded": changed,
+        "merkle_root": root[0] if root else None,
+        "epoch": root[1] if root else None,
+        "has_verification_key": key_cache.vk_bytes is not None
+    }
+
+@router.post("/registry/commitments", dependencies=[Depends(require_admin)])
+async def add_commitment(request: CommitmentRequest):
+    """Register a newly issued credential's commitment and publish the new root"""
+    try:
+        leaf_index = await commitment_registry.add(request.value())
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"leaf_index": leaf_index, "root_hex": commitment_registry.root_hex, "epoch": commitment_registry.epoch}
+
+@router.delete("/registry/commitments/{leaf_index}", status_code=202, dependencies=[Depends(require_admin)])
+async def revoke_commitment(leaf_index: int):
+    """Queue a leaf for revocation; it is emptied with the rest of the batch at the next epoch"""
+    try:
+        pending = await revocation_queue.revoke(leaf_index)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"leaf_index": leaf_index, "pending": pending, "epoch": commitment_registry.epoch}
+
+@router.post("/registry/revocations/apply", dependencies=[Depends(require_admin)])
+async def apply_revocations():
+    """Apply queued revocations now instead of waiting for the batch interval"""
+    applied = await revocation_queue.apply()
+    return {"applied": applied, "root_hex": commitment_registry.root_hex, "epoch": commitment_registry.epoch}
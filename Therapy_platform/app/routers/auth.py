@@ -1,26 +1,36 @@
 from fastapi import APIRouter, Request, Depends
+from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 from typing import Annotated, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..utils import render_template
-from ..bbs_verify import verify_bbs_proof
-from ..database import get_db
-from ..crud import get_user_by_pk_bind, create_user, update_user_credentials, generate_pseudo_id
-from ..models import PseudoUser, AuthChallenge
+from ..bbs_verify import verify_bbs_proof_async
+from ..plonk_pool import plonk_pool
+from ..proof_cache import proof_cache, proof_day_end, verification_key_digest
+from ..credential import (
+    LoginCredential, LoginRejected, decode_json_payload, check_root, check_public_signals,
+    MAX_LOGIN_BODY_BYTES
+)
+from ..payload_codec import MEDIA_TYPE as BINARY_PAYLOAD_TYPE, decode_binary_payload
+from ..config import settings
+from ..root_history import root_history
+from ..database import get_async_db
+from ..crud import get_user_by_pk_bind_async, create_user_async, update_user_credentials_async
+from ..challenge_store import Challenge, challenge_store
+from ..sessions import SESSION_COOKIE, issue_session_token
+from ..metrics import stage, PROOF_CACHE_LOOKUPS, VERIFICATION_REJECTIONS, VERIFICATION_RESULTS
 import base64
 import os
 import hashlib
-from datetime import datetime, timedelta
-import uuid
 from nacl.signing import VerifyKey
 from nacl.exceptions import BadSignatureError
 
 router = APIRouter()
 
 # Type aliases for Pydantic
-Base64Str = Annotated[str, Field(pattern="^[A-Za-z0-9+/=]+$")]
-HexStr = Annotated[str, Field(pattern="^[0-9a-fA-F]+$")]
+Base64Str = Annotated[str, Field(pattern="^[A-Za-z0-9+/=]+$", max_length=16384)]
+HexStr = Annotated[str, Field(pattern="^[0-9a-fA-F]+$", max_length=64)]
 
 # Payload models
 class ProofPayload(BaseModel):
@@ -28,68 +38,34 @@ class ProofPayload(BaseModel):
     bbs_proof: Base64Str
     bbs_nonce: Base64Str
     message_count: int
-    revealed: list 
+    revealed: list = Field(max_length=16)
     plonk_proof: Base64Str
     plonk_public: Base64Str
     merkle_root_hex: HexStr
     epoch: int
     # Authentication via challenge-response
-    challenge_id: str
+    challenge_id: str = Field(max_length=64)
     challenge_signature: Base64Str
 
 class ChallengeRequest(BaseModel):
     pk_bind_key: Base64Str
 
+class NonceRequest(BaseModel):
+    # A fresh challenge signed with the binding key, so only its holder gets nonces for it
+    pk_bind_key: Base64Str
+    challenge_id: str = Field(max_length=64)
+    challenge_signature: Base64Str
+    # BBS+ proof nonces to issue, for proofs precomputed ahead of login
+    nonces: int = Field(ge=1, le=settings.bound_nonce_batch_max)
+
 # Detect local dev for cookie
 DEV = os.environ.get("DEV", "1") == "1"
 
-def create_challenge(db: Session, pk_bind_key: bytes) -> dict:
-    """Create a new authentication challenge"""
-    challenge_id = str(uuid.uuid4())
-    challenge_bytes = os.urandom(32)  # Random 32-byte challenge
-    expires_at = datetime.now() + timedelta(minutes=10)  # Challenge expires in 10 minutes
-    
-    challenge = AuthChallenge(
-        challenge_id=challenge_id,
-        challenge_bytes=challenge_bytes,
-        pk_bind_key=pk_bind_key,
-        expires_at=expires_at
-    )
-    
-    db.add(challenge)
-    db.commit()
-    
-    return {
-        "challenge_id": challenge_id,
-        "challenge": base64.b64encode(challenge_bytes).decode(),
-        "expires_at": expires_at.isoformat()
-    }
-
-def verify_challenge_signature(db: Session, challenge_id: str, signature: bytes, pk_bind_key: bytes) -> bool:
-    """Verify that the challenge was signed correctly"""
-    # Get the challenge from database
-    challenge = db.query(AuthChallenge).filter(
-        AuthChallenge.challenge_id == challenge_id,
-        AuthChallenge.pk_bind_key == pk_bind_key,
-        AuthChallenge.used == "false"
-    ).first()
-    
-    if not challenge:
-        return False
-    
-    # Check if challenge expired
-    if datetime.now() > challenge.expires_at:
-        return False
-    
+def verify_challenge_signature(challenge: Challenge, signature: bytes) -> bool:
+    """Verify that the challenge was signed by the binding key it was issued to"""
     try:
         # Verify the signature using Nacl
-        verify_key = VerifyKey(pk_bind_key)
-        verify_key.verify(challenge.challenge_bytes, signature)
-        
-        # Mark challenge as used
-        challenge.used = "true"
-        db.commit()
-        
+        VerifyKey(challenge.pk_bind_key).verify(challenge.challenge_bytes, signature)
         return True
     except (BadSignatureError, Exception):
         return False
@@ -106,89 +82,214 @@ def extract_binding_keys(revealed: list):
 
 # GET the /auth/challenge 
 @router.post("/challenge")
-async def get_challenge(request: ChallengeRequest, db: Session = Depends(get_db)):
+async def get_challenge(request: ChallengeRequest):
     """Create an authentication challenge for the user to sign"""
     try:
         pk_bind_key = base64.b64decode(request.pk_bind_key)
-        challenge_data = create_challenge(db, pk_bind_key)
-        return JSONResponse(challenge_data)
+        challenge = await challenge_store.issue(pk_bind_key)
+        return JSONResponse(challenge.to_response())
     except Exception as e:
         return JSONResponse({"error": f"Challenge creation failed: {str(e)}"}, status_code=400)
 
+# POST /auth/nonces → BBS+ proof nonces for the holder of a binding key
+@router.post("/nonces")
+async def get_nonces(request: NonceRequest, http_request: Request):
+    """Spend a signed challenge (as a login would) and issue bound nonces to its key"""
+    try:
+        pk_bind_key = base64.b64decode(request.pk_bind_key, validate=True)
+        signature = base64.b64decode(request.challenge_signature, validate=True)
+    except ValueError:
+        return JSONResponse({"error": "Malformed base64"}, status_code=400)
+    challenge = await challenge_store.consume(request.challenge_id, pk_bind_key)
+    if challenge is None or not verify_challenge_signature(challenge, signature):
+        return JSONResponse({"error": "Invalid or expired challenge signature"}, status_code=401)
+    client = http_request.client.host if http_request.client else ""
+    batch = await challenge_store.issue_nonces(pk_bind_key, request.nonces, client)
+    if not batch.nonces:
+        return JSONResponse(
+            {"error": "Nonce limit reached, retry later"},
+            status_code=429, headers={"Retry-After": "60"}
+        )
+    return JSONResponse(batch.to_response())
+
 # GET /auth/login → serves login page
 @router.get("/login")
 async def login_page():
     return render_template("login.html")
 
-# POST /auth/login → handles JSON payload with challenge response
+async def read_login_credential(request: Request) -> LoginCredential:
+    """
+    Tier 1 for either wire format, chosen by Content-Type: the compact binary
+    encoding (see payload_codec) or the original JSON ProofPayload.
+    """
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_LOGIN_BODY_BYTES:
+            raise LoginRejected("Payload too large", 413)
+
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+    if content_type == BINARY_PAYLOAD_TYPE:
+        return decode_binary_payload(body)
+    if content_type != "application/json":
+        raise LoginRejected(f"Unsupported content type, use application/json or {BINARY_PAYLOAD_TYPE}", 415)
+    try:
+        payload = ProofPayload.model_validate_json(body)
+    except ValidationError as e:
+        # Same 422 response FastAPI gives for a declared body model, minus the echoed
+        # input (for malformed JSON that is the raw request bytes, which do not serialize)
+        raise RequestValidationError(e.errors(include_url=False, include_input=False))
+    return decode_json_payload(payload)
+
+async def verify_bbs_tier(credential: LoginCredential) -> bool:
+    """BBS+ selective disclosure, skipped when this exact proof already verified against this root"""
+    bbs_key = proof_cache.key(
+        "bbs", credential.bbs_proof, credential.bbs_nonce, credential.bbs_public_key,
+        credential.message_count, *credential.revealed.values(), *credential.checked_root
+    )
+    if proof_cache.get(bbs_key):
+        PROOF_CACHE_LOOKUPS.inc(kind="bbs", result="hit")
+        return True
+    PROOF_CACHE_LOOKUPS.inc(kind="bbs", result="miss")
+    verified = await verify_bbs_proof_async(
+        credential.bbs_proof, credential.revealed, credential.bbs_public_key,
+        credential.bbs_nonce, credential.message_count
+    )
+    if verified:
+        proof_cache.put(bbs_key, credential.checked_root)
+    return verified
+
+async def verify_plonk_tier(credential: LoginCredential) -> bool:
+    """PLONK eligibility proof on a warm verifier worker, with the same result caching"""
+    plonk_key = proof_cache.key(
+        "plonk", verification_key_digest(), credential.plonk_proof_bytes, credential.plonk_public_bytes,
+        credential.bbs_public_key, *credential.checked_root
+    )
+    if proof_cache.get(plonk_key):
+        PROOF_CACHE_LOOKUPS.inc(kind="plonk", result="hit")
+        return True
+    PROOF_CACHE_LOOKUPS.inc(kind="plonk", result="miss")
+    verified = await plonk_pool.verify(credential.plonk_proof, credential.plonk_public)
+    if verified:
+        proof_cache.put(plonk_key, credential.checked_root, valid_until=proof_day_end(credential.plonk_public))
+    return verified
+
+def reject(reason: str, message: str, status_code: int) -> JSONResponse:
+    """Login failure response, counted by the stage that rejected it"""
+    VERIFICATION_REJECTIONS.inc(endpoint="login", reason=reason)
+    VERIFICATION_RESULTS.inc(endpoint="login", outcome="rejected")
+    return JSONResponse({"error": message}, status_code=status_code)
+
+# POST /auth/login → handles JSON or binary payload with challenge response
 @router.post("/login")
-async def login(payload: ProofPayload, db: Session = Depends(get_db)):
+async def login(request: Request, db: AsyncSession = Depends(get_async_db)):
+    # Verification runs in tiers ordered by cost, so malformed, stale or flooding
+    # traffic is rejected long before any pairing is computed
+    reason = "payload"
     try:
-        # Decode base64 fields
-        bbs_pub = base64.b64decode(payload.bbs_public_key_b64)
-        bbs_proof = base64.b64decode(payload.bbs_proof)
-        nonce = base64.b64decode(payload.bbs_nonce)
-        challenge_signature = base64.b64decode(payload.challenge_signature)
-
-        # Prepare revealed attributes
-        revealed = {}
-        for r in payload.revealed:
-            if r["encoding"] == "base64":
-                revealed[r["name"]] = base64.b64decode(r["value"])
-            else:
-                revealed[r["name"]] = r["value"].encode()
+        # Tier 1: size and shape limits (decoding only)
+        with stage("login", "decode"):
+            try:
+                credential = await read_login_credential(request)
+            except RequestValidationError:
+                VERIFICATION_REJECTIONS.inc(endpoint="login", reason=reason)
+                VERIFICATION_RESULTS.inc(endpoint="login", outcome="rejected")
+                raise
 
-        # Extract binding key for user identification
-        pk_bind_key = extract_binding_keys(payload.revealed)
+        # Tier 2: proven against the published root/epoch (or one still in its grace window)
+        reason = "root"
+        with stage("login", "root"):
+            check_root(credential, root_history)
 
-        # Verify challenge signature first
-        if not verify_challenge_signature(db, payload.challenge_id, challenge_signature, pk_bind_key):
-            return JSONResponse({"error": "Invalid or expired challenge signature"}, status_code=401)
+        # Tier 3: PLONK public signals describe this credential
+        reason = "public_signals"
+        with stage("login", "public_signals"):
+            check_public_signals(credential, settings.plonk_max_date_skew_days)
+    except LoginRejected as e:
+        return reject(reason, e.message, e.status_code)
 
-        # Verify BBS proof
-        verified = verify_bbs_proof(bbs_proof, revealed, bbs_pub, nonce, payload.message_count)
-        
-    except Exception as e:
-        return JSONResponse({"error": f"Verification failed: {str(e)}"}, status_code=400)
+    pk_bind_key = credential.pk_bind_key
+    bbs_pub = credential.bbs_public_key
+
+    try:
+        # Tier 4: challenge lookup (consume-once, whatever the outcome of the checks below)
+        with stage("login", "challenge"):
+            challenge = await challenge_store.consume(credential.challenge_id, pk_bind_key)
+        if challenge is None:
+            return reject("challenge", "Invalid or expired challenge signature", 401)
+
+        # Tier 5: Ed25519 challenge signature
+        with stage("login", "ed25519"):
+            signature_ok = verify_challenge_signature(challenge, credential.challenge_signature)
+        if not signature_ok:
+            return reject("signature", "Invalid or expired challenge signature", 401)
+
+        # Tier 6: the BBS+ nonce, if this server issued it, is spent now so the
+        # proof over it can never be presented again. A key holding issued nonces
+        # must use one; self-picked nonces only pass for keys that hold none.
+        with stage("login", "nonce"):
+            nonce_bound = await challenge_store.consume_nonce(credential.bbs_nonce, pk_bind_key)
+        if nonce_bound is False or (nonce_bound is None and settings.require_bound_nonce):
+            return reject("nonce", "Invalid, expired or reused proof nonce", 401)
 
-    if not verified:
-        return JSONResponse({"error": "Invalid proof"}, status_code=401)
+        # Tier 7: BBS+ proof, off the event loop
+        with stage("login", "bbs"):
+            bbs_ok = await verify_bbs_tier(credential)
+        if not bbs_ok:
+            return reject("bbs", "Invalid proof", 401)
+
+        # Tier 8: PLONK proof
+        with stage("login", "plonk"):
+            plonk_ok = await verify_plonk_tier(credential)
+        if not plonk_ok:
+            return reject("plonk", "Invalid proof", 401)
+
+    except Exception as e:
+        return reject("error", f"Verification failed: {str(e)}", 400)
 
     try:
-        # Check if user exists
-        user = get_user_by_pk_bind(db, pk_bind_key)
-        
-        if user is None:
-            # Create a new pseudo user with minimal info
-            user = create_user(
-                db=db,
-                pk_bind_key=pk_bind_key,
-                bbs_public_key=bbs_pub,
-                merkle_root=payload.merkle_root_hex
-            )
-        else:
-            # Update existing user's credentials
-            user = update_user_credentials(
-                db=db,
-                user=user,
-                bbs_public_key=bbs_pub,
-                merkle_root=payload.merkle_root_hex
-            )
-
-        # Set pseudo-identity cookie
+        with stage("login", "user_upsert"):
+            # Check if user exists
+            user = await get_user_by_pk_bind_async(db, pk_bind_key)
+
+            if user is None:
+                # Create a new pseudo user with minimal info
+                user = await create_user_async(
+                    db=db,
+                    pk_bind_key=pk_bind_key,
+                    bbs_public_key=bbs_pub,
+                    merkle_root=credential.merkle_root_hex
+                )
+            else:
+                # Update existing user's credentials
+                user = await update_user_credentials_async(
+                    db=db,
+                    user=user,
+                    bbs_public_key=bbs_pub,
+                    merkle_root=credential.merkle_root_hex
+                )
+
+        # Set signed session cookie (pages validate it without a user lookup)
+        token = issue_session_token(
+            pseudo_id=user.pseudo_id,
+            has_credentials=user.bbs_public_key is not None,
+            merkle_root=user.merkle_root
+        )
         response = JSONResponse({"success": True, "pseudo_id": user.pseudo_id})
         response.set_cookie(
-            key="user",
-            value=user.pseudo_id,
+            key=SESSION_COOKIE,
+            value=token,
+            max_age=settings.session_ttl,
             httponly=True,
             secure=False if DEV else True,
             samesite="lax" if DEV else "strict",
             path="/"
         )
-        
+        VERIFICATION_RESULTS.inc(endpoint="login", outcome="success")
         return response
         
     except Exception as e:
+        VERIFICATION_RESULTS.inc(endpoint="login", outcome="error")
         return JSONResponse({"error": f"Database error: {str(e)}"}, status_code=500)
 
 
@@ -196,5 +297,5 @@ async def login(payload: ProofPayload, db: Session = Depends(get_db)):
 @router.get("/logout")
 async def logout():
     response = JSONResponse({"success": True})
-    response.delete_cookie("user", path="/")
+    response.delete_cookie(SESSION_COOKIE, path="/")
     return response
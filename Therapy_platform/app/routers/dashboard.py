@@ -1,43 +1,49 @@
 from fastapi import APIRouter, Request, Depends
 from fastapi.responses import HTMLResponse, RedirectResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..utils import render_template
-from ..database import get_db
-from ..crud import get_user_by_pseudo_id
+from ..database import get_async_db
+from ..crud import get_user_info_async
+from ..sessions import SESSION_COOKIE, verify_session_token
 
 router = APIRouter()
 
-def get_current_user_id(request):
-    return request.cookies.get("user")
+def get_current_session(request: Request):
+    """Validated session token payload, or None (no DB access)"""
+    return verify_session_token(request.cookies.get(SESSION_COOKIE))
 
-def get_current_user(request: Request, db: Session) -> dict:
-    """Get current user from database"""
-    pseudo_id = get_current_user_id(request)
-    if not pseudo_id:
-        return None
-    
-    user = get_user_by_pseudo_id(db, pseudo_id)
-    if not user:
+async def get_current_user(session: dict, db: AsyncSession) -> dict:
+    """Build the page's user info from the session token plus the cached DB-only fields"""
+    pseudo_id = session["sub"]
+    info = await get_user_info_async(db, pseudo_id)
+    if not info:
         return None
     
+    credentials = session.get("cred", {})
+    merkle_root = credentials.get("merkle_root")
     return {
-        "pseudo_id": user.pseudo_id,
-        "created_at": user.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-        "last_seen": user.last_seen.strftime("%Y-%m-%d %H:%M:%S"),
-        "has_credentials": user.bbs_public_key is not None,
-        "merkle_root": user.merkle_root[:16] + "..." if user.merkle_root else "None"
+        "pseudo_id": pseudo_id,
+        "created_at": info["created_at"].strftime("%Y-%m-%d %H:%M:%S"),
+        "last_seen": info["last_seen"].strftime("%Y-%m-%d %H:%M:%S"),
+        "has_credentials": bool(credentials.get("has_credentials")),
+        "merkle_root": merkle_root[:16] + "..." if merkle_root else "None"
     }
 
 @router.get("/", response_class=HTMLResponse)
-async def dashboard(request: Request, db: Session = Depends(get_db)):
-    if not get_current_user_id(request):
-        return RedirectResponse(url="/auth/login")
+async def dashboard(request: Request, db: AsyncSession = Depends(get_async_db)):
+    session = get_current_session(request)
+    if session is None:
+        response = RedirectResponse(url="/auth/login")
+        if SESSION_COOKIE in request.cookies:
+            # Tampered, expired or pre-token cookie
+            response.delete_cookie(SESSION_COOKIE, path="/")
+        return response
     
-    user_info = get_current_user(request, db)
+    user_info = await get_current_user(session, db)
     if not user_info:
-        # If User cookie exists but user not found in DB
+        # If session is valid but user not found in DB
         response = RedirectResponse(url="/auth/login")
-        response.delete_cookie("user", path="/")
+        response.delete_cookie(SESSION_COOKIE, path="/")
         return response
     
-    return render_template("dashboard.html", **user_info)
\ No newline at end of file
+    return render_template("dashboard.html", **user_info)
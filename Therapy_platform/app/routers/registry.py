@@ -0,0 +1,42 @@
+from fastapi import APIRouter, HTTPException, Request
+from typing import Optional
+
+from ..http_cache import IMMUTABLE, REVALIDATE, cached_response
+from ..merkle_registry import commitment_registry
+
+router = APIRouter(tags=["registry"])
+
+def _cache_control(request: Request) -> str:
+    # A URL pinned to the current epoch (?epoch=N) never changes, like ?v= on static assets
+    return IMMUTABLE if request.query_params.get("epoch") == str(commitment_registry.epoch) else REVALIDATE
+
+def _require_published():
+    if commitment_registry.epoch == 0 or commitment_registry.next_index == 0:
+        raise HTTPException(status_code=404, detail="No commitments registered")
+
+# GET /registry/root → current root and epoch
+@router.get("/root")
+async def registry_root(request: Request):
+    _require_published()
+    registry = commitment_registry
+    body = (
+        f'{{"root_hex":"{registry.root_hex}","epoch":{registry.epoch},'
+        f'"depth":{registry.depth},"size":{registry.next_index}}}'
+    ).encode()
+    return cached_response(
+        request, body, f'"root-{registry.epoch}"', "application/json", _cache_control(request)
+    )
+
+# GET /registry/path/{leaf_index}?since=E → siblings changed after epoch E (full path without since)
+@router.get("/path/{leaf_index}")
+async def registry_path(request: Request, leaf_index: int, since: Optional[int] = None):
+    _require_published()
+    registry = commitment_registry
+    try:
+        body = registry.path_delta_bytes(leaf_index, since)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return cached_response(
+        request, body, f'"path-{registry.epoch}-{leaf_index}-{since or 0}"', "application/json",
+        _cache_control(request)
+    )
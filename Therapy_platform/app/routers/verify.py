@@ -3,13 +3,26 @@ from pydantic import BaseModel, Field
 from typing import List, Tuple
 import base64, json
 
-from ..zkp import (
-    load_merkle_root, load_vk_json_bytes,
-    verify_bbs_selective_disclosure, verify_plonk_with_snarkjs, derive_pseudo_user_id
-)
+from ..zkp import derive_pseudo_user_id
+from ..bbs_verify import verify_bbs_proof_async
+from ..root_history import root_history
+from ..plonk_pool import plonk_pool
+from ..proof_cache import proof_cache, proof_day_end, verification_key_digest
+from ..metrics import stage, PROOF_CACHE_LOOKUPS, VERIFICATION_REJECTIONS, VERIFICATION_RESULTS
 
 router = APIRouter(tags=["verification"])
 
+def rejected(reason: str, status_code: int, detail: str) -> HTTPException:
+    VERIFICATION_REJECTIONS.inc(endpoint="verify", reason=reason)
+    VERIFICATION_RESULTS.inc(endpoint="verify", outcome="rejected")
+    return HTTPException(status_code, detail)
+
+def b64(value: str, field: str) -> bytes:
+    try:
+        return base64.b64decode(value, validate=True)
+    except ValueError:
+        raise rejected("payload", 400, f"{field} is not valid base64")
+
 class RevealedPair(BaseModel):
     name: str
     value: str                 # base64 for binary, utf8 for plain numbers/strings
@@ -36,57 +49,87 @@ class VerifyPayload(BaseModel):
 @router.post("/verify")
 async def verify(payload: VerifyPayload):
     # freshness check against server-published root (still in progress, not 100% sure what to do)
-    current = load_merkle_root()
-    if current is not None:
-        root_now, epoch_now = current
-        if payload.epoch != epoch_now or payload.merkle_root_hex.lower() != root_now:
-            raise HTTPException(400, "Outdated root/epoch. Regenerate proof against the current root.")
+    # retired roots stay acceptable for a grace window so revocations don't force everyone to re-prove
+    if root_history.current is not None:
+        if not root_history.accepts((payload.merkle_root_hex.lower(), payload.epoch)):
+            raise rejected("root", 400, "Outdated root/epoch. Regenerate proof against the current root.")
 
     # Decode revealed fields (should be the same order) which is: expiry_year, expiry_month, pk_bind, commitment
     revealed_ordered: List[Tuple[str, bytes]] = []
     pk_bind_bytes = None
     commitment_bytes = None
 
-    for item in payload.revealed:
-        if item.encoding == "base64":
-            b = base64.b64decode(item.value)
-        elif item.encoding == "utf8":
-            b = item.value.encode()
-        else:
-            raise HTTPException(400, f"Unknown encoding for {item.name}")
-        revealed_ordered.append((item.name, b))
-        if item.name == "pk_bind":
-            pk_bind_bytes = b
-        if item.name == "commitment":
-            commitment_bytes = b
+    with stage("verify", "decode"):
+        for item in payload.revealed:
+            if item.encoding == "base64":
+                b = b64(item.value, item.name)
+            elif item.encoding == "utf8":
+                b = item.value.encode()
+            else:
+                raise rejected("payload", 400, f"Unknown encoding for {item.name}")
+            revealed_ordered.append((item.name, b))
+            if item.name == "pk_bind":
+                pk_bind_bytes = b
+            if item.name == "commitment":
+                commitment_bytes = b
 
     if pk_bind_bytes is None or commitment_bytes is None:
-        raise HTTPException(400, "Revealed set must include pk_bind and commitment.")
+        raise rejected("payload", 400, "Revealed set must include pk_bind and commitment.")
 
-    # Verify BBS+ selective disclosure
-    bbs_public_key = base64.b64decode(payload.bbs_public_key_b64)
+    # Verify BBS+ selective disclosure (skipped if this exact proof already verified against this root)
+    bbs_public_key = b64(payload.bbs_public_key_b64, "bbs_public_key_b64")
+    bbs_proof = b64(payload.bbs_proof, "bbs_proof")
+    bbs_nonce = b64(payload.bbs_nonce, "bbs_nonce")
+    checked_root = (payload.merkle_root_hex.lower(), payload.epoch)
 
-    ok_bbs = verify_bbs_selective_disclosure(
-        proof_b64=payload.bbs_proof,
-        nonce_b64=payload.bbs_nonce,
-        message_count=payload.message_count,
-        revealed_ordered=revealed_ordered,
-        bbs_public_key_bytes=bbs_public_key
+    bbs_key = proof_cache.key(
+        "bbs", bbs_proof, bbs_nonce, bbs_public_key, payload.message_count,
+        *(b for _, b in revealed_ordered), *checked_root
     )
-    if not ok_bbs:
-        raise HTTPException(401, "BBS+ proof invalid")
-
-    # Verify PLONK proof
-    vk_bytes = load_vk_json_bytes()
-    ok_plonk = verify_plonk_with_snarkjs(
-        vk_json_bytes=vk_bytes,
-        proof_json_b64=payload.plonk_proof,
-        public_json_b64=payload.plonk_public
+    if proof_cache.get(bbs_key):
+        PROOF_CACHE_LOOKUPS.inc(kind="bbs", result="hit")
+    else:
+        PROOF_CACHE_LOOKUPS.inc(kind="bbs", result="miss")
+        # Pairing checks run on the BBS worker pool, off the event loop
+        with stage("verify", "bbs"):
+            ok_bbs = await verify_bbs_proof_async(
+                bbs_proof, dict(revealed_ordered), bbs_public_key, bbs_nonce, payload.message_count
+            )
+        if not ok_bbs:
+            raise rejected("bbs", 401, "BBS+ proof invalid")
+        proof_cache.put(bbs_key, checked_root)
+
+    # Verify PLONK proof on a warm verifier worker
+    try:
+        with stage("verify", "decode_plonk"):
+            plonk_proof_bytes = base64.b64decode(payload.plonk_proof)
+            plonk_public_bytes = base64.b64decode(payload.plonk_public)
+            plonk_proof = json.loads(plonk_proof_bytes)
+            plonk_public = json.loads(plonk_public_bytes)
+    except ValueError:
+        raise rejected("payload", 400, "Malformed PLONK proof or public signals")
+
+    plonk_key = proof_cache.key(
+        "plonk", verification_key_digest(), plonk_proof_bytes, plonk_public_bytes, bbs_public_key, *checked_root
     )
-    if not ok_plonk:
-        raise HTTPException(401, "ZK (PLONK) proof invalid")
+    if proof_cache.get(plonk_key):
+        PROOF_CACHE_LOOKUPS.inc(kind="plonk", result="hit")
+    else:
+        PROOF_CACHE_LOOKUPS.inc(kind="plonk", result="miss")
+        with stage("verify", "plonk"):
+            ok_plonk = await plonk_pool.verify(plonk_proof, plonk_public)
+        if not ok_plonk:
+            raise rejected("plonk", 401, "ZK (PLONK) proof invalid")
+        proof_cache.put(plonk_key, checked_root, valid_until=proof_day_end(plonk_public))
 
     # Pseudonymous identity from pk_bind (stable across reuse of the same binding key)
     user_id = derive_pseudo_user_id(pk_bind_bytes)
+    VERIFICATION_RESULTS.inc(endpoint="verify", outcome="success")
+    return {
+        "verified": True,
+        "pseudo_user_id": user_id,
+        "merkle_root_hex": checked_root[0],
+        "epoch": checked_root[1]
+    }
 
 
@@ -0,0 +1,69 @@
+import base64
+import hashlib
+import hmac
+import json
+import time
+from typing import Optional
+
+from .config import settings
+
+SESSION_COOKIE = "user"
+TOKEN_VERSION = "v1"
+
+
+def _b64url(b: bytes) -> str:
+    return base64.urlsafe_b64encode(b).rstrip(b"=").decode()
+
+
+def _b64url_decode(s: str) -> bytes:
+    return base64.urlsafe_b64decode(s + "=" * (-len(s) % 4))
+
+
+# Dedicated key derived from secret_key, so secret_key can be reused elsewhere without cross-protocol tokens
+_SESSION_KEY = hmac.new(settings.secret_key.encode(), b"therapy-platform session token", hashlib.sha256).digest()
+
+
+def _mac(signing_input: bytes) -> bytes:
+    return hmac.new(_SESSION_KEY, signing_input, hashlib.sha256).digest()
+
+
+def issue_session_token(pseudo_id: str, has_credentials: bool, merkle_root: Optional[str]) -> str:
+    """
+    Create a signed session token: v1.<payload>.<hmac>, both parts base64url.
+    The payload carries everything authenticated pages need to know about the
+    session, so they can trust it without looking the user up.
+    """
+    now = int(time.time())
+    payload = {
+        "sub": pseudo_id,
+        "iat": now,
+        "exp": now + settings.session_ttl,
+        "cred": {"has_credentials": has_credentials, "merkle_root": merkle_root},
+    }
+    body = _b64url(json.dumps(payload, separators=(",", ":")).encode())
+    signing_input = f"{TOKEN_VERSION}.{body}".encode()
+    return f"{TOKEN_VERSION}.{body}.{_b64url(_mac(signing_input))}"
+
+
+def verify_session_token(token: Optional[str]) -> Optional[dict]:
+    """Return the token payload if the MAC is valid and it hasn't expired, else None."""
+    if not token or len(token) > 2048:
+        return None
+    parts = token.split(".")
+    if len(parts) != 3 or parts[0] != TOKEN_VERSION:
+        return None
+    version, body, mac = parts
+    try:
+        given_mac = _b64url_decode(mac)
+    except (ValueError, TypeError):
+        return None
+    expected_mac = _mac(f"{version}.{body}".encode())
+    if not hmac.compare_digest(given_mac, expected_mac):
+        return None
+    try:
+        payload = json.loads(_b64url_decode(body))
+    except ValueError:
+        return None
+    if not isinstance(payload, dict) or payload.get("exp", 0) < time.time():
+        return None
+    return payload
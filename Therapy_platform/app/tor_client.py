@@ -1,7 +1,10 @@
-import socks
-import socket
 import asyncio
 import logging
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
 from stem import Signal
 from stem.control import Controller
 from .config import settings
@@ -9,40 +12,91 @@ from .config import settings
 logger = logging.getLogger(__name__)
 
 class TorClient:
+    """
+    Outbound Tor access for the code paths that ask for it.
+
+    Nothing is patched globally: internal sockets (the database, the snarkjs
+    workers, the app's own listener) stay native. Callers that want Tor use
+    `session` (or `get`), a keep-alive requests session whose connections go
+    through the SOCKS port with DNS resolved by Tor (socks5h). The control
+    port connection is opened and authenticated once and reused.
+    """
+
     def __init__(self):
-        self._setup_proxy()
-    
-    def _setup_proxy(self):
-        """Configure SOCKS proxy for Tor"""
-        socks.set_default_proxy(socks.SOCKS5, "127.0.0.1", settings.tor_socks_port)
-        socket.socket = socks.socksocket
-    
+        self._controller: Optional[Controller] = None
+        self._session: Optional[requests.Session] = None
+        self._lock = threading.Lock()  # guards both; stem and requests calls run in executor threads
+
+    @property
+    def proxy_url(self) -> str:
+        return f"socks5h://127.0.0.1:{settings.tor_socks_port}"
+
+    @property
+    def session(self) -> requests.Session:
+        """Pooled SOCKS session; reused until the next circuit change."""
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                session.proxies = {"http": self.proxy_url, "https": self.proxy_url}
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=settings.tor_http_pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._session = session
+            return self._session
+
+    def _controller_connection(self) -> Controller:
+        with self._lock:
+            if self._controller is None or not self._controller.is_alive():
+                if self._controller is not None:
+                    self._controller.close()
+                controller = Controller.from_port(port=settings.tor_control_port)
+                controller.authenticate(password=settings.tor_control_password)
+                self._controller = controller
+            return self._controller
+
+    def _reset_session(self):
+        # Kept-alive connections stay on their old circuit, so drop the pool with it
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
     async def new_circuit(self) -> bool:
         """Create a new Tor circuit"""
+        def _create_circuit():
+            controller = self._controller_connection()
+            if not controller.is_newnym_available():
+                logger.info(f"Tor rate-limits NEWNYM; new circuits in {controller.get_newnym_wait():.1f}s")
+            controller.signal(Signal.NEWNYM)
+            self._reset_session()
+            return True
+
         try:
-            def _create_circuit():
-                with Controller.from_port(port=settings.tor_control_port) as controller:
-                    controller.authenticate(password=settings.tor_control_password)
-                    controller.signal(Signal.NEWNYM)
-                    return True
-            
-            result = await asyncio.get_event_loop().run_in_executor(None, _create_circuit)
+            result = await asyncio.get_running_loop().run_in_executor(None, _create_circuit)
             logger.info("New Tor circuit created")
             return result
         except Exception as e:
             logger.error(f"Failed to create new circuit: {e}")
             return False
-    
+
+    async def get(self, url: str, **kwargs) -> requests.Response:
+        """GET through Tor on the pooled session, off the event loop"""
+        kwargs.setdefault("timeout", settings.tor_request_timeout)
+        return await asyncio.get_running_loop().run_in_executor(
+            None, lambda: self.session.get(url, **kwargs)
+        )
+
     async def check_ip(self) -> str:
         """Check current IP through Tor"""
-        import requests
-        
-        def _check_ip():
-            self._setup_proxy()
-            response = requests.get('https://httpbin.org/ip', timeout=30)
-            return response.json()['origin']
-        
-        return await asyncio.get_event_loop().run_in_executor(None, _check_ip)
-
-# Global instance
-tor_client = TorClient()
\ No newline at end of file
+        response = await self.get('https://httpbin.org/ip')
+        return response.json()['origin']
+
+    def close(self):
+        with self._lock:
+            if self._controller is not None:
+                self._controller.close()
+                self._controller = None
+        self._reset_session()
+
+# Global instance, closed by the app lifespan
+tor_client = TorClient()
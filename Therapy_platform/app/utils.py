@@ -1,26 +1,95 @@
 from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse
+from typing import Dict, List, Optional
+import html
 import os
 import re
+from .config import settings
+from .http_cache import make_etag, register_variants, static_assets
 
 # Serve static templates
 TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "../templates")
 
+# {{ variable }} slots; anything more complex is left in the page untouched
+_SLOT_RE = re.compile(r"(\{\{\s*(\w+)\s*\}\})")
+
+class CompiledTemplate:
+    """
+    A template split once into literal chunks and named slots, so rendering is
+    a single pass that joins the chunks with the (HTML-escaped) slot values.
+    """
+
+    def __init__(self, source: str, mtime: float):
+        self.mtime = mtime
+        parts = _SLOT_RE.split(source)
+        # re.split with two groups yields: literal, raw slot, slot name, literal, ...
+        self.literals: List[str] = parts[0::3]
+        self.raw_slots: List[str] = parts[1::3]
+        self.slot_names: List[str] = parts[2::3]
+        self.body = source.encode()
+        self.etag = make_etag(self.body)
+        if not self.slot_names:
+            # Fully static page: precompress once for the HTTP caching middleware
+            register_variants(self.etag, self.body)
+
+    def render(self, context: Dict[str, object]) -> str:
+        out = [self.literals[0]]
+        for raw, name, literal in zip(self.raw_slots, self.slot_names, self.literals[1:]):
+            if name in context:
+                out.append(html.escape(str(context[name])))
+            else:
+                out.append(raw)
+            out.append(literal)
+        return "".join(out)
+
+class TemplateEngine:
+    """
+    Loads and tokenizes each template once. With auto_reload (debug mode) the
+    file's mtime is checked on every render so edits show up immediately.
+    """
+
+    def __init__(self, directory: str, auto_reload: bool = False):
+        self.directory = directory
+        self.auto_reload = auto_reload
+        self._cache: Dict[str, CompiledTemplate] = {}
+
+    def _load(self, filename: str) -> CompiledTemplate:
+        path = os.path.join(self.directory, filename)
+        mtime = os.path.getmtime(path)
+        with open(path, "r") as f:
+            # Static asset links get ?v=<content hash> so browsers can cache them forever
+            template = CompiledTemplate(static_assets.version_urls(f.read()), mtime)
+        self._cache[filename] = template
+        return template
+
+    def get(self, filename: str) -> CompiledTemplate:
+        template = self._cache.get(filename)
+        if template is None:
+            return self._load(filename)
+        if self.auto_reload and os.path.getmtime(os.path.join(self.directory, filename)) != template.mtime:
+            return self._load(filename)
+        return template
+
+    def preload(self):
+        """Compile every template up front (called at startup)."""
+        for filename in os.listdir(self.directory):
+            if filename.endswith(".html"):
+                self._load(filename)
+
+    def cached(self, filename: str) -> Optional[CompiledTemplate]:
+        return self._cache.get(filename)
+
+templates = TemplateEngine(TEMPLATES_DIR, auto_reload=settings.debug)
+
 def render_template(filename: str, **context) -> HTMLResponse:
     """
     Render a template with optional context variables.
-    Supports simple {{ variable }} substitution.
+    Supports simple {{ variable }} substitution; values are HTML-escaped.
+    Pages rendered without context are served from the cached bytes with an ETag.
     """
-    path = os.path.join(TEMPLATES_DIR, filename)
-    
-    with open(path, "r") as f:
-        content = f.read()
-    
-    # If context is provided, do simple template variable substitution
-    if context:
-        for key, value in context.items():
-            # Replace {{ key }} with the actual value
-            pattern = r'\{\{\s*' + re.escape(key) + r'\s*\}\}'
-            content = re.sub(pattern, str(value), content)
-    
-    return HTMLResponse(content=content)
\ No newline at end of file
+    template = templates.get(filename)
+
+    if not context:
+        return HTMLResponse(content=template.body, headers={"ETag": template.etag, "Cache-Control": "no-cache"})
+
+    return HTMLResponse(content=template.render(context))
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import update
+
+from . import metrics
+from .config import settings
+from .database import AsyncSessionLocal
+from .models import PseudoUser
+
+logger = logging.getLogger(__name__)
+
+
+class UserWriteBuffer:
+    """
+    Write-behind buffer for the per-login PseudoUser update.
+
+    Logins record their changes here instead of committing; repeated logins by
+    the same user coalesce into one pending row, unchanged credential fields
+    are never written, and everything pending is flushed in one transaction
+    every `flush_interval` seconds and at shutdown.
+    """
+
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._pending: Dict[str, dict] = {}   # pseudo_id -> {"id": ..., changed columns}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def record_login(self, user: PseudoUser, bbs_public_key: bytes, merkle_root: str):
+        """Queue last_seen plus whichever credential fields actually changed, and apply them to `user` in memory."""
+        row = self._pending.setdefault(user.pseudo_id, {"id": user.id})
+        # Compare with what the flush would write (an earlier login's pending values
+        # override the loaded row), so a later login can also switch a field back
+        current = {"bbs_public_key": user.bbs_public_key, "merkle_root": user.merkle_root, **row}
+        if current["bbs_public_key"] != bbs_public_key:
+            row["bbs_public_key"] = bbs_public_key
+        if current["merkle_root"] != merkle_root:
+            row["merkle_root"] = merkle_root
+        user.bbs_public_key = bbs_public_key
+        user.merkle_root = merkle_root
+        row["last_seen"] = datetime.now()
+        user.last_seen = row["last_seen"]
+
+    def pending_fields(self, pseudo_id: str) -> dict:
+        """Changes not yet flushed for this user (so reads can see their own writes)."""
+        row = self._pending.get(pseudo_id, {})
+        return {k: v for k, v in row.items() if k != "id"}
+
+    async def flush(self) -> int:
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, {}
+        try:
+            async with AsyncSessionLocal() as db:
+                # ORM bulk UPDATE by primary key: one executemany per distinct column set
+                await db.execute(update(PseudoUser), list(batch.values()))
+                await db.commit()
+        except BaseException as e:
+            # Newer changes recorded during the failed flush win over the batch
+            for pseudo_id, row in batch.items():
+                self._pending[pseudo_id] = {**row, **self._pending.get(pseudo_id, {})}
+            if not isinstance(e, Exception):
+                raise  # cancelled: the batch is pending again for close()
+            logger.error(f"User write-behind flush failed, will retry: {e}")
+            return 0
+        return len(batch)
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    def start(self):
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stop the flush loop without interrupting a flush mid-write, then flush what is left."""
+        self._stopping.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        await self.flush()
+
+
+# Global instance, flushed periodically and at shutdown by the app lifespan
+user_write_buffer = UserWriteBuffer(settings.user_write_flush_interval)
+
+metrics.gauge("user_writes_pending", "Users with login updates not yet flushed", lambda: len(user_write_buffer))
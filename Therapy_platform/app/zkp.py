@@ -1,22 +1,36 @@
-import base64, json, os, subprocess, tempfile, hashlib
-from typing import List, Tuple
+import asyncio, base64, json, logging, os, subprocess, tempfile, hashlib, time
+from typing import Callable, List, NamedTuple, Optional, Tuple
 
 from ursa_bbs_signatures import (
     BbsKey, VerifyProofRequest, verify_proof as bbs_verify_proof
 )
 
+from .metrics import ZKP_BACKEND_SECONDS
+
 KEYS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "keys"))
+VK_PATH = os.path.join(KEYS_DIR, "verification_key.json")
+MERKLE_ROOT_PATH = os.path.join(KEYS_DIR, "merkle_root.json")
+
+logger = logging.getLogger(__name__)
+
+def load_published_roots():
+    """
+    If keys/merkle_root.json exists, return ((root_hex_lower, epoch_int), retired), else (None, ()).
+    `retired` holds (root_hex_lower, epoch_int, retired_at) for the roots the publisher
+    replaced recently; files written by other tools may not list any.
+    """
+    if not os.path.exists(MERKLE_ROOT_PATH):
+        return None, ()
+    with open(MERKLE_ROOT_PATH, "r") as f:
+        data = json.load(f)
+    retired = tuple((r.lower(), int(e), float(t)) for r, e, t in data.get("retired", []))
+    return (data["root_hex"].lower(), int(data["epoch"])), retired
 
 def load_merkle_root():
     """
     If keys/merkle_root.json exists, return (root_hex_lower, epoch_int), else None.
     """
-    path = os.path.join(KEYS_DIR, "merkle_root.json")
-    if not os.path.exists(path):
-        return None
-    with open(path, "r") as f:
-        data = json.load(f)
-    return data["root_hex"].lower(), int(data["epoch"])
+    return load_published_roots()[0]
 
 def verify_bbs_selective_disclosure(
     proof_b64: str,
@@ -39,7 +53,11 @@ def verify_bbs_selective_disclosure(
         messages=revealed_vals,
         nonce=nonce
     )
-    return bbs_verify_proof(req)
+    start = time.perf_counter()
+    try:
+        return bbs_verify_proof(req)
+    finally:
+        ZKP_BACKEND_SECONDS.observe(time.perf_counter() - start, call="bbs_verify_proof")
 
 def verify_plonk_with_snarkjs(vk_json_bytes: bytes, proof_json_b64: str, public_json_b64: str) -> bool:
     """
@@ -60,20 +78,103 @@ def verify_plonk_with_snarkjs(vk_json_bytes: bytes, proof_json_b64: str, public_
         with open(public_path, "wb") as f:
             f.write(public_bytes)
 
+        start = time.perf_counter()
         result = subprocess.run(
             ["snarkjs", "plonk", "verify", vk_path, public_path, proof_path],
             stdout=subprocess.PIPE, stderr=subprocess.PIPE
         )
+        ZKP_BACKEND_SECONDS.observe(time.perf_counter() - start, call="snarkjs_cli")
         return result.returncode == 0
 
 def load_vk_json_bytes() -> bytes:
     """
     Place your circuit’s verification key at: app/keys/verification_key.json
     """
-    path = os.path.join(KEYS_DIR, "verification_key.json")
-    with open(path, "rb") as f:
+    with open(VK_PATH, "rb") as f:
         return f.read()
 
+def _mtime(path: str) -> Optional[float]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+class KeySnapshot(NamedTuple):
+    """Immutable view of everything under keys/ that verification needs."""
+    vk_bytes: Optional[bytes]
+    vk: Optional[dict]
+    merkle_root: Optional[Tuple[str, int]]  # (root_hex_lower, epoch)
+    vk_mtime: Optional[int]
+    root_mtime: Optional[int]
+    retired_roots: Tuple[Tuple[str, int, float], ...] = ()  # (root_hex_lower, epoch, retired_at)
+
+class KeyCache:
+    """
+    In-memory copy of the verification key and the published Merkle root.
+
+    The request path only reads `snapshot`, which is replaced wholesale on
+    reload, so readers never see a half-updated key/root pair and never touch
+    the disk. A background task polls the files' mtimes and reloads on change;
+    `reload()` can also be triggered explicitly.
+    """
+
+    def __init__(self):
+        self.snapshot = KeySnapshot(None, None, None, None, None)
+        self._listeners: List[Callable[[KeySnapshot, KeySnapshot], None]] = []
+
+    @property
+    def merkle_root(self) -> Optional[Tuple[str, int]]:
+        return self.snapshot.merkle_root
+
+    @property
+    def vk_bytes(self) -> Optional[bytes]:
+        return self.snapshot.vk_bytes
+
+    def add_listener(self, callback: Callable[[KeySnapshot, KeySnapshot], None]):
+        """Register callback(old, new), invoked after a snapshot swap."""
+        self._listeners.append(callback)
+
+    def reload(self, force: bool = False) -> bool:
+        """Re-read whichever key files changed since the last load. Returns True if anything changed."""
+        old = self.snapshot
+        vk_mtime = _mtime(VK_PATH)
+        root_mtime = _mtime(MERKLE_ROOT_PATH)
+        if not force and vk_mtime == old.vk_mtime and root_mtime == old.root_mtime:
+            return False
+
+        vk_bytes, vk = old.vk_bytes, old.vk
+        if force or vk_mtime != old.vk_mtime:
+            vk_bytes = load_vk_json_bytes() if vk_mtime is not None else None
+            vk = json.loads(vk_bytes) if vk_bytes is not None else None
+
+        merkle_root, retired_roots = old.merkle_root, old.retired_roots
+        if force or root_mtime != old.root_mtime:
+            merkle_root, retired_roots = load_published_roots()
+
+        new = KeySnapshot(vk_bytes, vk, merkle_root, vk_mtime, root_mtime, retired_roots)
+        self.snapshot = new
+        if new.merkle_root != old.merkle_root:
+            logger.info(f"Merkle root updated: {new.merkle_root}")
+        for callback in self._listeners:
+            try:
+                callback(old, new)
+            except Exception as e:
+                logger.error(f"Key cache listener failed: {e}")
+        return True
+
+    async def watch(self, interval: float):
+        """Poll the key files every `interval` seconds (run as a background task)."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.reload()
+            except (OSError, ValueError, KeyError) as e:
+                # A half-written file: keep serving the previous snapshot and retry next tick
+                logger.warning(f"Key reload failed, keeping previous keys: {e}")
+
+# Global instance, loaded and watched by the app lifespan
+key_cache = KeyCache()
+
 def derive_pseudo_user_id(pk_bind_bytes: bytes, domain_tag: str = "therapy-platform") -> str:
     h = hashlib.blake2b(digest_size=32)
     h.update(domain_tag.encode())
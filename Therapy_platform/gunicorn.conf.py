@@ -0,0 +1,80 @@
+# Production server: gunicorn -c gunicorn.conf.py app.main:app (see scripts/run_prod.sh)
+#
+# The app is imported once in the master (preload_app), which loads libbbs and
+# the other native libraries; when_ready then loads keys, the registry and the
+# compiled templates before the workers are forked, so all of it is shared
+# copy-on-write. Each worker still starts its own PLONK verifier processes,
+# thread pools and background tasks in the app lifespan.
+import gc
+import os
+import signal
+import threading
+import time
+
+from app.config import check_secret_key, settings
+
+check_secret_key()
+if settings.web_workers > 1 and settings.challenge_store_backend == "memory":
+    # A challenge issued by one worker would be unknown to the worker that receives the login
+    raise RuntimeError("challenge_store_backend=memory cannot be shared between workers; use sqlite")
+
+bind = f"127.0.0.1:{settings.app_port}"
+workers = settings.web_workers
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = settings.web_worker_timeout
+graceful_timeout = settings.web_graceful_timeout
+keepalive = 5
+loglevel = settings.log_level.lower()
+
+_watcher = None
+
+
+def _freeze():
+    # Move everything loaded so far out of the collector's generations, so its
+    # bookkeeping writes don't un-share the pages in every worker
+    gc.collect()
+    gc.freeze()
+
+
+def _vk_mtime():
+    from app.zkp import VK_PATH
+    return os.stat(VK_PATH).st_mtime_ns if os.path.exists(VK_PATH) else None
+
+
+def _watch_keys(server):
+    """
+    Rotate the workers when a new verification key is published, so they start
+    their PLONK pools from the master's refreshed copy instead of each re-reading it.
+    New roots/epochs don't rotate anything: workers follow keys/ themselves, and
+    merkle_root.json carries the retired roots they need for the grace window.
+    """
+    seen = _vk_mtime()
+    last_reload = 0.0
+    while True:
+        time.sleep(settings.key_reload_interval)
+        current = _vk_mtime()
+        if current == seen or time.monotonic() - last_reload < settings.epoch_reload_min_interval:
+            continue
+        seen, last_reload = current, time.monotonic()
+        server.log.info("New verification key published; gracefully reloading workers")
+        os.kill(server.pid, signal.SIGHUP)
+
+
+def when_ready(server):
+    global _watcher
+    from app.main import preload
+    preload()
+    _freeze()
+    if settings.reload_workers_on_epoch and _watcher is None:
+        _watcher = threading.Thread(target=_watch_keys, args=(server,), name="key-watcher", daemon=True)
+        _watcher.start()
+
+
+def on_reload(server):
+    # SIGHUP: new workers are forked from this master, so refresh what they will inherit.
+    # The old workers keep serving until the new ones are up (graceful_timeout).
+    from app.zkp import key_cache
+    gc.unfreeze()
+    key_cache.reload()
+    _freeze()
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Login load test for the Therapy platform.
+
+1. Build a pool of valid credentials with the ZKP_Software pipeline (slow,
+   one PLONK proof each), all proven against one shared Merkle tree:
+
+       python scripts/loadtest.py make-pool --size 20 --out loadtest_pool.json --publish-keys keys
+
+   --publish-keys writes the pool's root/epoch and the verification key into
+   the server's keys/ directory (the key watcher picks them up).
+
+2. Drive challenge -> sign -> login -> dashboard against a running instance:
+
+       python scripts/loadtest.py run --pool loadtest_pool.json --concurrency 32 --duration 30
+
+Results (throughput, p50/p95/p99 latency, error rates per endpoint) are
+printed as JSON. --max-p95-ms / --max-error-rate make the exit code non-zero
+when exceeded, so this can gate a deploy.
+
+Credentials are reused round-robin, so with a pool smaller than the number of
+logins the server's verified-proof cache is exercised; use a larger pool (or
+PROOF_CACHE_SIZE=0 on the server) to measure cold verification. PLONK proofs
+are dated, so a pool is only valid for the day it was made.
+
+Attributes come from random.Random(--seed), 1234 by default as in
+ZKP_Software/benchmarks/bench.py, so pools of the same size have the same
+shape. Keys and serials inside issue_credentials always use os.urandom, but
+verification cost does not depend on their values.
+"""
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+import math
+import os
+import random
+import shutil
+import sys
+import time
+from datetime import datetime
+from typing import Dict, List
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ZKP_DIR = os.path.join(os.path.dirname(PROJECT_ROOT), "ZKP_Software")
+
+ENDPOINTS = ("challenge", "login", "dashboard")
+# pk_bind and the commitment are always revealed too (appended by create_bbs_selective_proof)
+REVEALED_ATTRIBUTES = ["expiry_year", "expiry_month"]
+
+
+def b64(b: bytes) -> str:
+    return base64.b64encode(b).decode()
+
+
+# ---------------------------------------------------------------------------
+# Credential pool
+# ---------------------------------------------------------------------------
+
+def synthetic_attributes(rng: random.Random) -> dict:
+    now = datetime.now()
+    return {
+        "birth_year": rng.randint(1950, now.year - 19),
+        "birth_month": rng.randint(1, 12),
+        "birth_day": rng.randint(1, 28),
+        "expiry_year": rng.randint(now.year + 1, now.year + 9),
+        "expiry_month": rng.randint(1, 12),
+        "nationality": 826,
+        "current_year": now.year,
+        "current_month": now.month,
+        "current_day": now.day,
+    }
+
+
+def make_pool(size: int, out_path: str, publish_keys: str, seed: int):
+    out_path = os.path.abspath(out_path)
+    publish_keys = os.path.abspath(publish_keys) if publish_keys else None
+    # The ZKP pipeline uses paths relative to its own directory
+    os.chdir(ZKP_DIR)
+    sys.path.insert(0, ZKP_DIR)
+    from bbs.sign import issue_credentials
+    from bbs.create_bbs_proof import create_bbs_selective_proof
+    from compact_payload import encode_credential_record
+    from merkle import MerkleTree, poseidon_hash_two
+    from zk.generate_proof import compile_circuit, generate_zk_proof, proof_path, public_path
+    from zk.trusted_setup import trusted_setup
+
+    if not 1 <= size <= 256:
+        raise SystemExit("Pool size must be between 1 and 256 (depth-8 tree)")
+    compile_circuit()
+    trusted_setup()
+
+    rng = random.Random(seed)
+    issued = []
+    for _ in range(size):
+        attributes = synthetic_attributes(rng)
+        signature, keypair, _, serial, issuer_id, all_keys, signing_key, pk_bind_bytes = issue_credentials(attributes)
+        issued.append((attributes, signature, keypair, serial, issuer_id, all_keys, signing_key, pk_bind_bytes))
+
+    # One tree over every commitment, so the whole pool shares a root the server can publish
+    tree = MerkleTree([poseidon_hash_two(item[3], item[4]) for item in issued])
+    root_hex = hex(tree.get_root())[2:]
+    epoch = int(time.time())
+
+    credentials = []
+    for n, (attributes, signature, keypair, serial, issuer_id, all_keys, signing_key, pk_bind_bytes) in enumerate(issued):
+        print(f"[Pool] Proving credential {n + 1}/{size}")
+        bbs_proof, revealed_attrs_bytes, bbs_pub, nonce, _, serial, issuer_id, leaf_index = create_bbs_selective_proof(
+            signature=signature, keypair=keypair, attributes=attributes,
+            revealed_fields=list(REVEALED_ATTRIBUTES), tree=tree, serial=serial,
+            issuer_id=issuer_id, all_keys=all_keys, pk_bind_bytes=pk_bind_bytes
+        )
+        generate_zk_proof(
+            birth_year=attributes["birth_year"], birth_month=attributes["birth_month"],
+            birth_day=attributes["birth_day"], expiry_year=attributes["expiry_year"],
+            expiry_month=attributes["expiry_month"], nationality=attributes["nationality"],
+            current_year=attributes["current_year"], current_month=attributes["current_month"],
+            current_day=attributes["current_day"],
+            # The signature was issued a moment ago and create_proof only succeeds over a valid one
+            valid_signature=1,
+            serial=serial, issuer_id=issuer_id, merkle_leaves=tree.leaves, leaf_index=leaf_index
+        )
+        payload = {
+            "bbs_public_key_b64": b64(bbs_pub),
+            "bbs_proof": b64(bbs_proof),
+            "bbs_nonce": b64(nonce),
+            "message_count": len(attributes) + 2,
+            "revealed": [
+                {"name": "expiry_year", "value": str(attributes["expiry_year"]), "encoding": "utf8"},
+                {"name": "expiry_month", "value": str(attributes["expiry_month"]), "encoding": "utf8"},
+                {"name": "pk_bind", "value": b64(pk_bind_bytes), "encoding": "base64"},
+                {"name": "commitment", "value": b64(revealed_attrs_bytes["commitment"]), "encoding": "base64"},
+            ],
+            "plonk_proof": b64(open(proof_path, "rb").read()),
+            "plonk_public": b64(open(public_path, "rb").read()),
+            "merkle_root_hex": root_hex,
+            "epoch": epoch,
+        }
+        credentials.append({
+            "payload": payload,
+            "record": b64(encode_credential_record(payload)),
+            "signing_key": b64(signing_key.encode()),
+        })
+
+    with open(out_path, "w") as f:
+        json.dump({
+            "created": datetime.now().date().isoformat(),
+            "merkle_root_hex": root_hex,
+            "epoch": epoch,
+            "credentials": credentials,
+        }, f)
+    print(f"[Pool] Wrote {size} credentials to {out_path}")
+
+    if publish_keys:
+        os.makedirs(publish_keys, exist_ok=True)
+        shutil.copyfile("zk/verification_key.json", os.path.join(publish_keys, "verification_key.json"))
+        tmp_path = os.path.join(publish_keys, "merkle_root.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"root_hex": root_hex, "epoch": epoch}, f)
+        os.replace(tmp_path, os.path.join(publish_keys, "merkle_root.json"))
+        print(f"[Pool] Published root {root_hex} (epoch {epoch}) and verification key to {publish_keys}")
+
+
+# ---------------------------------------------------------------------------
+# Load generation
+# ---------------------------------------------------------------------------
+
+class Stats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {name: [] for name in ENDPOINTS}
+        self.statuses: Dict[str, Dict[str, int]] = {name: {} for name in ENDPOINTS}
+        self.flows = 0
+
+    def record(self, endpoint: str, seconds: float, status: str):
+        self.latencies[endpoint].append(seconds)
+        self.statuses[endpoint][status] = self.statuses[endpoint].get(status, 0) + 1
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(q / 100.0 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(stats: Stats, elapsed: float) -> dict:
+    endpoints = {}
+    for name in ENDPOINTS:
+        values = sorted(stats.latencies[name])
+        count = len(values)
+        errors = sum(n for status, n in stats.statuses[name].items() if status != "200")
+        endpoints[name] = {
+            "count": count,
+            "errors": errors,
+            "error_rate": errors / count if count else 0.0,
+            "rps": count / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "mean_ms": (sum(values) / count * 1000) if count else 0.0,
+            "max_ms": values[-1] * 1000 if values else 0.0,
+            "status_counts": stats.statuses[name],
+        }
+    return {
+        "elapsed_s": elapsed,
+        "flows_completed": stats.flows,
+        "flows_per_s": stats.flows / elapsed if elapsed else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+async def timed(stats: Stats, endpoint: str, request):
+    start = time.perf_counter()
+    try:
+        response = await request
+        status = str(response.status_code)
+    except Exception as e:
+        response, status = None, type(e).__name__
+    stats.record(endpoint, time.perf_counter() - start, status)
+    return response if status == "200" else None
+
+
+async def login_flow(client, credential: dict, stats: Stats, binary: bool) -> bool:
+    from nacl.signing import SigningKey
+    from compact_payload import MEDIA_TYPE, with_challenge
+
+    payload = credential["payload"]
+    pk_bind = next(item["value"] for item in payload["revealed"] if item["name"] == "pk_bind")
+    response = await timed(stats, "challenge", client.post("/auth/challenge", json={"pk_bind_key": pk_bind}))
+    if response is None:
+        return False
+    challenge = response.json()
+    signing_key = SigningKey(base64.b64decode(credential["signing_key"])[:32])
+    signature = signing_key.sign(base64.b64decode(challenge["challenge"])).signature
+
+    if binary:
+        body = with_challenge(base64.b64decode(credential["record"]), challenge["challenge_id"], signature)
+        request = client.post("/auth/login", content=body, headers={"Content-Type": MEDIA_TYPE})
+    else:
+        request = client.post("/auth/login", json={
+            **payload, "challenge_id": challenge["challenge_id"], "challenge_signature": b64(signature)
+        })
+    if await timed(stats, "login", request) is None:
+        return False
+    return await timed(stats, "dashboard", client.get("/dashboard/")) is not None
+
+
+async def run_phase(args, pool_cycle, stats: Stats, flows: int, duration: float) -> float:
+    """Run `flows` login flows (or until `duration` elapses when flows is 0) across the virtual users."""
+    import httpx
+
+    issued = itertools.count()
+    started = time.perf_counter()
+    deadline = started + duration
+
+    async def user():
+        # One client per virtual user: its own connection and session cookie
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout) as client:
+            while True:
+                if flows and next(issued) >= flows:
+                    return
+                if not flows and time.perf_counter() >= deadline:
+                    return
+                if await login_flow(client, next(pool_cycle), stats, args.binary):
+                    stats.flows += 1
+
+    await asyncio.gather(*(user() for _ in range(args.concurrency)))
+    return time.perf_counter() - started
+
+
+async def run_load(args) -> dict:
+    sys.path.insert(0, ZKP_DIR)
+    with open(args.pool) as f:
+        pool = json.load(f)["credentials"]
+    pool_cycle = itertools.cycle(pool)
+
+    # Warm-up flows are excluded from the numbers (connection setup, worker spawn, caches)
+    if args.warmup:
+        await run_phase(args, pool_cycle, Stats(), args.warmup, 0)
+    stats = Stats()
+    elapsed = await run_phase(args, pool_cycle, stats, args.flows, args.duration)
+
+    result = summarize(stats, elapsed)
+    result["config"] = {
+        "base_url": args.base_url, "concurrency": args.concurrency, "duration_s": args.duration,
+        "flows": args.flows, "warmup": args.warmup, "binary": args.binary, "pool_size": len(pool),
+    }
+    return result
+
+
+def check_gates(result: dict, args) -> List[str]:
+    failures = []
+    for name, endpoint in result["endpoints"].items():
+        if args.max_p95_ms is not None and endpoint["p95_ms"] > args.max_p95_ms:
+            failures.append(f"{name} p95 {endpoint['p95_ms']:.1f} ms > {args.max_p95_ms} ms")
+        if args.max_error_rate is not None and endpoint["error_rate"] > args.max_error_rate:
+            failures.append(f"{name} error rate {endpoint['error_rate']:.3f} > {args.max_error_rate}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Therapy platform login load test")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    pool_parser = sub.add_parser("make-pool", help="generate credentials with the ZKP_Software pipeline")
+    pool_parser.add_argument("--size", type=int, default=20)
+    pool_parser.add_argument("--out", default="loadtest_pool.json")
+    pool_parser.add_argument("--publish-keys", default=None,
+                             help="server keys/ directory to write the pool's root and verification key into")
+    pool_parser.add_argument("--seed", type=int, default=1234,
+                             help="seed for the synthetic attributes, fixed so pools are comparable between runs")
+
+    run_parser = sub.add_parser("run", help="drive the login flow against a running instance")
+    run_parser.add_argument("--pool", default="loadtest_pool.json")
+    run_parser.add_argument("--base-url", default=f"http://127.0.0.1:{os.environ.get('APP_PORT', '5000')}")
+    run_parser.add_argument("--concurrency", type=int, default=16)
+    run_parser.add_argument("--duration", type=float, default=30.0, help="seconds to run (ignored with --flows)")
+    run_parser.add_argument("--flows", type=int, default=0, help="stop after this many login flows")
+    run_parser.add_argument("--warmup", type=int, default=0, help="flows to run before measuring")
+    run_parser.add_argument("--timeout", type=float, default=30.0)
+    run_parser.add_argument("--binary", action="store_true", help="send the compact binary payload")
+    run_parser.add_argument("--out", default=None, help="also write the JSON report here")
+    run_parser.add_argument("--max-p95-ms", type=float, default=None)
+    run_parser.add_argument("--max-error-rate", type=float, default=None)
+
+    args = parser.parse_args()
+    if args.command == "make-pool":
+        make_pool(args.size, args.out, args.publish_keys, args.seed)
+        return
+
+    result = asyncio.run(run_load(args))
+    failures = check_gates(result, args)
+    result["gate_failures"] = failures
+    report = json.dumps(result, indent=2)
+    print(report)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(report)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,9 @@ if [ -f ".env" ]; then
     export $(grep -v '^#' .env | xargs)
 fi
 
+# Development server: the default SECRET_KEY is only accepted in debug mode
+export DEBUG=${DEBUG:-true}
+
 # Start the application
 echo "Starting Therapy platform application..."
 uvicorn app.main:app --host 127.0.0.1 --port ${APP_PORT:-5000} --reload
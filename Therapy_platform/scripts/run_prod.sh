@@ -0,0 +1,23 @@
+#!/bin/bash
+set -e
+
+# Activate virtual environment
+if [ -d "venv" ]; then
+    source venv/bin/activate
+else
+    echo "Virtual environment not found. Run ./scripts/setup.sh first."
+    exit 1
+fi
+
+# Load environment variables
+if [ -f ".env" ]; then
+    export $(grep -v '^#' .env | xargs)
+fi
+
+# Workers share challenges through the database, not process memory
+export CHALLENGE_STORE_BACKEND=${CHALLENGE_STORE_BACKEND:-sqlite}
+
+# Start the application: pre-forked workers, state loaded once in the master (gunicorn.conf.py).
+# `kill -HUP <master pid>` reloads workers gracefully; GET /ready is 200 once a worker is warm.
+echo "Starting Therapy platform application (${WEB_WORKERS:-2} workers)..."
+exec gunicorn -c gunicorn.conf.py app.main:app
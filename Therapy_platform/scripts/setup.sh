@@ -19,6 +19,10 @@ pip install --upgrade pip
 echo "Installing dependencies..."
 pip install -r requirements.txt
 
+# Install Node dependencies (snarkjs for the warm PLONK verifier pool)
+echo "Installing Node dependencies..."
+npm install
+
 # Install development dependencies if requested
 if [ "$1" = "dev" ]; then
     pip install -r requirements-dev.txt
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+# Run from anywhere: the app package lives next to this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeClock:
+    """Stands in for the `time` module where expiry is computed from time.time()."""
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    from app import proof_cache, root_history
+
+    clock = FakeClock()
+    monkeypatch.setattr(proof_cache, "time", clock)
+    monkeypatch.setattr(root_history, "time", clock)
+    return clock
@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app import challenge_store as store_module
+from app.challenge_store import MemoryChallengeStore, SQLiteChallengeStore
+from app.database import Base, _apply_sqlite_pragmas
+
+KEY = b"\x01" * 32
+OTHER_KEY = b"\x02" * 32
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path, monkeypatch):
+    """Build a store of either backend; the sqlite one gets a fresh database file."""
+    if request.param == "sqlite":
+        # NullPool: every test runs its own event loop, so no connection may outlive it
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'challenges.db'}", poolclass=NullPool)
+        event.listen(engine.sync_engine, "connect", _apply_sqlite_pragmas)
+        monkeypatch.setattr(store_module, "AsyncSessionLocal",
+                            async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False))
+
+        async def create_tables():
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+        asyncio.run(create_tables())
+
+    def make(ttl=60.0, nonce_ttl=600.0, max_per_key=64, max_per_client=960, nonce_capacity=1000):
+        if request.param == "memory":
+            return MemoryChallengeStore(ttl, nonce_ttl, 100, max_per_key, max_per_client, nonce_capacity)
+        return SQLiteChallengeStore(ttl, nonce_ttl, max_per_key, max_per_client, nonce_capacity)
+    return make
+
+
+def test_consume_once(make_store):
+    async def scenario():
+        store = make_store()
+        challenge = await store.issue(KEY)
+        consumed = await store.consume(challenge.challenge_id, KEY)
+        assert consumed.challenge_bytes == challenge.challenge_bytes
+        assert await store.consume(challenge.challenge_id, KEY) is None
+    asyncio.run(scenario())
+
+
+def test_concurrent_consumers_get_it_once(make_store):
+    async def scenario():
+        store = make_store()
+        challenge = await store.issue(KEY)
+        results = await asyncio.gather(*(store.consume(challenge.challenge_id, KEY) for _ in range(5)))
+        assert sum(r is not None for r in results) == 1
+    asyncio.run(scenario())
+
+
+def test_consume_wrong_key_or_unknown(make_store):
+    async def scenario():
+        store = make_store()
+        challenge = await store.issue(KEY)
+        assert await store.consume(challenge.challenge_id, OTHER_KEY) is None
+        assert await store.consume("00000000-0000-0000-0000-000000000000", KEY) is None
+        # A wrong-key attempt does not burn the challenge for its owner
+        assert await store.consume(challenge.challenge_id, KEY) is not None
+    asyncio.run(scenario())
+
+
+def test_expired_challenge(make_store):
+    async def scenario():
+        store = make_store(ttl=-1)
+        challenge = await store.issue(KEY)
+        assert await store.consume(challenge.challenge_id, KEY) is None
+        await store.issue(KEY)
+        assert await store.sweep() >= 1
+        assert await store.sweep() == 0
+    asyncio.run(scenario())
+
+
+def test_nonce_consume_and_replay(make_store):
+    async def scenario():
+        store = make_store()
+        batch = await store.issue_nonces(KEY, 3, "127.0.0.1")
+        assert len(batch.nonces) == 3
+        nonce = batch.nonces[0]
+        assert await store.consume_nonce(nonce, OTHER_KEY) is False
+        assert await store.consume_nonce(nonce, KEY) is True
+        assert await store.consume_nonce(nonce, KEY) is False
+        # Spent nonces survive a sweep until they expire, so the replay is still refused
+        await store.sweep()
+        assert await store.consume_nonce(nonce, KEY) is False
+    asyncio.run(scenario())
+
+
+def test_self_picked_nonce(make_store):
+    async def scenario():
+        store = make_store()
+        assert await store.consume_nonce(b"\x09" * 16, KEY) is None
+        await store.issue_nonces(KEY, 1, "127.0.0.1")
+        # A key holding issued nonces must use one of them
+        assert await store.consume_nonce(b"\x09" * 16, KEY) is False
+        assert await store.consume_nonce(b"\x09" * 16, OTHER_KEY) is None
+    asyncio.run(scenario())
+
+
+def test_expired_nonce(make_store):
+    async def scenario():
+        store = make_store(nonce_ttl=-1)
+        batch = await store.issue_nonces(KEY, 1, "127.0.0.1")
+        assert await store.consume_nonce(batch.nonces[0], KEY) is False
+    asyncio.run(scenario())
+
+
+def test_nonce_limits(make_store):
+    async def scenario():
+        store = make_store(max_per_key=5, max_per_client=8)
+        assert len((await store.issue_nonces(KEY, 4, "a")).nonces) == 4
+        # Spent nonces still count against the key until they expire
+        first = await store.issue_nonces(KEY, 4, "b")
+        assert len(first.nonces) == 1
+        assert await store.consume_nonce(first.nonces[0], KEY) is True
+        assert (await store.issue_nonces(KEY, 1, "b")).nonces == []
+        # Client "a" has 4 of its 8 left
+        assert len((await store.issue_nonces(OTHER_KEY, 5, "a")).nonces) == 4
+    asyncio.run(scenario())
+
+
+def test_nonce_capacity(make_store):
+    async def scenario():
+        store = make_store(nonce_capacity=3)
+        assert len((await store.issue_nonces(KEY, 2, "a")).nonces) == 2
+        assert len((await store.issue_nonces(OTHER_KEY, 2, "b")).nonces) == 1
+        assert (await store.issue_nonces(OTHER_KEY, 1, "b")).nonces == []
+    asyncio.run(scenario())
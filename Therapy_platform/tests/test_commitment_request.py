@@ -0,0 +1,20 @@
+import pytest
+from pydantic import ValidationError
+
+from app.routers.admin import CommitmentRequest
+
+
+@pytest.mark.parametrize("commitment, value", [
+    ("12345", 12345),
+    ("0012", 12),       # decimal with leading zeros, not octal
+    ("0x1f", 31),
+    ("0xABC", 0xABC),
+])
+def test_value(commitment, value):
+    assert CommitmentRequest(commitment=commitment).value() == value
+
+
+@pytest.mark.parametrize("commitment", ["1f", "0x", "-5", "0o17", "1" * 81])
+def test_rejected(commitment):
+    with pytest.raises(ValidationError):
+        CommitmentRequest(commitment=commitment)
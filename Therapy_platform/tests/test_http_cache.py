@@ -0,0 +1,53 @@
+from starlette.requests import Request
+
+from app.http_cache import REVALIDATE, cached_response, make_etag, register_variants
+
+BODY = b"<html>" + b"therapy " * 200 + b"</html>"
+ETAG = make_etag(BODY)
+register_variants(ETAG, BODY)
+
+
+def request(**headers) -> Request:
+    raw = [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+def respond(**headers):
+    return cached_response(request(**headers), BODY, ETAG, "text/html", REVALIDATE)
+
+
+def test_identity_response():
+    response = respond()
+    assert response.status_code == 200
+    assert response.body == BODY
+    assert response.headers["etag"] == ETAG
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert "content-encoding" not in response.headers
+
+
+def test_compressed_variant_has_own_etag():
+    response = respond(accept_encoding="gzip")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == ETAG[:-1] + '-gzip"'
+    assert len(response.body) < len(BODY)
+
+
+def test_not_modified_for_negotiated_variant():
+    gzip_etag = respond(accept_encoding="gzip").headers["etag"]
+    response = respond(accept_encoding="gzip", if_none_match=gzip_etag)
+    assert response.status_code == 304
+    assert response.headers["etag"] == gzip_etag
+    assert response.headers["vary"] == "Accept-Encoding"
+
+
+def test_variant_etag_does_not_match_other_representation():
+    # A cached gzip body must not be revalidated for a client that can't decode it
+    gzip_etag = respond(accept_encoding="gzip").headers["etag"]
+    assert respond(if_none_match=gzip_etag).status_code == 200
+    assert respond(if_none_match=f'W/{ETAG}, "other"').status_code == 304
+    assert respond(if_none_match="*").status_code == 304
+
+
+def test_refused_encoding():
+    response = respond(accept_encoding="gzip;q=0")
+    assert "content-encoding" not in response.headers
@@ -0,0 +1,108 @@
+import struct
+import uuid
+
+import pytest
+
+from app.credential import LoginRejected, PUBLIC_SIGNAL_COUNT
+from app.payload_codec import (
+    BN254_R, MAGIC, PLONK_EVALUATIONS, PLONK_POINTS, PLONK_PROOF_BYTES, VERSION, decode_binary_payload
+)
+
+PK_BIND = bytes(range(32))
+CHALLENGE_ID = "0b7f8c1e-3d2a-4f6b-9c5e-7a1d2e3f4a5b"
+SIGNATURE = b"\x07" * 64
+
+
+def _fe(value: int) -> bytes:
+    return value.to_bytes(32, "big")
+
+
+def encode(revealed=None, public=None, plonk_proof=None, epoch=7, message_count=9, trailer=True) -> bytes:
+    """A version 1 payload laid out as documented in app/payload_codec.py."""
+    if revealed is None:
+        revealed = {"expiry_year": b"2030", "expiry_month": b"12", "pk_bind": PK_BIND, "commitment": _fe(12345)}
+    if public is None:
+        public = list(range(1, PUBLIC_SIGNAL_COUNT + 1))
+    if plonk_proof is None:
+        plonk_proof = b"".join(_fe(n) for n in range(1, 2 * len(PLONK_POINTS) + len(PLONK_EVALUATIONS) + 1))
+    out = bytearray(struct.pack(">3sBIB", MAGIC, VERSION, epoch, message_count))
+    out += _fe(0xABC)
+    out += struct.pack(">H", 3) + b"pub"
+    out += struct.pack(">H", 5) + b"proof"
+    out += struct.pack(">B", 16) + b"\x01" * 16
+    out += struct.pack(">B", len(revealed))
+    for name, value in revealed.items():
+        out += struct.pack(">B", len(name)) + name.encode() + struct.pack(">H", len(value)) + value
+    out += plonk_proof
+    out += struct.pack(">B", len(public)) + b"".join(_fe(s) for s in public)
+    if trailer:
+        out += uuid.UUID(CHALLENGE_ID).bytes + SIGNATURE
+    return bytes(out)
+
+
+def test_round_trip():
+    credential = decode_binary_payload(encode())
+
+    assert credential.bbs_public_key == b"pub"
+    assert credential.bbs_proof == b"proof"
+    assert credential.bbs_nonce == b"\x01" * 16
+    assert credential.message_count == 9
+    assert credential.pk_bind_key == PK_BIND
+    assert credential.revealed["expiry_year"] == b"2030"
+    assert credential.checked_root == ("abc", 7)
+    assert credential.challenge_id == CHALLENGE_ID
+    assert credential.challenge_signature == SIGNATURE
+    assert credential.plonk_public == [str(n) for n in range(1, PUBLIC_SIGNAL_COUNT + 1)]
+    assert credential.plonk_proof["A"] == ["1", "2", "1"]
+    assert credential.plonk_proof["Wxiw"] == ["17", "18", "1"]
+    assert credential.plonk_proof["eval_zw"] == "24"
+    assert credential.plonk_proof["protocol"] == "plonk"
+    assert len(credential.plonk_proof_bytes) == PLONK_PROOF_BYTES
+
+
+def test_fields_are_bytes_not_views():
+    credential = decode_binary_payload(bytearray(encode()))
+    for value in (credential.bbs_proof, credential.bbs_nonce, credential.plonk_proof_bytes,
+                  credential.challenge_signature, *credential.revealed.values()):
+        assert type(value) is bytes
+
+
+@pytest.mark.parametrize("cut", [2, 10, 60, -1])
+def test_truncated(cut):
+    with pytest.raises(LoginRejected, match="Truncated"):
+        decode_binary_payload(encode()[:cut])
+
+
+def test_trailing_bytes():
+    with pytest.raises(LoginRejected, match="Trailing bytes"):
+        decode_binary_payload(encode() + b"\x00")
+
+
+def test_missing_challenge_trailer():
+    with pytest.raises(LoginRejected, match="Truncated"):
+        decode_binary_payload(encode(trailer=False))
+
+
+def test_wrong_magic_and_version():
+    body = encode()
+    with pytest.raises(LoginRejected, match="Not a binary"):
+        decode_binary_payload(b"XYZ" + body[3:])
+    with pytest.raises(LoginRejected, match="Unsupported payload version"):
+        decode_binary_payload(body[:3] + bytes([VERSION + 1]) + body[4:])
+
+
+def test_missing_revealed_attribute():
+    revealed = {"expiry_year": b"2030", "expiry_month": b"12", "pk_bind": PK_BIND}
+    with pytest.raises(LoginRejected, match="missing: commitment"):
+        decode_binary_payload(encode(revealed=revealed))
+
+
+def test_non_canonical_field_element():
+    public = [BN254_R] + list(range(PUBLIC_SIGNAL_COUNT - 1))
+    with pytest.raises(LoginRejected, match="canonical"):
+        decode_binary_payload(encode(public=public))
+
+
+def test_wrong_public_signal_count():
+    with pytest.raises(LoginRejected, match="wrong shape"):
+        decode_binary_payload(encode(public=[1, 2, 3]))
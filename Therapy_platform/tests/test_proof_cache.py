@@ -0,0 +1,98 @@
+from datetime import datetime
+
+from app import proof_cache as proof_cache_module
+from app.proof_cache import VerifiedProofCache, proof_day_end
+from app.root_history import RootHistory
+from app.zkp import KeySnapshot
+
+OLD_ROOT = ("abc", 1)
+NEW_ROOT = ("def", 2)
+
+
+def snapshot(vk_bytes=b"vk", merkle_root=OLD_ROOT) -> KeySnapshot:
+    return KeySnapshot(vk_bytes, None, merkle_root, None, None)
+
+
+def test_hit_until_ttl(clock):
+    cache = VerifiedProofCache(max_entries=10, ttl=60)
+    key = cache.key("plonk", b"proof", b"public")
+    assert not cache.get(key)
+    cache.put(key, OLD_ROOT)
+    clock.now += 59
+    assert cache.get(key)
+    clock.now += 1
+    assert not cache.get(key)
+    assert len(cache) == 0
+
+
+def test_valid_until_caps_ttl(clock):
+    cache = VerifiedProofCache(max_entries=10, ttl=3600)
+    key = cache.key("bbs", b"proof")
+    cache.put(key, OLD_ROOT, valid_until=clock.now + 10)
+    clock.now += 10
+    assert not cache.get(key)
+
+
+def test_lru_eviction(clock):
+    cache = VerifiedProofCache(max_entries=2, ttl=60)
+    a, b, c = (cache.key("bbs", name) for name in (b"a", b"b", b"c"))
+    cache.put(a, OLD_ROOT)
+    cache.put(b, OLD_ROOT)
+    assert cache.get(a)  # a is now the most recently used
+    cache.put(c, OLD_ROOT)
+    assert cache.get(a) and cache.get(c)
+    assert not cache.get(b)
+
+
+def test_key_parts_cannot_run_together():
+    assert VerifiedProofCache.key("bbs", b"ab", b"c") != VerifiedProofCache.key("bbs", b"a", b"bc")
+    assert VerifiedProofCache.key("bbs", b"a") != VerifiedProofCache.key("plonk", b"a")
+
+
+def test_purge_roots_except(clock):
+    cache = VerifiedProofCache(max_entries=10, ttl=60)
+    old, new = cache.key("bbs", b"old"), cache.key("bbs", b"new")
+    cache.put(old, OLD_ROOT)
+    cache.put(new, NEW_ROOT)
+    cache.purge_roots_except({NEW_ROOT})
+    assert cache.get(new)
+    assert not cache.get(old)
+
+
+def test_proof_day_end():
+    signals = ["0"] * 4 + ["2030", "6", "15"] + ["0"] * 3
+    assert proof_day_end(signals) == datetime(2030, 6, 16).timestamp()
+    assert proof_day_end(signals[:4]) is None
+    assert proof_day_end(signals[:4] + ["2030", "13", "1"]) is None
+
+
+def test_key_change_listener(clock, monkeypatch):
+    cache = VerifiedProofCache(max_entries=10, ttl=60)
+    history = RootHistory(size=16, grace=3600)
+    monkeypatch.setattr(proof_cache_module, "proof_cache", cache)
+    monkeypatch.setattr(proof_cache_module, "root_history", history)
+    history.publish(OLD_ROOT)
+    key = cache.key("plonk", b"proof")
+    cache.put(key, OLD_ROOT)
+
+    # The old root is still within its grace period, so its entries stay
+    history.publish(NEW_ROOT)
+    proof_cache_module._on_keys_changed(snapshot(), snapshot(merkle_root=NEW_ROOT))
+    assert cache.get(key)
+
+    # A new verification key invalidates everything
+    proof_cache_module._on_keys_changed(snapshot(merkle_root=NEW_ROOT), snapshot(b"vk2", NEW_ROOT))
+    assert len(cache) == 0
+
+
+def test_listener_purges_roots_past_grace(clock, monkeypatch):
+    cache = VerifiedProofCache(max_entries=10, ttl=3600)
+    history = RootHistory(size=16, grace=60)
+    monkeypatch.setattr(proof_cache_module, "proof_cache", cache)
+    monkeypatch.setattr(proof_cache_module, "root_history", history)
+    history.publish(OLD_ROOT)
+    cache.put(cache.key("plonk", b"proof"), OLD_ROOT)
+    history.publish(NEW_ROOT)
+    clock.now += 61
+    proof_cache_module._on_keys_changed(snapshot(), snapshot(merkle_root=NEW_ROOT))
+    assert len(cache) == 0
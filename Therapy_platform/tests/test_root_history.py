@@ -0,0 +1,77 @@
+import pytest
+
+from app.credential import LoginRejected, check_root
+from app.root_history import RootHistory
+
+R1, R2, R3 = ("a1", 1), ("b2", 2), ("c3", 3)
+
+
+def test_current_root_accepted(clock):
+    history = RootHistory(size=16, grace=60)
+    assert not history.accepts(R1)
+    history.publish(R1)
+    assert history.accepts(R1)
+    assert not history.accepts(("a1", 2))  # same root, other epoch
+
+
+def test_retired_root_accepted_for_grace_period(clock):
+    history = RootHistory(size=16, grace=60)
+    history.publish(R1)
+    clock.now += 10
+    history.publish(R2)
+    clock.now += 60
+    assert history.accepts(R1)
+    clock.now += 1
+    assert not history.accepts(R1)
+    assert history.accepts(R2)
+    assert history.accepted() == {R2}
+
+
+def test_every_root_in_window_kept(clock):
+    # However many roots are published within the grace period, none is dropped early
+    history = RootHistory(size=4096, grace=60)
+    roots = [(f"{n:x}", n) for n in range(100)]
+    for root in roots:
+        history.publish(root)
+        clock.now += 0.5
+    assert history.accepted() == set(roots)
+
+
+def test_size_bounds_memory(clock):
+    history = RootHistory(size=2, grace=60)
+    for root in (R1, R2, R3, ("d4", 4)):
+        history.publish(root)
+    assert not history.accepts(R1)
+    assert history.accepted() == {R2, R3, ("d4", 4)}
+
+
+def test_republished_root_is_current_again(clock):
+    history = RootHistory(size=16, grace=60)
+    history.publish(R1)
+    history.publish(R2)
+    history.publish(R1)
+    clock.now += 61
+    assert history.accepts(R1)
+    assert not history.accepts(R2)
+
+
+def test_restore_merges_persisted_retirements(clock):
+    history = RootHistory(size=16, grace=60)
+    history.publish(R3)
+    history.restore([("a1", 1, clock.now - 30), ("b2", 2, clock.now - 90), ("c3", 3, clock.now - 10)])
+    assert history.accepts(R1)
+    assert not history.accepts(R2)  # retired before the grace period
+    assert history.accepts(R3)      # still the current root
+    assert history.accepted() == {R1, R3}
+
+
+def test_check_root(clock):
+    class Credential:
+        checked_root = R1
+
+    history = RootHistory(size=16, grace=60)
+    check_root(Credential, history)  # nothing published yet: no root check
+    history.publish(R2)
+    with pytest.raises(LoginRejected) as rejected:
+        check_root(Credential, history)
+    assert rejected.value.status_code == 409
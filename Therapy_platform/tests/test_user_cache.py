@@ -0,0 +1,27 @@
+from types import SimpleNamespace
+
+from app import crud
+from app.crud import UserInfoCache
+
+
+def test_entries_expire(monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(crud, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    cache = UserInfoCache(max_entries=10, ttl=5)
+    cache.put("user", {"last_seen": 1})
+    clock.now += 4
+    assert cache.get("user") == {"last_seen": 1}
+    clock.now += 1
+    assert cache.get("user") is None
+
+
+def test_invalidate_and_lru():
+    cache = UserInfoCache(max_entries=2, ttl=60)
+    cache.put("a", {"n": 1})
+    cache.put("b", {"n": 2})
+    cache.get("a")
+    cache.put("c", {"n": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1}
+    cache.invalidate("a")
+    assert cache.get("a") is None
@@ -54,7 +54,7 @@ def bls_to_bbs_key_via_ffi(bls_pub_bytes: bytes, message_count: int) -> bytes:
 
 
 def create_bbs_selective_proof(signature, keypair, attributes: dict, revealed_fields: list,
-    tree: MerkleTree, serial: int, issuer_id: int, all_keys: list, pk_bind_bytes: bytes):
+    tree: MerkleTree, serial: int, issuer_id: int, all_keys: list, pk_bind_bytes: bytes, nonce: bytes = None):
     """
     A function to create a proof of only selected values (selective disclosure) using the BBS+ library 
     that has been imported from ffi-bbs-signatures.
@@ -62,9 +62,11 @@ def create_bbs_selective_proof(signature, keypair, attributes: dict, revealed_fi
     - signature, keypair: from issuer
     - attributes: original attribute dictionary
     - revealed_fields: which attribute keys to reveal
-    - tree: MerkleTree containing commitments
+    - tree: MerkleTree containing commitments (None when the caller tracks its own path;
+      merkle_proof and leaf_index are then None)
     - serial, issuer_id: holder secret + issuer id
     - all_keys: deterministic ordering used for signing
+    - nonce: proof nonce issued by the verifier (a random one if omitted)
     Returns:
       bbs_proof, revealed_attrs_bytes (dict key->bytes), bbs_pub, nonce, merkle_proof (pathElements, pathIndices), serial, issuer_id, leaf_index
     """
@@ -88,7 +90,8 @@ def create_bbs_selective_proof(signature, keypair, attributes: dict, revealed_fi
     messages.append(ProofMessage(commitment_bytes, ProofMessageType.Revealed))
     revealed_fields.append("commitment")
 
-    nonce = os.urandom(16)
+    if nonce is None:
+        nonce = os.urandom(16)
     message_count = len(messages)
 
     # Convert BLS public key to BBS and create proof
@@ -113,6 +116,9 @@ def create_bbs_selective_proof(signature, keypair, attributes: dict, revealed_fi
         else:
             revealed_attrs_bytes[k] = str(attributes[k]).encode()
 
+    if tree is None:
+        return bbs_proof, revealed_attrs_bytes, bbs_pub, nonce, None, serial, issuer_id, None
+
     # Find commitment leaf index in tree and produce merkle proof
     try:
         leaf_index = tree.leaves.index(commitment_int)
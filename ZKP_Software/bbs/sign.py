@@ -4,10 +4,11 @@ import os
 from nacl import signing
 import base64
 
-def issue_credentials(attributes: dict, issuer_id: int = 42):
+def issue_credentials(attributes: dict, issuer_id: int = 42, keypair: BlsKeyPair = None):
     """
     - attributess: dictionary of attributes (preserve insertion order or pass explicit ordering)
     - issuer_id: integer identifying the issuer
+    - keypair: issuer key to sign with (a fresh one per credential if omitted)
     Returns:
       signature, keypair, tree, serial (int), issuer_id (int), all_keys (list)
     """
@@ -51,7 +52,8 @@ def issue_credentials(attributes: dict, issuer_id: int = 42):
     messages_bytes.append(commitment_bytes)
 
     # Sign all messages
-    keypair = BlsKeyPair.generate_g2()
+    if keypair is None:
+        keypair = BlsKeyPair.generate_g2()
     request = SignRequest(messages=messages_bytes, key_pair=keypair)
     signature = sign(request)
 
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the Python-side primitives of the issuance pipeline.
+
+    python benchmarks/bench.py                        # run everything, compare to baseline.json
+    python benchmarks/bench.py --only merkle,poseidon --depths 4,8,12
+    python benchmarks/bench.py --save-baseline        # record this machine's numbers as the baseline
+
+Every benchmark is warmed up and then timed over --repeats rounds. Each round
+runs the operation enough times to last at least --min-time seconds, and the
+median round is reported as ops/sec. Peak Python memory for one operation is
+measured separately with tracemalloc, so tracing does not distort the timings.
+Inputs come from random.Random(--seed). Key and serial generation inside
+issue_credentials always uses os.urandom, but the cost does not depend on the
+values.
+
+Results are compared with the baseline file. Anything slower than
+(1 - --threshold) of baseline throughput, or using more than (1 + --threshold)
+of its memory, is flagged, and the exit status is then 1. Baselines are only
+comparable on the machine (and Python/library versions) they were recorded on.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+ZKP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ZKP_DIR)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Attributes shaped like a real credential (9 signed attributes + pk_bind + commitment)
+ATTRIBUTES = {
+    "birth_year": 1990, "birth_month": 5, "birth_day": 17,
+    "expiry_year": 2031, "expiry_month": 8, "nationality": 826,
+    "current_year": 2025, "current_month": 1, "current_day": 1,
+}
+
+
+def field_elements(rng, n):
+    from merkle import FIELD_ORDER
+    return [rng.randrange(1, FIELD_ORDER) for _ in range(n)]
+
+
+# Each benchmark takes (rng, param) and returns the zero-argument operation to time;
+# everything outside the returned callable is setup and is not measured.
+
+def bench_poseidon_hash_two(rng, _):
+    from merkle import poseidon_hash_two
+    a, b = field_elements(rng, 2)
+    return lambda: poseidon_hash_two(a, b)
+
+
+def bench_merkle_build(rng, depth):
+    from merkle import MerkleTree
+    leaves = field_elements(rng, 1 << depth)
+    return lambda: MerkleTree(leaves, depth=depth)
+
+
+def bench_merkle_update(rng, depth):
+    from merkle import MerkleTree
+    tree = MerkleTree(field_elements(rng, 1 << depth), depth=depth)
+    indices = [rng.randrange(1 << depth) for _ in range(64)]
+    values = field_elements(rng, 64)
+    state = {"i": 0}
+
+    def update():
+        i = state["i"] = (state["i"] + 1) % 64
+        tree.insert_at(indices[i], values[i])
+    return update
+
+
+def bench_merkle_get_proof(rng, depth):
+    from merkle import MerkleTree
+    tree = MerkleTree(field_elements(rng, 1 << depth), depth=depth)
+    index = rng.randrange(1 << depth)
+    return lambda: tree.get_proof(index)
+
+
+def bench_issue_credentials(rng, _):
+    from bbs.sign import issue_credentials
+    return lambda: issue_credentials(dict(ATTRIBUTES))
+
+
+def bench_create_bbs_selective_proof(rng, _):
+    from bbs.sign import issue_credentials
+    from bbs.create_bbs_proof import create_bbs_selective_proof
+    signature, keypair, tree, serial, issuer_id, all_keys, _, pk_bind_bytes = issue_credentials(dict(ATTRIBUTES))
+    return lambda: create_bbs_selective_proof(
+        signature=signature, keypair=keypair, attributes=ATTRIBUTES,
+        revealed_fields=["expiry_year", "expiry_month"], tree=tree, serial=serial,
+        issuer_id=issuer_id, all_keys=all_keys, pk_bind_bytes=pk_bind_bytes
+    )
+
+
+def _signed_proof(rng, message_count):
+    """A BBS+ proof over `message_count` random messages, half of them revealed."""
+    from ursa_bbs_signatures import (
+        BbsKey, BlsKeyPair, CreateProofRequest, ProofMessage, ProofMessageType, SignRequest,
+        create_proof, sign,
+    )
+    from bbs.create_bbs_proof import bls_to_bbs_key_via_ffi
+    messages = [rng.getrandbits(256).to_bytes(32, "big") for _ in range(message_count)]
+    keypair = BlsKeyPair.generate_g2()
+    signature = sign(SignRequest(messages=messages, key_pair=keypair))
+    public_key = BbsKey(bls_to_bbs_key_via_ffi(keypair.public_key, message_count), message_count)
+    revealed = [i % 2 == 0 for i in range(message_count)]
+    nonce = rng.getrandbits(128).to_bytes(16, "big")
+    proof = create_proof(CreateProofRequest(
+        signature=signature, public_key=public_key, nonce=nonce,
+        messages=[ProofMessage(m, ProofMessageType.Revealed if r else ProofMessageType.HiddenProofSpecificBlinding)
+                  for m, r in zip(messages, revealed)],
+    ))
+    return public_key, proof, [m for m, r in zip(messages, revealed) if r], nonce
+
+
+def bench_bbs_verify(rng, message_count):
+    from ursa_bbs_signatures import VerifyProofRequest, verify_proof
+    public_key, proof, revealed, nonce = _signed_proof(rng, message_count)
+    request = VerifyProofRequest(proof=proof, public_key=public_key, messages=revealed, nonce=nonce)
+    return lambda: verify_proof(request)
+
+
+def bench_bls_to_bbs_key(rng, message_count):
+    from ursa_bbs_signatures import BlsKeyPair
+    from bbs.create_bbs_proof import bls_to_bbs_key_via_ffi
+    public_key = BlsKeyPair.generate_g2().public_key
+    return lambda: bls_to_bbs_key_via_ffi(public_key, message_count)
+
+
+# group -> [(benchmark name, function, parameter name, parameter source)]
+BENCHMARKS = {
+    "poseidon": [("poseidon_hash_two", bench_poseidon_hash_two, None, None)],
+    "merkle": [
+        ("merkle_build", bench_merkle_build, "depth", "depths"),
+        ("merkle_update", bench_merkle_update, "depth", "depths"),
+        ("merkle_get_proof", bench_merkle_get_proof, "depth", "depths"),
+    ],
+    "bbs": [
+        ("issue_credentials", bench_issue_credentials, None, None),
+        ("create_bbs_selective_proof", bench_create_bbs_selective_proof, None, None),
+        ("bbs_verify", bench_bbs_verify, "messages", "message_counts"),
+    ],
+    "ffi": [("bls_to_bbs_key_via_ffi", bench_bls_to_bbs_key, "messages", "message_counts")],
+}
+
+
+def measure(op, warmup, repeats, min_time):
+    for _ in range(warmup):
+        op()
+    # Calibrate the loop count so a round lasts at least min_time (like timeit.autorange)
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            op()
+        if time.perf_counter() - start >= min_time:
+            break
+        number *= 2
+
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        rounds = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for _ in range(number):
+                op()
+            rounds.append((time.perf_counter() - start) / number)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    tracemalloc.start()
+    try:
+        op()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    median = statistics.median(rounds)
+    return {
+        "ops_per_sec": 1.0 / median,
+        "median_us": median * 1e6,
+        "min_us": min(rounds) * 1e6,
+        "stdev_pct": 100 * statistics.pstdev(rounds) / median,
+        "loops": number,
+        "peak_kib": peak / 1024,
+    }
+
+
+def run(args):
+    groups = args.only.split(",") if args.only else list(BENCHMARKS)
+    params = {"depths": args.depths, "message_counts": args.message_counts}
+    results = {}
+    for group in groups:
+        if group not in BENCHMARKS:
+            raise SystemExit(f"Unknown group {group!r} (choose from {', '.join(BENCHMARKS)})")
+        for name, func, param_name, source in BENCHMARKS[group]:
+            for value in params[source] if source else [None]:
+                key = f"{name}[{param_name}={value}]" if param_name else name
+                try:
+                    op = func(random.Random(f"{args.seed}:{key}"), value)
+                except (ImportError, OSError) as e:
+                    # e.g. libbbs not built: skip that group, keep the pure-Python numbers
+                    print(f"{key:<44} skipped ({e})", file=sys.stderr)
+                    continue
+                results[key] = measure(op, args.warmup, args.repeats, args.min_time)
+                print(f"{key:<44} {results[key]['ops_per_sec']:>12.1f} ops/s", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Rows of (name, result, baseline entry or None, list of regression notes)."""
+    rows = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        notes = []
+        if base:
+            if result["ops_per_sec"] < base["ops_per_sec"] * (1 - threshold):
+                notes.append("slower")
+            if result["peak_kib"] > base["peak_kib"] * (1 + threshold) and result["peak_kib"] - base["peak_kib"] > 1:
+                notes.append("more memory")
+        rows.append((name, result, base, notes))
+    return rows
+
+
+def format_table(rows):
+    header = f"{'benchmark':<44}{'ops/s':>12}{'median us':>12}{'+/-%':>7}{'peak KiB':>10}{'vs base':>9}  flags"
+    lines = [header, "-" * len(header)]
+    for name, result, base, notes in rows:
+        change = f"{100 * (result['ops_per_sec'] / base['ops_per_sec'] - 1):+.1f}%" if base else "new"
+        lines.append(
+            f"{name:<44}{result['ops_per_sec']:>12.1f}{result['median_us']:>12.1f}{result['stdev_pct']:>7.1f}"
+            f"{result['peak_kib']:>10.1f}{change:>9}  {', '.join(notes)}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for Poseidon, Merkle, BBS+ and FFI hot paths")
+    parser.add_argument("--only", help="comma-separated groups: " + ",".join(BENCHMARKS))
+    parser.add_argument("--depths", type=lambda s: [int(x) for x in s.split(",")], default=[4, 8, 12])
+    parser.add_argument("--message-counts", type=lambda s: [int(x) for x in s.split(",")], default=[4, 11, 32])
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--repeats", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timed round")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="write these results to --baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown/memory growth (fraction)")
+    parser.add_argument("--json", help="also write the results here")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+
+    baseline = {}
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            saved = json.load(f)
+        baseline = saved["results"]
+        if saved["meta"].get("machine") != report["meta"]["machine"] or saved["meta"].get("python") != report["meta"]["python"]:
+            print(f"Note: baseline was recorded on {saved['meta'].get('machine')} / Python "
+                  f"{saved['meta'].get('python')}; comparisons are indicative only", file=sys.stderr)
+    rows = compare(results, baseline, args.threshold)
+    print(format_table(rows))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        if os.path.exists(args.baseline):
+            # Keep entries for benchmarks not run this time (e.g. --only, or BBS skipped)
+            with open(args.baseline) as f:
+                report["results"] = {**json.load(f)["results"], **results}
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+        return 0
+
+    regressions = [name for name, _, _, notes in rows if notes]
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
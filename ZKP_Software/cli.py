@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Non-interactive credential issuance (the scriptable counterpart of main.py).
+
+    python cli.py validate records.csv
+    python cli.py issue records.jsonl --out credentials.jsonl
+    cat records.jsonl | python cli.py issue - --out - > credentials.jsonl
+    python cli.py issue records.csv --out credentials.jsonl --profile out/profile.json
+
+Each record has birth_year, birth_month, birth_day, expiry_year, expiry_month
+and nationality (a code such as UK, or its numeric ISO code), as JSONL objects
+or CSV columns. Records are checked with the same rules as the interactive
+prompts; invalid ones are reported on stderr with their record number and
+skipped, and the exit status is 1 if there were any.
+
+The circuit is compiled and set up once. Records are issued in chunks of up to
+--tree-size, and every credential in a chunk is proven against one Merkle tree
+over that chunk's commitments. Each chunk's root is printed on stderr so it can
+be published. Output is one JSON line per credential, written as soon as its
+proof is done:
+
+    {"record": n, "pseudo_id": ..., "payload": {...}, "compact_record_b64": ...,
+     "holder_secret": {"signing_key_b64": ..., "serial": ..., "issuer_id": ..., "leaf_index": ...}}
+
+The holder secret is what the credential holder needs to log in and must be
+handed over (and stored) as securely as a password.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+ZKP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def read_records(path, fmt):
+    """Yield (record number, dict) from a JSONL or CSV file, or stdin for "-"."""
+    stream = sys.stdin if path == "-" else open(path, "r", newline="")
+    try:
+        if fmt == "csv":
+            for n, row in enumerate(csv.DictReader(stream), start=1):
+                yield n, row
+        else:
+            n = 0
+            for line in stream:
+                if not line.strip():
+                    continue
+                n += 1
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    record = e
+                yield n, record
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def validated(records, errors):
+    """Attributes for each valid record; problems are reported and counted in `errors`."""
+    from get_inputs import validate_attributes
+    for n, record in records:
+        try:
+            if isinstance(record, ValueError):
+                raise ValueError(f"Invalid JSON: {record}")
+            if not isinstance(record, dict):
+                raise ValueError("Not a JSON object")
+            yield n, validate_attributes(record)
+        except ValueError as e:
+            errors.append(n)
+            print(f"record {n}: {e}", file=sys.stderr)
+
+
+def chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def issue(records, out, tree_size, epoch):
+    from bbs.sign import issue_credentials
+    from compact_payload import encode_credential_record
+    from issuance import b64, prove_credential, pseudo_id
+    from merkle import DEPTH, MerkleTree, poseidon_hash_two
+    from profiling import stage
+    from zk.generate_proof import compile_circuit
+    from zk.trusted_setup import trusted_setup
+
+    if not 1 <= tree_size <= 2 ** DEPTH:
+        raise SystemExit(f"--tree-size must be between 1 and {2 ** DEPTH} (depth-{DEPTH} tree)")
+    os.makedirs("out", exist_ok=True)
+    with stage("compile_circuit"):
+        compile_circuit()
+    with stage("trusted_setup"):
+        trusted_setup()
+
+    count = 0
+    for chunk in chunks(records, tree_size):
+        # Signing is cheap, so the whole chunk is issued first to fix the tree its proofs use
+        with stage("issue_credentials"):
+            issued = [(n, attributes, issue_credentials(attributes)) for n, attributes in chunk]
+        with stage("build_tree"):
+            tree = MerkleTree([poseidon_hash_two(c[3], c[4]) for _, _, c in issued], depth=DEPTH)
+        print(f"[Issue] Root {hex(tree.get_root())[2:]} (epoch {epoch}) for records "
+              f"{issued[0][0]}-{issued[-1][0]}", file=sys.stderr)
+
+        for leaf_index, (n, attributes, credential) in enumerate(issued):
+            signature, keypair, _, serial, issuer_id, all_keys, signing_key, pk_bind_bytes = credential
+            # The signature was issued a moment ago and create_proof only succeeds over a valid one
+            with stage("prove_credential"):
+                payload = prove_credential(
+                    attributes, signature, keypair, tree, serial, issuer_id, all_keys,
+                    pk_bind_bytes, valid_signature=1, epoch=epoch
+                )
+            out.write(json.dumps({
+                "record": n,
+                "pseudo_id": pseudo_id(pk_bind_bytes),
+                "payload": payload,
+                "compact_record_b64": b64(encode_credential_record(payload)),
+                "holder_secret": {
+                    "signing_key_b64": b64(signing_key.encode()),
+                    "serial": str(serial),
+                    "issuer_id": issuer_id,
+                    "leaf_index": leaf_index,
+                },
+            }) + "\n")
+            out.flush()
+            count += 1
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate and issue credentials from JSONL/CSV records")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, description in (("validate", "check every record without issuing"),
+                              ("issue", "issue a credential per record")):
+        p = sub.add_parser(name, help=description)
+        p.add_argument("input", help="JSONL or CSV file, or - for stdin")
+        p.add_argument("--format", choices=("jsonl", "csv"),
+                       help="input format (default: from the file extension, jsonl for stdin)")
+    issue_parser = sub.choices["issue"]
+    issue_parser.add_argument("--out", default="-", help="JSONL output file, or - for stdout (default)")
+    issue_parser.add_argument("--tree-size", type=int, default=256, help="credentials per shared Merkle tree")
+    issue_parser.add_argument("--epoch", type=int, default=1, help="epoch the roots will be published under")
+    issue_parser.add_argument("--profile", metavar="TRACE_JSON",
+                              help="time each stage; write a Chrome trace here and a summary to stderr")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or ("csv" if args.input.lower().endswith(".csv") else "jsonl")
+    input_path = args.input if args.input == "-" else os.path.abspath(args.input)
+    out_path = getattr(args, "out", "-")
+    out_path = out_path if out_path == "-" else os.path.abspath(out_path)
+    profile_path = getattr(args, "profile", None)
+    profile_path = os.path.abspath(profile_path) if profile_path else None
+    # The ZKP pipeline uses paths relative to its own directory
+    os.chdir(ZKP_DIR)
+    sys.path.insert(0, ZKP_DIR)
+
+    errors = []
+    records = validated(read_records(input_path, fmt), errors)
+    if args.command == "validate":
+        valid = sum(1 for _ in records)
+        print(f"{valid} valid, {len(errors)} invalid", file=sys.stderr)
+    else:
+        if out_path == "-":
+            # Keep stdout for the JSONL only: the pipeline's progress prints and the
+            # circom/snarkjs subprocesses write to fd 1, so point that at stderr
+            sys.stdout.flush()
+            out = os.fdopen(os.dup(sys.stdout.fileno()), "w")
+            os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+        else:
+            out = open(out_path, "w")
+        if profile_path:
+            from profiling import profiler
+            profiler.enable()
+        try:
+            count = issue(records, out, args.tree_size, args.epoch)
+        finally:
+            out.close()
+        print(f"[Issue] Issued {count} credentials, {len(errors)} records rejected", file=sys.stderr)
+        if profile_path:
+            profiler.write(profile_path)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+import base64
+import json
+import struct
+import uuid
+
+# Compact binary login payload, version 1.
+# The layout is documented (and decoded) in Therapy_platform/app/payload_codec.py.
+MAGIC = b"TPC"
+VERSION = 1
+MEDIA_TYPE = "application/vnd.pseudo-id.credential"
+
+PLONK_POINTS = ("A", "B", "C", "Z", "T1", "T2", "T3", "Wxi", "Wxiw")
+PLONK_EVALUATIONS = ("eval_a", "eval_b", "eval_c", "eval_s1", "eval_s2", "eval_zw")
+
+
+def _fe(value) -> bytes:
+    return int(value).to_bytes(32, "big")
+
+
+def _revealed_value(item: dict) -> bytes:
+    if item.get("encoding", "utf8") == "base64":
+        return base64.b64decode(item["value"])
+    return item["value"].encode()
+
+
+def encode_plonk_proof(proof: dict) -> bytes:
+    out = bytearray()
+    for name in PLONK_POINTS:
+        x, y, z = proof[name]
+        if int(z) != 1:
+            raise ValueError(f"PLONK proof point {name} is not affine")
+        out += _fe(x) + _fe(y)
+    for name in PLONK_EVALUATIONS:
+        out += _fe(proof[name])
+    return bytes(out)
+
+
+def encode_credential_record(payload: dict) -> bytes:
+    """
+    Encode the JSON login payload written by main.py (without challenge fields)
+    as the compact credential record. Clients append the challenge per login.
+    The record embeds the payload's BBS+ nonce: pass a payload proved over a
+    nonce from the platform's /auth/nonces if it enforces require_bound_nonce.
+    """
+    bbs_pub = base64.b64decode(payload["bbs_public_key_b64"])
+    bbs_proof = base64.b64decode(payload["bbs_proof"])
+    nonce = base64.b64decode(payload["bbs_nonce"])
+    proof = json.loads(base64.b64decode(payload["plonk_proof"]))
+    public = json.loads(base64.b64decode(payload["plonk_public"]))
+
+    out = bytearray(struct.pack(">3sBIB", MAGIC, VERSION, payload["epoch"], payload["message_count"]))
+    out += _fe(int(payload["merkle_root_hex"], 16))
+    out += struct.pack(">H", len(bbs_pub)) + bbs_pub
+    out += struct.pack(">H", len(bbs_proof)) + bbs_proof
+    out += struct.pack(">B", len(nonce)) + nonce
+    out += struct.pack(">B", len(payload["revealed"]))
+    for item in payload["revealed"]:
+        name = item["name"].encode("ascii")
+        value = _revealed_value(item)
+        out += struct.pack(">B", len(name)) + name + struct.pack(">H", len(value)) + value
+    out += encode_plonk_proof(proof)
+    out += struct.pack(">B", len(public)) + b"".join(_fe(s) for s in public)
+    return bytes(out)
+
+
+def with_challenge(record: bytes, challenge_id: str, signature: bytes) -> bytes:
+    """Complete a credential record into a login body for one challenge."""
+    if len(signature) != 64:
+        raise ValueError("challenge signature must be 64 bytes")
+    return record + uuid.UUID(challenge_id).bytes + signature
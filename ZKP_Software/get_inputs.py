@@ -14,11 +14,15 @@ countries = ""
 for k,v in NATIONALITY_CODES.items():
     countries += k + "\n"
 
-# Get current date
-now = datetime.now()
-current_year = now.year
-current_month = now.month
-current_day = now.day
+MIN_BIRTH_YEAR = 1900
+MAX_EXPIRY_YEAR = 2100
+
+
+# Current date, read when a credential is made (not when this module is imported),
+# so a long-running issuer does not keep proving against the day it started
+def current_date(now=None):
+    now = now or datetime.now()
+    return {"current_year": now.year, "current_month": now.month, "current_day": now.day}
 
 # Obtain Nationality code from string.
 def get_nationality_code(max_attempts=5):
@@ -58,6 +62,58 @@ def get_int_input(prompt, min_value, max_value, max_attempts = 5):
         attempts += 1
     raise ValueError(f"Too many invalid attempts for input: {prompt}")
 
+def parse_nationality(value):
+    """Nationality as a supported country code ("UK") or its numeric ISO code (826)."""
+    text = str(value).strip().upper()
+    if text in NATIONALITY_CODES:
+        return NATIONALITY_CODES[text]
+    if text.isdigit() and int(text) in NATIONALITY_CODES.values():
+        return int(text)
+    raise ValueError(f"Unsupported nationality {value!r} (supported: {', '.join(NATIONALITY_CODES)})")
+
+def _int_field(record, name, min_value, max_value):
+    try:
+        value = int(str(record[name]).strip())
+    except KeyError:
+        raise ValueError(f"Missing field {name}")
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+    if not min_value <= value <= max_value:
+        raise ValueError(f"{name} must be between {min_value} and {max_value}")
+    return value
+
+def validate_attributes(record, now=None):
+    """
+    Non-interactive counterpart of collect_user_inputs: apply the same rules to one
+    record (a dict of strings or ints, e.g. a JSONL object or CSV row) and return the
+    attributes in signing order. Raises ValueError describing the first problem.
+    """
+    today = current_date(now)
+    birth_year = _int_field(record, "birth_year", MIN_BIRTH_YEAR, today["current_year"])
+    birth_month = _int_field(record, "birth_month", 1, 12)
+    birth_day = _int_field(record, "birth_day", 1, 31)
+    if not validate_date(birth_year, birth_month, birth_day):
+        raise ValueError("Invalid birth date")
+
+    expiry_year = _int_field(record, "expiry_year", today["current_year"], MAX_EXPIRY_YEAR)
+    expiry_month = _int_field(record, "expiry_month", 1, 12)
+    if expiry_year == today["current_year"] and expiry_month < today["current_month"]:
+        raise ValueError("Expiry month cannot be before the current month in the current year")
+
+    if "nationality" not in record:
+        raise ValueError("Missing field nationality")
+    nationality = parse_nationality(record["nationality"])
+
+    return {
+        "birth_year": birth_year,
+        "birth_month": birth_month,
+        "birth_day": birth_day,
+        "expiry_year": expiry_year,
+        "expiry_month": expiry_month,
+        "nationality": nationality,
+        **today,
+    }
+
 def collect_user_inputs(predefined_inputs=None):
 
     # For allowing predefined test inputs.
@@ -66,9 +122,10 @@ def collect_user_inputs(predefined_inputs=None):
     else:
 
         print("=== Enter your ID details ===")
+        today = current_date()
 
         # Full date of birth
-        birth_year = get_int_input("Birth year (e.g. 2003): ", 1900, datetime.now().year)
+        birth_year = get_int_input("Birth year (e.g. 2003): ", MIN_BIRTH_YEAR, today["current_year"])
         birth_month = get_int_input("Birth month (1–12): ", 1, 12)
 
         while True:
@@ -79,10 +136,10 @@ def collect_user_inputs(predefined_inputs=None):
 
 
         # Expiry year and month
-        expiry_year = get_int_input("Document expiry year (e.g. 2030): ", datetime.now().year, 2100)
+        expiry_year = get_int_input("Document expiry year (e.g. 2030): ", today["current_year"], MAX_EXPIRY_YEAR)
         while True:
             expiry_month = get_int_input("Document expiry month (1–12): ", 1, 12)
-            if expiry_year == current_year and expiry_month < current_month:
+            if expiry_year == today["current_year"] and expiry_month < today["current_month"]:
                 print("Expiry month cannot be before the current month in the current year.")
             else:
                 break
@@ -97,7 +154,5 @@ def collect_user_inputs(predefined_inputs=None):
             "expiry_year": expiry_year,
             "expiry_month": expiry_month,
             "nationality": nationality,
-            "current_year": current_year,
-            "current_month": current_month,
-            "current_day": current_day,
+            **today,
         }
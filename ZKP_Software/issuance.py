@@ -0,0 +1,101 @@
+import base64
+import hashlib
+from bbs.create_bbs_proof import create_bbs_selective_proof
+from zk.generate_proof import generate_zk_proof, proof_path, public_path
+from profiling import stage
+
+# Revealed at login; pk_bind and the commitment are what the server binds the session to
+REVEALED_FIELDS = ["expiry_year", "expiry_month", "pk_bind", "commitment"]
+
+
+def b64(b):
+    return base64.b64encode(b).decode()
+
+
+def pseudo_id(pk_bind_bytes):
+    return hashlib.sha256(pk_bind_bytes).hexdigest()[:16]
+
+
+def selective_proof(attributes, signature, keypair, serial, issuer_id, all_keys, pk_bind_bytes, tree=None,
+                    nonce=None):
+    """
+    BBS+ proof revealing REVEALED_FIELDS, over a server-issued `nonce` if given.
+    Returns (bbs_proof, revealed_attrs_bytes, bbs_pub, nonce, leaf_index); leaf_index is None without `tree`.
+    """
+    with stage("create_bbs_selective_proof"):
+        bbs_proof, revealed_attrs_bytes, bbs_pub, nonce, _, _, _, leaf_index = create_bbs_selective_proof(
+            signature=signature,
+            keypair=keypair,
+            attributes=attributes,
+            revealed_fields=list(REVEALED_FIELDS),
+            tree=tree,
+            serial=serial,
+            issuer_id=issuer_id,
+            all_keys=all_keys,
+            pk_bind_bytes=pk_bind_bytes,
+            nonce=nonce
+        )
+    return bbs_proof, revealed_attrs_bytes, bbs_pub, nonce, leaf_index
+
+
+def login_payload(attributes, pk_bind_bytes, bbs_proof, revealed_attrs_bytes, bbs_pub, nonce,
+                  plonk_proof, plonk_public, merkle_root, epoch):
+    """The JSON login payload (without the per-login challenge fields)."""
+    revealed_ordered = [
+        {"name": "expiry_year",  "value": str(attributes["expiry_year"]), "encoding": "utf8"},
+        {"name": "expiry_month", "value": str(attributes["expiry_month"]), "encoding": "utf8"},
+        {"name": "pk_bind",      "value": b64(pk_bind_bytes),             "encoding": "base64"},
+        {"name": "commitment",   "value": b64(revealed_attrs_bytes["commitment"]), "encoding": "base64"},
+    ]
+    return {
+        "bbs_public_key_b64": b64(bbs_pub),
+        "bbs_proof": b64(bbs_proof),
+        "bbs_nonce": b64(nonce),
+        "message_count": len(attributes) + 2,
+        "revealed": revealed_ordered,
+        "plonk_proof": b64(plonk_proof),
+        "plonk_public": b64(plonk_public),
+        "merkle_root_hex": hex(merkle_root)[2:],
+        "epoch": epoch
+    }
+
+
+def prove_credential(attributes, signature, keypair, tree, serial, issuer_id, all_keys,
+                     pk_bind_bytes, valid_signature, epoch):
+    """
+    Selective-disclosure BBS+ proof plus the PLONK eligibility proof for one issued
+    credential, proven against `tree` (which must contain its commitment).
+    The circuit must already be compiled and set up.
+    Returns the JSON login payload (without the per-login challenge fields).
+    """
+    bbs_proof, revealed_attrs_bytes, bbs_pub, nonce, leaf_index = selective_proof(
+        attributes, signature, keypair, serial, issuer_id, all_keys, pk_bind_bytes, tree=tree
+    )
+
+    with stage("generate_zk_proof"):
+        generate_zk_proof(
+            birth_year=attributes["birth_year"],
+            birth_month=attributes["birth_month"],
+            birth_day=attributes["birth_day"],
+            expiry_year=attributes["expiry_year"],
+            expiry_month=attributes["expiry_month"],
+            nationality=attributes["nationality"],
+            current_year=attributes["current_year"],
+            current_month=attributes["current_month"],
+            current_day=attributes["current_day"],
+            valid_signature=valid_signature,
+            serial=serial,
+            issuer_id=issuer_id,
+            merkle_leaves=tree.leaves,
+            leaf_index=leaf_index
+        )
+
+    with open(proof_path, "rb") as f:
+        plonk_proof = f.read()
+    with open(public_path, "rb") as f:
+        plonk_public = f.read()
+
+    return login_payload(
+        attributes, pk_bind_bytes, bbs_proof, revealed_attrs_bytes, bbs_pub, nonce,
+        plonk_proof, plonk_public, tree.get_root(), epoch
+    )
@@ -70,13 +70,30 @@ class MerkleTree:
             cur = nxt
         self.root = self.layers[-1][0]
 
+    def _update_paths(self, indices):
+        """Rehash only the ancestors of the changed leaves (each shared parent once)."""
+        changed = set(indices)
+        for d in range(self.depth):
+            parents = {i >> 1 for i in changed}
+            for p in parents:
+                self.layers[d + 1][p] = poseidon_hash([self.layers[d][2 * p], self.layers[d][2 * p + 1]])
+            changed = parents
+        self.root = self.layers[-1][0]
+
     def insert_at(self, index: int, leaf_value):
         self.leaves[index] = _to_field(leaf_value)
-        self._build_tree()
+        self.layers[0][index] = self.leaves[index]
+        self._update_paths([index])
 
     def remove_at(self, index: int):
-        self.leaves[index] = EMPTY
-        self._build_tree()
+        self.remove_many([index])
+
+    def remove_many(self, indices: List[int]):
+        """Revoke several leaves with one batched update (one new root)."""
+        for index in indices:
+            self.leaves[index] = EMPTY
+            self.layers[0][index] = EMPTY
+        self._update_paths(indices)
 
     def get_root(self) -> int:
         return self.root
@@ -0,0 +1,175 @@
+"""
+Opt-in stage profiling for the issuance/proving pipeline.
+
+    ZKP_PROFILE=out/profile.json python3 main.py
+    python cli.py issue records.jsonl --out creds.jsonl --profile out/profile.json
+
+Every `stage(name)` records wall time, CPU time of this process, CPU time of
+the child processes it ran (circom, node, snarkjs), and peak RSS of this
+process and of the largest child. The result is written as a Chrome trace
+(load it in chrome://tracing or https://ui.perfetto.dev) and summarised per
+stage on stderr. While profiling is off, `stage` only does a flag check.
+
+External tools should be started with `run()`, which works like
+`subprocess.run(check=True)`. It reaps the child with wait4, so the child's
+own peak RSS is known.
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows: wall time only
+    resource = None
+
+# ru_maxrss is kilobytes on Linux, bytes on macOS
+_RSS_UNIT = 1 if sys.platform == "darwin" else 1024
+
+
+def _children_cpu():
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _peak_rss():
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _RSS_UNIT
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        self.events = []
+        self._open = []  # stack of events for stages still running
+        self._origin = time.perf_counter()
+
+    def enable(self):
+        self.enabled = True
+        self.events = []
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        event = {"name": name, "child_peak_rss": 0}
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        start_children = _children_cpu()
+        self._open.append(event)
+        try:
+            yield
+        finally:
+            self._open.pop()
+            event["start"] = start_wall - self._origin
+            event["wall"] = time.perf_counter() - start_wall
+            event["cpu"] = time.process_time() - start_cpu
+            event["children_cpu"] = _children_cpu() - start_children
+            event["peak_rss"] = _peak_rss()
+            event["depth"] = len(self._open)
+            for outer in self._open:
+                outer["child_peak_rss"] = max(outer["child_peak_rss"], event["child_peak_rss"])
+            self.events.append(event)
+
+    def _record_child(self, rss):
+        for event in self._open:
+            event["child_peak_rss"] = max(event["child_peak_rss"], rss)
+
+    def chrome_trace(self):
+        pid = os.getpid()
+        tid = threading.get_ident()
+        return {
+            "traceEvents": [
+                {
+                    "name": e["name"], "ph": "X", "pid": pid, "tid": tid,
+                    "ts": round(e["start"] * 1e6), "dur": round(e["wall"] * 1e6),
+                    "args": {
+                        "cpu_s": round(e["cpu"], 6),
+                        "children_cpu_s": round(e["children_cpu"], 6),
+                        "peak_rss_mb": round(e["peak_rss"] / 2**20, 1),
+                        "child_peak_rss_mb": round(e["child_peak_rss"] / 2**20, 1),
+                    },
+                }
+                for e in self.events
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def summary(self):
+        """Per-stage totals, outermost stages first, in first-seen order."""
+        rows = {}
+        for e in sorted(self.events, key=lambda e: e["start"]):
+            row = rows.setdefault(e["name"], {
+                "stage": e["name"], "depth": e["depth"], "count": 0, "wall": 0.0, "cpu": 0.0,
+                "children_cpu": 0.0, "peak_rss": 0, "child_peak_rss": 0,
+            })
+            row["count"] += 1
+            row["wall"] += e["wall"]
+            row["cpu"] += e["cpu"]
+            row["children_cpu"] += e["children_cpu"]
+            row["peak_rss"] = max(row["peak_rss"], e["peak_rss"])
+            row["child_peak_rss"] = max(row["child_peak_rss"], e["child_peak_rss"])
+        return list(rows.values())
+
+    def format_summary(self):
+        total = sum(e["wall"] for e in self.events if e["depth"] == 0) or 1.0
+        header = f"{'stage':<34}{'n':>4}{'wall s':>10}{'%':>7}{'cpu s':>9}{'child cpu s':>13}{'rss MB':>9}{'child MB':>10}"
+        lines = [header, "-" * len(header)]
+        for row in self.summary():
+            name = "  " * row["depth"] + row["stage"]
+            lines.append(
+                f"{name:<34}{row['count']:>4}{row['wall']:>10.3f}{100 * row['wall'] / total:>6.1f}%"
+                f"{row['cpu']:>9.3f}{row['children_cpu']:>13.3f}"
+                f"{row['peak_rss'] / 2**20:>9.1f}{row['child_peak_rss'] / 2**20:>10.1f}"
+            )
+        return "\n".join(lines)
+
+    def write(self, path):
+        """Write the Chrome trace to `path` and print the summary table to stderr."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+        print(self.format_summary(), file=sys.stderr)
+        print(f"[Profile] Trace written to {path}", file=sys.stderr)
+
+
+# Global instance used by the pipeline modules
+profiler = Profiler()
+stage = profiler.stage
+
+
+def run(args, **kwargs):
+    """subprocess.run(args, check=True), recording the child's peak RSS while profiling."""
+    if not profiler.enabled or not hasattr(os, "wait4"):
+        return subprocess.run(args, check=True, **kwargs)
+    proc = subprocess.Popen(args, **kwargs)
+    try:
+        _, status, usage = os.wait4(proc.pid, 0)
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        raise
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    profiler._record_child(usage.ru_maxrss * _RSS_UNIT)
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, args)
+    return subprocess.CompletedProcess(args, proc.returncode)
+
+
+def enable_from_env():
+    """Turn profiling on if ZKP_PROFILE names an output path; returns that path (or None)."""
+    path = os.environ.get("ZKP_PROFILE")
+    if path:
+        profiler.enable()
+    return path
@@ -0,0 +1,883 @@
+#!/usr/bin/env python3
+"""
+Local proving service: a long-running counterpart of main.py for credential holders.
+
+    python service.py                                   # http://127.0.0.1:8100
+    python service.py --unix-socket /run/user/1000/zkp.sock
+    python service.py --registry http://127.0.0.1:8000 --admin-token "$ADMIN_TOKEN"
+
+main.py pays for everything on every run: a new issuer key, the BBS+ library,
+circom/snarkjs start-up and the witness and proving key read from disk. This
+process does that once. It keeps one issuer key and the circuit set up, and
+runs --provers `node zk/prover_worker.js` processes holding the wasm and the
+proving key in memory, so a login proof is one BBS+ proof plus one warm PLONK
+proof.
+
+Endpoints (JSON in and out):
+
+    POST /credentials               {"birth_year": 2000, ..., "nationality": "UK"}
+        Issue a credential (same rules as cli.py). 201 with its credential_id,
+        leaf_index, current root and the holder secret.
+    POST /credentials/{id}/path     Refresh the credential's Merkle path to the current root.
+    POST /credentials/{id}/proofs   {"challenge_id": ..., "challenge": base64}  (both optional)
+        Queue a login proof. 202 with a job_id; 503 with Retry-After when the queue is full.
+    GET  /jobs/{id}                 queued | running | done (with "result") | failed (with "error")
+    GET  /health                    queue depth, prover count, credentials held
+
+A finished job's result is {"payload": ..., "compact_record_b64": ...}. With a
+challenge the payload also carries challenge_id and challenge_signature and is
+a complete JSON login body (login_body_b64 is the compact one), so the login
+page can POST it as is.
+
+Without --registry the service keeps its own depth-DEPTH tree of the
+commitments it issued and bumps the epoch on every issuance. With --registry
+each commitment is registered with the platform (POST /admin/registry/commitments,
+which needs the admin token and a loopback address) and paths are refreshed
+from its GET /registry/path endpoint, sending only the siblings that changed.
+
+With --registry the platform also issues the BBS+ proof nonces (against a
+challenge signed with the binding key, see require_bound_nonce in its config). A background thread keeps
+--proof-pool-size BBS+ proofs per credential computed over such nonces and
+refills once fewer than --proof-pool-refill are left, so a login only waits
+for the PLONK proof. Without --registry each login's BBS+ proof uses a random
+nonce, as main.py does.
+
+All state is in memory: like main.py, a restart means a new issuer key, so
+credentials issued before it can no longer be proven here. Listen on loopback
+or a Unix socket only: the responses contain holder secrets.
+"""
+import argparse
+import base64
+import itertools
+import json
+import os
+import queue
+import re
+import select
+import socketserver
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ZKP_DIR = os.path.dirname(os.path.abspath(__file__))
+PROVER_SCRIPT = os.path.join(ZKP_DIR, "zk", "prover_worker.js")
+MAX_BODY_BYTES = 64 * 1024
+NONCE_BATCH_MAX = 32  # the platform's default bound_nonce_batch_max
+MAX_RESTART_BACKOFF = 300.0  # longest wait between restarts of a prover that keeps failing
+
+
+class ServiceError(Exception):
+    """An error reported to the client as {"error": message} with `status`."""
+
+    def __init__(self, message, status=400, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class ProverError(Exception):
+    """Raised when a prover process dies, times out or fails to prove."""
+
+
+def _stringify(value):
+    """Circuit input with every integer as a decimal string (field elements overflow JS numbers)."""
+    if isinstance(value, list):
+        return [_stringify(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _stringify(v) for k, v in value.items()}
+    return str(value)
+
+
+class ProverProcess:
+    """One long-lived `node zk/prover_worker.js` with the wasm and proving key loaded."""
+
+    def __init__(self, index, wasm_path, zkey_path, node_binary="node", start_timeout=60.0):
+        self.index = index
+        self.args = [node_binary, PROVER_SCRIPT, wasm_path, zkey_path]
+        self.start_timeout = start_timeout
+        self.proc = None
+        self._ids = itertools.count(1)
+        self.failures = 0  # consecutive failures, for the restart backoff
+        self.retry_at = 0.0  # monotonic time of the next restart while out of rotation
+
+    @property
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def start(self):
+        self.proc = subprocess.Popen(
+            self.args, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, bufsize=1,
+        )
+        # The worker prints a ready line once snarkjs, the circuit and the curve are loaded
+        if not self._read(self.start_timeout).get("ready"):
+            raise ProverError(f"prover {self.index} did not report ready")
+
+    def _read(self, timeout):
+        # One request in flight, so the pipe never holds more than the line we wait for
+        readable, _, _ = select.select([self.proc.stdout], [], [], timeout)
+        if not readable:
+            raise ProverError(f"prover {self.index} timed out")
+        line = self.proc.stdout.readline()
+        if not line:
+            raise ProverError(f"prover {self.index} exited")
+        try:
+            return json.loads(line)
+        except ValueError:
+            raise ProverError(f"prover {self.index} sent malformed output")
+
+    def prove(self, inputs, timeout):
+        """(proof, public signals) for one circuit input."""
+        if not self.alive:
+            raise ProverError(f"prover {self.index} is not running")
+        message = {"id": next(self._ids), "op": "prove", "input": _stringify(inputs)}
+        try:
+            self.proc.stdin.write(json.dumps(message) + "\n")
+            self.proc.stdin.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            raise ProverError(f"prover {self.index} pipe closed")
+        reply = self._read(timeout)
+        if reply.get("id") != message["id"]:
+            raise ProverError(f"prover {self.index} answered out of order")
+        if not reply.get("ok"):
+            # The worker is fine, the input was not (e.g. a constraint failed)
+            raise RuntimeError(f"Proof failed: {reply.get('error', 'unknown error')}")
+        return reply["proof"], reply["public"]
+
+    def stop(self):
+        if not self.alive:
+            return
+        self.proc.stdin.close()
+        try:
+            self.proc.wait(2)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+
+
+class ProverPool:
+    """
+    Warm provers handed out one proof at a time. A prover that fails is taken
+    out of rotation and restarted by a background thread with exponential
+    backoff, so no proof waits on a restart. While none is in rotation, proofs
+    go through the CLI pipeline instead.
+    """
+
+    def __init__(self, size, wasm_path, zkey_path, node_binary="node", timeout=120.0, health_interval=15.0):
+        self.timeout = timeout
+        self.health_interval = health_interval
+        self.provers = [ProverProcess(i, wasm_path, zkey_path, node_binary) for i in range(size)]
+        self._idle = queue.Queue()  # None wakes a waiter to use the CLI
+        self._failed = []
+        self._waiting = 0
+        self._lock = threading.Lock()
+        self._cli = CliProver()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._restart_failed, name="prover-restarts", daemon=True)
+
+    def start(self):
+        for prover in self.provers:
+            prover.start()
+            self._idle.put(prover)
+        self._thread.start()
+
+    def _retire(self, prover):
+        prover.stop()
+        with self._lock:
+            prover.retry_at = time.monotonic() + min(self.health_interval * 2 ** prover.failures, MAX_RESTART_BACKOFF)
+            prover.failures += 1
+            self._failed.append(prover)
+            if len(self._failed) == len(self.provers):
+                # Nothing comes back to the queue before the next restart: let waiters use the CLI
+                for _ in range(self._waiting):
+                    self._idle.put(None)
+
+    def _restart_failed(self):
+        while not self._stopped.wait(self.health_interval):
+            now = time.monotonic()
+            with self._lock:
+                due = [p for p in self._failed if p.retry_at <= now]
+                for prover in due:
+                    self._failed.remove(prover)
+            for prover in due:
+                try:
+                    prover.start()
+                except (OSError, ProverError) as e:
+                    print(f"[Service] Could not restart prover {prover.index}: {e}", file=sys.stderr)
+                    self._retire(prover)
+                    continue
+                prover.failures = 0
+                self._idle.put(prover)
+
+    def prove(self, inputs):
+        with self._lock:
+            in_rotation = len(self._failed) < len(self.provers)
+            self._waiting += in_rotation
+        if not in_rotation:
+            return self._cli.prove(inputs)
+        try:
+            prover = self._idle.get()
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        if prover is None:
+            return self._cli.prove(inputs)
+        try:
+            result = prover.prove(inputs, self.timeout)
+        except (OSError, ProverError) as e:
+            print(f"[Service] Prover {prover.index} failed, proving through the CLI: {e}", file=sys.stderr)
+            self._retire(prover)
+            return self._cli.prove(inputs)
+        except Exception:
+            self._idle.put(prover)  # the input failed, not the prover
+            raise
+        self._idle.put(prover)
+        return result
+
+    def stop(self):
+        self._stopped.set()
+        for prover in self.provers:
+            prover.stop()
+
+
+class CliProver:
+    """The generate_witness.js + `snarkjs plonk prove` pipeline, one proof at a time (no warm state)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.provers = []
+
+    def prove(self, inputs):
+        from profiling import run
+        from utils import write_json
+        from zk.generate_proof import (
+            circom_folder, circuit_name, input_json, proof_path, public_path, wasm_path, witness_path,
+            zkey_path,
+        )
+        with self._lock:  # the pipeline works through fixed file names
+            write_json(input_json, inputs)
+            run(["node", f"{circom_folder}/{circuit_name}_js/generate_witness.js",
+                 wasm_path, input_json, witness_path], stdout=subprocess.DEVNULL)
+            run(["snarkjs", "plonk", "prove", zkey_path, witness_path, proof_path, public_path],
+                stdout=subprocess.DEVNULL)
+            with open(proof_path) as f:
+                proof = json.load(f)
+            with open(public_path) as f:
+                public = json.load(f)
+        return proof, public
+
+    def stop(self):
+        pass
+
+
+class LocalRegistry:
+    """The service's own tree over the commitments it issued."""
+
+    def __init__(self):
+        from merkle import DEPTH, MerkleTree
+        self.tree = MerkleTree([], depth=DEPTH)
+        self.next_index = 0
+        self.epoch = 0
+        self._lock = threading.Lock()
+
+    def add(self, commitment):
+        with self._lock:
+            if self.next_index >= self.tree.size:
+                raise ServiceError(f"Tree is full ({self.tree.size} credentials)", 409)
+            leaf_index = self.next_index
+            self.tree.insert_at(leaf_index, commitment)
+            self.next_index += 1
+            self.epoch += 1
+            return leaf_index
+
+    def path(self, leaf_index, since=None):
+        """Full path in the shape of the platform's /registry/path response (`since` is ignored)."""
+        with self._lock:
+            path_elements, path_indices = self.tree.get_proof(leaf_index)
+            epoch, root = self.epoch, self.tree.get_root()
+        return {
+            "epoch": epoch,
+            "root_hex": hex(root)[2:],
+            "leaf_index": leaf_index,
+            "since": 0,
+            "path_indices": path_indices,
+            "siblings": {str(level): str(e) for level, e in enumerate(path_elements)},
+        }
+
+
+class RemoteRegistry:
+    """The platform's commitment registry (see Therapy_platform/app/routers/registry.py)."""
+
+    def __init__(self, url, admin_token, timeout=10.0):
+        import requests
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.admin_headers = {"Authorization": f"Bearer {admin_token}"} if admin_token else {}
+
+    def _json(self, response):
+        if response.status_code == 404 and not response.content.startswith(b"{"):
+            raise ServiceError("Registry endpoint not found (is the admin token set?)", 502)
+        if response.status_code >= 400:
+            raise ServiceError(f"Registry answered {response.status_code}: {response.text[:200]}", 502)
+        return response.json()
+
+    def _request(self, method, path, **kwargs):
+        import requests
+        try:
+            response = self.session.request(method, f"{self.url}{path}", timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            raise ServiceError(f"Registry unreachable: {e}", 502)
+        return self._json(response)
+
+    def add(self, commitment):
+        return self._request(
+            "POST", "/admin/registry/commitments", json={"commitment": hex(commitment)}, headers=self.admin_headers
+        )["leaf_index"]
+
+    def path(self, leaf_index, since=None):
+        return self._request("GET", f"/registry/path/{leaf_index}", params={"since": since} if since else None)
+
+    def nonces(self, signing_key, pk_bind_bytes, count):
+        """
+        (nonces, seconds they stay valid): BBS+ proof nonces for a binding key. The platform
+        only issues them against a challenge signed with that key, as for a login.
+        """
+        pk_bind_key = base64.b64encode(pk_bind_bytes).decode()
+        challenge = self._request("POST", "/auth/challenge", json={"pk_bind_key": pk_bind_key})
+        signature = signing_key.sign(base64.b64decode(challenge["challenge"])).signature
+        body = self._request("POST", "/auth/nonces", json={
+            "pk_bind_key": pk_bind_key, "challenge_id": challenge["challenge_id"],
+            "challenge_signature": base64.b64encode(signature).decode(), "nonces": count,
+        })
+        return [base64.b64decode(n) for n in body["nonces"]], body["nonce_ttl"]
+
+
+class BbsProofPool:
+    """
+    BBS+ proofs computed ahead of login, each over a nonce the platform issued
+    for that credential. A background thread tops a credential's pool back up
+    to `size` once fewer than `refill_below` are left; a login spends one, so
+    the BBS+ proof is off the interactive path and no nonce is used twice.
+    Proofs are dropped `margin` seconds before their nonce expires.
+    """
+
+    def __init__(self, service, size, refill_below, margin=60.0, interval=30.0):
+        self.service = service
+        self.size = size
+        self.refill_below = refill_below
+        self.margin = margin
+        self.interval = interval
+        self._pools = {}  # credential_id -> deque of (deadline, bbs proof tuple)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="bbs-proof-pool", daemon=True)
+        self._thread.start()
+
+    @property
+    def ready(self):
+        with self._lock:
+            return sum(len(pool) for pool in self._pools.values())
+
+    def take(self, credential_id):
+        """A precomputed proof for the credential, or None if its pool is empty."""
+        now = time.monotonic()
+        with self._lock:
+            pool = self._pools.setdefault(credential_id, deque())
+            while pool and pool[0][0] <= now:
+                pool.popleft()
+            entry = pool.popleft() if pool else None
+            low = len(pool) < self.refill_below
+        if low:
+            self._wake.set()
+        return entry[1] if entry else None
+
+    def _refill(self, credential):
+        with self._lock:
+            pool = self._pools.setdefault(credential.credential_id, deque())
+            now = time.monotonic()
+            while pool and pool[0][0] <= now:
+                pool.popleft()
+            if len(pool) >= self.refill_below:
+                return
+            missing = min(self.size - len(pool), NONCE_BATCH_MAX)
+        nonces, ttl = self.service.registry.nonces(credential.signing_key, credential.pk_bind_bytes, missing)
+        deadline = time.monotonic() + ttl - self.margin
+        for nonce in nonces:
+            proof = self.service.bbs_proof(credential, nonce)
+            with self._lock:
+                self._pools[credential.credential_id].append((deadline, proof))
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            for credential in list(self.service.credentials.values()):
+                if self._stopped:
+                    return
+                try:
+                    self._refill(credential)
+                except Exception as e:
+                    # One credential's failure (e.g. revoked) must not starve the others
+                    print(f"[Service] BBS+ proof pool refill failed for {credential.credential_id}: {e}",
+                          file=sys.stderr)
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stopped = True
+        self._wake.set()
+
+
+class HeldCredential:
+    """An issued credential and the Merkle path it was last proven against."""
+
+    def __init__(self, credential_id, attributes, signature, all_keys, serial, issuer_id,
+                 signing_key, pk_bind_bytes, leaf_index):
+        self.credential_id = credential_id
+        self.attributes = attributes
+        self.signature = signature
+        self.all_keys = all_keys
+        self.serial = serial
+        self.issuer_id = issuer_id
+        self.signing_key = signing_key
+        self.pk_bind_bytes = pk_bind_bytes
+        self.leaf_index = leaf_index
+        self.epoch = 0
+        self.root = None
+        self.path_elements = None
+        self.path_indices = None
+
+    def apply_path(self, delta):
+        """Merge a registry path response; returns True if the root changed."""
+        from merkle import DEPTH
+        if len(delta["path_indices"]) != DEPTH:
+            raise ServiceError(f"Registry tree depth {len(delta['path_indices'])} does not match the circuit ({DEPTH})", 502)
+        if self.path_elements is not None and delta["epoch"] < self.epoch:
+            return False  # fetched concurrently with a newer path that was applied first
+        if delta["since"] == 0 or self.path_elements is None:
+            self.path_elements = [0] * DEPTH
+        for level, sibling in delta["siblings"].items():
+            self.path_elements[int(level)] = int(sibling)
+        self.path_indices = delta["path_indices"]
+        root = int(delta["root_hex"], 16)
+        changed = root != self.root
+        self.root = root
+        self.epoch = delta["epoch"]
+        return changed
+
+    def path_view(self, changed=None):
+        view = {"credential_id": self.credential_id, "leaf_index": self.leaf_index,
+                "root_hex": hex(self.root)[2:], "epoch": self.epoch}
+        if changed is not None:
+            view["changed"] = changed
+        return view
+
+
+class Job:
+    def __init__(self, fn, args):
+        self.job_id = uuid.uuid4().hex
+        self.fn = fn
+        self.args = args
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+
+    def view(self):
+        view = {"job_id": self.job_id, "status": self.status}
+        if self.status == "done":
+            view["result"] = self.result
+            view["seconds"] = round(self.finished - self.created, 3)
+        elif self.status == "failed":
+            view["error"] = self.error
+        return view
+
+
+class JobQueue:
+    """
+    Bounded FIFO of proof jobs run by `workers` threads. submit() fails fast when
+    `maxsize` jobs are already waiting instead of queueing unbounded work.
+    The last `keep` jobs stay pollable; older finished ones are forgotten.
+    """
+
+    def __init__(self, maxsize, workers, keep=1000):
+        self._queue = queue.Queue(maxsize)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self.keep = keep
+        self.workers = workers
+        self.running = 0
+        self._threads = [threading.Thread(target=self._run, name=f"proof-job-{i}", daemon=True)
+                         for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    @property
+    def depth(self):
+        return self._queue.qsize()
+
+    def submit(self, fn, *args):
+        job = Job(fn, args)
+        with self._lock:
+            self._queue.put_nowait(job)  # raises queue.Full
+            self._jobs[job.job_id] = job
+            while len(self._jobs) > self.keep:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.status in ("queued", "running"):
+                    break
+                self._jobs.popitem(last=False)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            job.status = "running"
+            with self._lock:
+                self.running += 1
+            try:
+                job.result = job.fn(*job.args)
+                job.status = "done"
+            except Exception as e:
+                job.error = str(e)
+                job.status = "failed"
+            finally:
+                job.finished = time.time()
+                with self._lock:
+                    self.running -= 1
+
+    def stop(self):
+        for _ in self._threads:
+            self._queue.put(None)
+
+
+class ProvingService:
+    def __init__(self, registry, prover, jobs, issuer_id=42):
+        from ursa_bbs_signatures import BlsKeyPair
+        self.registry = registry
+        self.prover = prover
+        self.jobs = jobs
+        self.issuer_id = issuer_id
+        self.keypair = BlsKeyPair.generate_g2()
+        self.credentials = {}
+        self.proof_pool = None  # BbsProofPool, with a platform to issue nonces
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def _credential(self, credential_id):
+        credential = self.credentials.get(credential_id)
+        if credential is None:
+            raise ServiceError("Unknown credential", 404)
+        return credential
+
+    def issue(self, record):
+        from bbs.sign import issue_credentials
+        from get_inputs import validate_attributes
+        from issuance import b64, pseudo_id
+        from merkle import poseidon_hash_two
+
+        try:
+            attributes = validate_attributes(record)
+        except ValueError as e:
+            raise ServiceError(str(e), 422)
+        signature, _, _, serial, issuer_id, all_keys, signing_key, pk_bind_bytes = issue_credentials(
+            attributes, self.issuer_id, keypair=self.keypair
+        )
+        # Registry calls may go over the network: only the credential updates hold the lock
+        leaf_index = self.registry.add(poseidon_hash_two(serial, issuer_id))
+        delta = self.registry.path(leaf_index)
+        credential = HeldCredential(
+            uuid.uuid4().hex, attributes, signature, all_keys, serial, issuer_id,
+            signing_key, pk_bind_bytes, leaf_index,
+        )
+        with self._lock:
+            credential.apply_path(delta)
+            self.credentials[credential.credential_id] = credential
+        if self.proof_pool is not None:
+            self.proof_pool.wake()
+        view = credential.path_view()
+        view.update({
+            "pseudo_id": pseudo_id(pk_bind_bytes),
+            "holder_secret": {
+                "signing_key_b64": b64(signing_key.encode()),
+                "serial": str(serial),
+                "issuer_id": issuer_id,
+                "leaf_index": leaf_index,
+            },
+        })
+        return view
+
+    def refresh_path(self, credential_id):
+        credential = self._credential(credential_id)
+        with self._lock:
+            since = credential.epoch if credential.path_elements is not None else None
+        delta = self.registry.path(credential.leaf_index, since)
+        with self._lock:
+            changed = credential.apply_path(delta)
+            return credential.path_view(changed)
+
+    def submit_proof(self, credential_id, challenge_id=None, challenge_b64=None):
+        credential = self._credential(credential_id)
+        challenge = None
+        if challenge_id is not None or challenge_b64 is not None:
+            try:
+                challenge = (str(uuid.UUID(challenge_id)), base64.b64decode(challenge_b64, validate=True))
+            except (TypeError, ValueError):
+                raise ServiceError("challenge_id must be a UUID and challenge base64, given together")
+        try:
+            return self.jobs.submit(self.prove, credential, challenge)
+        except queue.Full:
+            raise ServiceError("Proof queue is full, retry shortly", 503, {"Retry-After": "1"})
+
+    def bbs_proof(self, credential, nonce=None):
+        """(bbs_proof, revealed_attrs_bytes, bbs_pub, nonce) for one login."""
+        from issuance import selective_proof
+        bbs_proof, revealed_attrs_bytes, bbs_pub, nonce, _ = selective_proof(
+            credential.attributes, credential.signature, self.keypair, credential.serial, credential.issuer_id,
+            credential.all_keys, credential.pk_bind_bytes, nonce=nonce,
+        )
+        return bbs_proof, revealed_attrs_bytes, bbs_pub, nonce
+
+    def prove(self, credential, challenge=None):
+        """Login payload for `credential` against the current root (runs on a job thread)."""
+        from compact_payload import encode_credential_record, with_challenge
+        from get_inputs import current_date
+        from issuance import b64, login_payload
+        from zk.generate_proof import build_circuit_input
+
+        with self._lock:
+            since = credential.epoch
+        delta = self.registry.path(credential.leaf_index, since)
+        with self._lock:
+            credential.apply_path(delta)
+            root, epoch = credential.root, credential.epoch
+            path_elements, path_indices = list(credential.path_elements), list(credential.path_indices)
+
+        attributes = credential.attributes
+        bbs = self.proof_pool.take(credential.credential_id) if self.proof_pool is not None else None
+        precomputed = bbs is not None
+        if bbs is None:
+            # Pool empty (or no platform): prove now, still over an issued nonce when there is a platform
+            nonce = None
+            if isinstance(self.registry, RemoteRegistry):
+                nonces, _ = self.registry.nonces(credential.signing_key, credential.pk_bind_bytes, 1)
+                nonce = nonces[0] if nonces else None
+            bbs = self.bbs_proof(credential, nonce)
+        bbs_proof, revealed_attrs_bytes, bbs_pub, nonce = bbs
+        # The circuit checks eligibility as of today, not the day the credential was issued
+        today = current_date()
+        inputs = build_circuit_input(
+            attributes["birth_year"], attributes["birth_month"], attributes["birth_day"],
+            attributes["expiry_year"], attributes["expiry_month"], attributes["nationality"],
+            today["current_year"], today["current_month"], today["current_day"],
+            1, credential.serial, credential.issuer_id, root, path_elements, path_indices,
+        )
+        proof, public = self.prover.prove(inputs)
+
+        payload = login_payload(
+            attributes, credential.pk_bind_bytes, bbs_proof, revealed_attrs_bytes, bbs_pub, nonce,
+            json.dumps(proof).encode(), json.dumps(public).encode(), root, epoch,
+        )
+        record = encode_credential_record(payload)
+        result = {
+            "credential_id": credential.credential_id, "payload": payload, "compact_record_b64": b64(record),
+            "bbs_precomputed": precomputed,
+        }
+        if challenge is not None:
+            challenge_id, challenge_bytes = challenge
+            signature = credential.signing_key.sign(challenge_bytes).signature
+            payload["challenge_id"] = challenge_id
+            payload["challenge_signature"] = b64(signature)
+            result["login_body_b64"] = b64(with_challenge(record, challenge_id, signature))
+        return result
+
+    def health(self):
+        return {
+            "status": "ok",
+            "uptime_seconds": round(time.time() - self.started),
+            "credentials": len(self.credentials),
+            "prover": "warm" if self.prover.provers else "cli",
+            "provers_alive": sum(1 for p in self.prover.provers if p.alive),
+            "queue_depth": self.jobs.depth,
+            "jobs_running": self.jobs.running,
+            "bbs_proofs_ready": self.proof_pool.ready if self.proof_pool is not None else 0,
+        }
+
+
+class Handler(BaseHTTPRequestHandler):
+    service = None  # set by serve()
+    routes = [
+        ("POST", re.compile(r"^/credentials$"), "issue"),
+        ("POST", re.compile(r"^/credentials/([0-9a-f]{32})/path$"), "path"),
+        ("POST", re.compile(r"^/credentials/([0-9a-f]{32})/proofs$"), "proofs"),
+        ("GET", re.compile(r"^/jobs/([0-9a-f]{32})$"), "job"),
+        ("GET", re.compile(r"^/health$"), "health"),
+    ]
+
+    def address_string(self):
+        # Unix socket peers have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def _send(self, status, body, headers=None):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "no-store")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise ServiceError("Request body too large", 413)
+        if not length:
+            return {}
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError:
+            raise ServiceError("Invalid JSON")
+        if not isinstance(body, dict):
+            raise ServiceError("Expected a JSON object")
+        return body
+
+    def _dispatch(self, method):
+        path = self.path.split("?", 1)[0]
+        try:
+            for route_method, pattern, name in self.routes:
+                match = pattern.match(path)
+                if match and route_method == method:
+                    return getattr(self, f"_{name}")(*match.groups())
+            raise ServiceError("Not found", 404)
+        except ServiceError as e:
+            self._send(e.status, {"error": str(e)}, e.headers)
+        except Exception as e:
+            self._send(500, {"error": f"Internal error: {e}"})
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def _issue(self):
+        self._send(201, self.service.issue(self._body()))
+
+    def _path(self, credential_id):
+        self._send(200, self.service.refresh_path(credential_id))
+
+    def _proofs(self, credential_id):
+        body = self._body()
+        job = self.service.submit_proof(credential_id, body.get("challenge_id"), body.get("challenge"))
+        view = job.view()
+        view["status_url"] = f"/jobs/{job.job_id}"
+        self._send(202, view, {"Location": view["status_url"]})
+
+    def _job(self, job_id):
+        job = self.service.jobs.get(job_id)
+        if job is None:
+            raise ServiceError("Unknown or expired job", 404)
+        self._send(200, job.view())
+
+    def _health(self):
+        self._send(200, self.service.health())
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(service, host="127.0.0.1", port=8100, unix_socket=None):
+    Handler.service = service
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.unlink(unix_socket)
+        server = UnixHTTPServer(unix_socket, Handler)
+        os.chmod(unix_socket, 0o600)
+        where = unix_socket
+    else:
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        where = f"http://{host}:{server.server_address[1]}"
+    print(f"[Service] Listening on {where}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if unix_socket and os.path.exists(unix_socket):
+            os.unlink(unix_socket)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local credential proving service")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: loopback)")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--unix-socket", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--provers", type=int, default=2, help="warm PLONK prover processes")
+    parser.add_argument("--queue-size", type=int, default=32, help="proof jobs allowed to wait before 503")
+    parser.add_argument("--node", default="node", help="node binary for the provers")
+    parser.add_argument("--issuer-id", type=int, default=42)
+    parser.add_argument("--registry", metavar="URL", help="platform base URL to register commitments with")
+    parser.add_argument("--admin-token", default=os.environ.get("ADMIN_TOKEN"),
+                        help="platform admin token for --registry (default: $ADMIN_TOKEN)")
+    parser.add_argument("--proof-pool-size", type=int, default=8,
+                        help="BBS+ proofs kept ready per credential over platform-issued nonces (0 disables)")
+    parser.add_argument("--proof-pool-refill", type=int, default=3,
+                        help="refill a credential's BBS+ proof pool once fewer than this are left")
+    args = parser.parse_args(argv)
+
+    # The ZKP pipeline uses paths relative to its own directory
+    os.chdir(ZKP_DIR)
+    sys.path.insert(0, ZKP_DIR)
+    from zk.generate_proof import compile_circuit, wasm_path, zkey_path
+    from zk.trusted_setup import trusted_setup
+
+    os.makedirs("out", exist_ok=True)
+    compile_circuit()
+    trusted_setup()
+
+    prover = ProverPool(args.provers, wasm_path, zkey_path, args.node)
+    try:
+        prover.start()
+    except (OSError, ProverError) as e:
+        # e.g. the snarkjs module cannot be found (locally or globally): prove through the CLI instead
+        print(f"[Service] Warm provers unavailable ({e}); using the snarkjs CLI", file=sys.stderr)
+        prover.stop()
+        prover = CliProver()
+    workers = max(1, len(prover.provers))
+
+    registry = RemoteRegistry(args.registry, args.admin_token) if args.registry else LocalRegistry()
+    jobs = JobQueue(args.queue_size, workers)
+    service = ProvingService(registry, prover, jobs, args.issuer_id)
+    if args.registry and args.proof_pool_size > 0:
+        refill_below = max(1, min(args.proof_pool_refill, args.proof_pool_size))
+        service.proof_pool = BbsProofPool(service, args.proof_pool_size, refill_below)
+    try:
+        serve(service, args.host, args.port, args.unix_socket)
+    finally:
+        if service.proof_pool is not None:
+            service.proof_pool.stop()
+        jobs.stop()
+        prover.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+import base64
+import json
+import struct
+import uuid
+
+import pytest
+
+from compact_payload import (
+    MAGIC, PLONK_EVALUATIONS, PLONK_POINTS, VERSION, encode_credential_record, encode_plonk_proof, with_challenge
+)
+
+PLONK_PROOF_BYTES = len(PLONK_POINTS) * 64 + len(PLONK_EVALUATIONS) * 32
+
+
+def b64(data: bytes) -> str:
+    return base64.b64encode(data).decode()
+
+
+def plonk_proof():
+    proof = {name: [str(2 * i + 1), str(2 * i + 2), "1"] for i, name in enumerate(PLONK_POINTS)}
+    proof.update({name: str(100 + i) for i, name in enumerate(PLONK_EVALUATIONS)})
+    proof.update({"protocol": "plonk", "curve": "bn128"})
+    return proof
+
+
+def payload():
+    return {
+        "bbs_public_key_b64": b64(b"pub"),
+        "bbs_proof": b64(b"proof"),
+        "bbs_nonce": b64(b"\x01" * 16),
+        "message_count": 9,
+        "revealed": [
+            {"name": "expiry_year", "value": "2030", "encoding": "utf8"},
+            {"name": "pk_bind", "value": b64(b"\x02" * 32), "encoding": "base64"},
+        ],
+        "plonk_proof": b64(json.dumps(plonk_proof()).encode()),
+        "plonk_public": b64(json.dumps([str(n) for n in range(10)]).encode()),
+        "merkle_root_hex": "abc",
+        "epoch": 7,
+    }
+
+
+def test_record_layout():
+    record = encode_credential_record(payload())
+    assert struct.unpack_from(">3sBIB", record) == (MAGIC, VERSION, 7, 9)
+    pos = 9
+    assert int.from_bytes(record[pos:pos + 32], "big") == 0xABC
+    pos += 32
+    for expected in (b"pub", b"proof"):
+        (length,) = struct.unpack_from(">H", record, pos)
+        assert record[pos + 2:pos + 2 + length] == expected
+        pos += 2 + length
+    assert record[pos] == 16 and record[pos + 1:pos + 17] == b"\x01" * 16
+    pos += 17
+    assert record[pos] == 2
+    pos += 1
+    assert record[pos:pos + 1 + len("expiry_year")] == bytes([11]) + b"expiry_year"
+    pos += 12
+    assert record[pos:pos + 6] == b"\x00\x042030"
+    pos += 6 + 1 + len("pk_bind") + 2 + 32
+    assert record[pos:pos + PLONK_PROOF_BYTES] == encode_plonk_proof(plonk_proof())
+    pos += PLONK_PROOF_BYTES
+    assert record[pos] == 10
+    assert len(record) == pos + 1 + 10 * 32
+
+
+def test_plonk_proof_encoding():
+    encoded = encode_plonk_proof(plonk_proof())
+    assert len(encoded) == PLONK_PROOF_BYTES
+    assert int.from_bytes(encoded[:32], "big") == 1
+    assert int.from_bytes(encoded[32:64], "big") == 2
+    assert int.from_bytes(encoded[-32:], "big") == 100 + len(PLONK_EVALUATIONS) - 1
+
+
+def test_projective_point_rejected():
+    proof = plonk_proof()
+    proof["Z"] = ["1", "2", "3"]
+    with pytest.raises(ValueError, match="Z is not affine"):
+        encode_plonk_proof(proof)
+
+
+def test_with_challenge():
+    record = encode_credential_record(payload())
+    challenge_id = str(uuid.uuid4())
+    body = with_challenge(record, challenge_id, b"\x05" * 64)
+    assert body[:len(record)] == record
+    assert uuid.UUID(bytes=body[len(record):len(record) + 16]) == uuid.UUID(challenge_id)
+    assert body[-64:] == b"\x05" * 64
+    with pytest.raises(ValueError):
+        with_challenge(record, challenge_id, b"\x05" * 63)
@@ -0,0 +1,33 @@
+import pytest
+
+from merkle import EMPTY, MerkleTree, poseidon_hash
+
+
+def root_from_proof(leaf, path, indices):
+    node = leaf
+    for sibling, is_right in zip(path, indices):
+        node = poseidon_hash([sibling, node] if is_right else [node, sibling])
+    return node
+
+
+def test_proofs_lead_to_root():
+    tree = MerkleTree([11, 22, 33, 44, 55], depth=3)
+    for index, leaf in enumerate(tree.leaves):
+        path, indices = tree.get_proof(index)
+        assert len(path) == 3
+        assert root_from_proof(leaf, path, indices) == tree.get_root()
+
+
+def test_incremental_updates_match_rebuild():
+    tree = MerkleTree([11, 22, 33], depth=4)
+    tree.insert_at(5, 66)
+    assert tree.get_root() == MerkleTree([11, 22, 33, EMPTY, EMPTY, 66], depth=4).get_root()
+    tree.remove_many([0, 5])
+    assert tree.get_root() == MerkleTree([EMPTY, 22, 33], depth=4).get_root()
+    tree.remove_at(2)
+    assert tree.get_root() == MerkleTree([EMPTY, 22], depth=4).get_root()
+
+
+def test_too_many_leaves():
+    with pytest.raises(ValueError):
+        MerkleTree(list(range(5)), depth=2)
@@ -1,10 +1,10 @@
-import subprocess
 import os
 from pathlib import Path
 from utils import write_json
 from math import ceil, log2
 from merkle import MerkleTree, PoseidonHash, poseidon_hash_two, FIELD_ORDER, DEPTH
 from merkle import poseidon_hash_two
+from profiling import run, stage
 
 circom_folder = "zk"
 circuit_name = "eligibility"
@@ -21,10 +21,10 @@ poseidon = PoseidonHash()
 def compile_circuit():
     if not os.path.exists(f"{circom_folder}/{circuit_name}.r1cs"):
         print("[Setup] Compiling circom circuit...")
-        subprocess.run([
+        run([
             "circom", f"{circom_folder}/{circuit_name}.circom",
             "--r1cs", "--wasm", "--sym", "--output", circom_folder
-        ], check=True)
+        ])
         print("[Setup] Compilation complete.")
     else:
         print("[Setup] Circuit already compiled.")
@@ -44,28 +44,15 @@ def build_merkle_root(leaves):
     mt = MerkleTree(leaves)
     return mt.root
 
-"""!!"""
-def generate_zk_proof(
+def build_circuit_input(
     birth_year, birth_month, birth_day,
     expiry_year, expiry_month, nationality,
     current_year, current_month, current_day,
-    valid_signature,
-    serial, issuer_id, merkle_leaves, leaf_index
+    valid_signature, serial, issuer_id, merkle_root, path_elements, path_indices
 ):
-    
-    if serial is not None and issuer_id is not None and merkle_leaves is not None and leaf_index is not None:
-        
-        commitment = poseidon_hash_two(serial, issuer_id)
-
-        FIELD_ORDER = 21888242871839275222246405745257275088548364400416034343698204186575808495617
-        commitment = commitment % FIELD_ORDER
-
-
-        mt = MerkleTree([commitment], depth=DEPTH)
-        root = mt.get_root()
-        path, path_indices = mt.get_proof(leaf_index)
-
-    inputs = {
+    """Circuit input for one credential, given its Merkle path to `merkle_root`."""
+    commitment = poseidon_hash_two(serial, issuer_id) % FIELD_ORDER
+    return {
         "birth_year": birth_year,
         "birth_month": birth_month,
         "birth_day": birth_day,
@@ -75,31 +62,51 @@ def generate_zk_proof(
         "nationality": nationality,
         "expiry_year": expiry_year,
         "expiry_month": expiry_month,
-        "valid_signature": valid_signature,   
+        "valid_signature": valid_signature,
         "revealed_commitment": commitment,
-        "merkle_root": root,
-        "pathElements": path,  # keep them as integers, not strings
+        "merkle_root": merkle_root,
+        "pathElements": path_elements,  # keep them as integers, not strings
         "pathIndices": path_indices,
         "credential_serial_lo": serial,
         "issuer_id": issuer_id
     }
-    
+
+"""!!"""
+def generate_zk_proof(
+    birth_year, birth_month, birth_day,
+    expiry_year, expiry_month, nationality,
+    current_year, current_month, current_day,
+    valid_signature,
+    serial, issuer_id, merkle_leaves, leaf_index
+):
+    # Prove against the tree the caller built (all issued commitments), not a single-leaf tree
+    mt = MerkleTree(merkle_leaves, depth=DEPTH)
+    path, path_indices = mt.get_proof(leaf_index)
+    inputs = build_circuit_input(
+        birth_year, birth_month, birth_day,
+        expiry_year, expiry_month, nationality,
+        current_year, current_month, current_day,
+        valid_signature, serial, issuer_id, mt.get_root(), path, path_indices
+    )
+
     write_json(input_json, inputs)
 
     # Generate witness
     print("[Witness] Generating witness...")
-    subprocess.run([
-        "node", f"{circom_folder}/{circuit_name}_js/generate_witness.js",
-        wasm_path, input_json, witness_path
-    ], check=True)
+    with stage("witness"):
+        run([
+            "node", f"{circom_folder}/{circuit_name}_js/generate_witness.js",
+            wasm_path, input_json, witness_path
+        ])
     
 
     # Generate proof
     print("[Proof] Creating PLONK proof...")
-    subprocess.run([
-        "snarkjs", "plonk", "prove",
-        zkey_path, witness_path, proof_path, public_path
-    ], check=True)
+    with stage("plonk_prove"):
+        run([
+            "snarkjs", "plonk", "prove",
+            zkey_path, witness_path, proof_path, public_path
+        ])
 
     return {
         "proof": proof_path,
@@ -108,10 +115,9 @@ def generate_zk_proof(
 
 def verify_zk_proof():
     print("[ZK] snarkjs verify output:")
-    subprocess.run(
+    run(
         ["snarkjs", "plonk", "verify",
         "zk/verification_key.json",
-        "out/public.json", "out/proof.json"],
-        check=True
+        "out/public.json", "out/proof.json"]
     )
 
@@ -0,0 +1,60 @@
+// Long-lived PLONK prover used by service.py.
+// Loads the circuit wasm and the proving key once, then answers newline-delimited
+// JSON requests on stdin with one JSON line per request on stdout:
+//   {"id": 1, "op": "ping"}                  -> {"id": 1, "ok": true}
+//   {"id": 2, "op": "prove", "input": {...}} -> {"id": 2, "ok": true, "proof": {...}, "public": [...]}
+// Circuit inputs should be sent as decimal strings: field elements do not fit in a JS number.
+const { execSync } = require("child_process");
+const fs = require("fs");
+const path = require("path");
+const readline = require("readline");
+
+// A local node_modules (or NODE_PATH) first, else the global install from the README
+function requireSnarkjs() {
+    try {
+        return require("snarkjs");
+    } catch (err) {
+        return require(path.join(execSync("npm root -g").toString().trim(), "snarkjs"));
+    }
+}
+
+const snarkjs = requireSnarkjs();
+
+const wasm = { type: "mem", data: new Uint8Array(fs.readFileSync(process.argv[2])) };
+const zkey = { type: "mem", data: new Uint8Array(fs.readFileSync(process.argv[3])) };
+
+function reply(msg) {
+    process.stdout.write(JSON.stringify(msg) + "\n");
+}
+
+const rl = readline.createInterface({ input: process.stdin });
+
+rl.on("line", async (line) => {
+    let req;
+    try {
+        req = JSON.parse(line);
+    } catch (err) {
+        reply({ id: null, ok: false, error: "malformed request" });
+        return;
+    }
+
+    try {
+        if (req.op === "ping") {
+            reply({ id: req.id, ok: true });
+        } else if (req.op === "prove") {
+            const { proof, publicSignals } = await snarkjs.plonk.fullProve(req.input, wasm, zkey);
+            reply({ id: req.id, ok: true, proof, public: publicSignals });
+        } else {
+            reply({ id: req.id, ok: false, error: `unknown op: ${req.op}` });
+        }
+    } catch (err) {
+        reply({ id: req.id, ok: false, error: String(err) });
+    }
+});
+
+// Parent closed the pipe: exit instead of lingering with curve worker threads
+rl.on("close", () => process.exit(0));
+
+// Build the curve (the slow part of a cold proof) before reporting ready; it is kept
+// in a global that snarkjs reuses for every proof
+snarkjs.curves.getCurveFromName("bn128").then(() => reply({ id: 0, ok: true, ready: true }));
@@ -1,5 +1,5 @@
 import os
-import subprocess
+from profiling import run, stage
 
 def trusted_setup():
     zkey_final = "zk/eligibility_final.zkey"
@@ -16,28 +16,31 @@ def trusted_setup():
     
     if not os.path.exists(ptau_file):
         # Create ptau with power 14 (supports up to 2^14 = 16384 constraints)
-        subprocess.run([
-            "snarkjs", "powersoftau", "new", "bn128", "14", "zk/pot14_0000.ptau", "-v"
-        ], check=True)
-        
-        subprocess.run([
-            "snarkjs", "powersoftau", "contribute", "zk/pot14_0000.ptau", "zk/pot14_0001.ptau",
-            "--name=First", "-v"
-        ], check=True)
-        
-        subprocess.run([
-            "snarkjs", "powersoftau", "prepare", "phase2", "zk/pot14_0001.ptau", ptau_file, "-v"
-        ], check=True)
+        with stage("powersoftau"):
+            run([
+                "snarkjs", "powersoftau", "new", "bn128", "14", "zk/pot14_0000.ptau", "-v"
+            ])
+            
+            run([
+                "snarkjs", "powersoftau", "contribute", "zk/pot14_0000.ptau", "zk/pot14_0001.ptau",
+                "--name=First", "-v"
+            ])
+            
+            run([
+                "snarkjs", "powersoftau", "prepare", "phase2", "zk/pot14_0001.ptau", ptau_file, "-v"
+            ])
     
     # Generate the circuit-specific proving key
-    subprocess.run([
-        "snarkjs", "plonk", "setup", "zk/eligibility.r1cs", ptau_file, zkey_final
-    ], check=True)
+    with stage("plonk_setup"):
+        run([
+            "snarkjs", "plonk", "setup", "zk/eligibility.r1cs", ptau_file, zkey_final
+        ])
     
     # *** ADD THIS: Generate verification key from the proving key ***
-    subprocess.run([
-        "snarkjs", "zkey", "export", "verificationkey", zkey_final, verification_key
-    ], check=True)
+    with stage("export_verification_key"):
+        run([
+            "snarkjs", "zkey", "export", "verificationkey", zkey_final, verification_key
+        ])
     
     print("[Setup] Trusted setup complete.")
     print(f"[Setup] Generated proving key: {zkey_final}")